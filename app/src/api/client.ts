@@ -7,6 +7,9 @@ const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://localhost:5000';
 const ACCESS_TOKEN_KEY = 'access_token';
 const REFRESH_TOKEN_KEY = 'refresh_token';
 
+// Primary WAL position after our last write; replica reads wait until it is replayed
+const WRITE_POSITION_KEY = 'write_position';
+
 // Create axios instance
 const apiClient: AxiosInstance = axios.create({
   baseURL: API_BASE_URL,
@@ -23,6 +26,10 @@ apiClient.interceptors.request.use(
     if (token && config.headers) {
       config.headers.Authorization = `Bearer ${token}`;
     }
+    const writePosition = sessionStorage.getItem(WRITE_POSITION_KEY);
+    if (writePosition && config.headers) {
+      config.headers['X-Read-After'] = writePosition;
+    }
     return config;
   },
   (error) => Promise.reject(error)
@@ -30,7 +37,13 @@ apiClient.interceptors.request.use(
 
 // Response interceptor - handle token refresh and errors
 apiClient.interceptors.response.use(
-  (response) => response,
+  (response) => {
+    const writePosition = response.headers['x-write-position'];
+    if (writePosition) {
+      sessionStorage.setItem(WRITE_POSITION_KEY, writePosition);
+    }
+    return response;
+  },
   async (error: AxiosError) => {
     const originalRequest = error.config as AxiosRequestConfig & { _retry?: boolean };
 
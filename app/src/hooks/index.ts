@@ -2,3 +2,4 @@ export { useAuth } from './useAuth';
 export { useLeads } from './useLeads';
 export { useApplications } from './useApplications';
 export { useTasks } from './useTasks';
+export { useEventStream } from './useEventStream';
@@ -0,0 +1,89 @@
+import { useEffect, useRef } from 'react';
+import { EventService } from '@/services';
+
+const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://localhost:5000';
+
+// Delay before reconnecting after the stream closes or fails
+const RECONNECT_DELAY_MS = 1000;
+const MAX_RECONNECT_DELAY_MS = 30000;
+
+export type ChangeEntity = 'lead' | 'task' | 'activity' | 'application';
+
+export interface ChangeEvent {
+  entity: ChangeEntity;
+  action: 'created' | 'updated' | 'deleted';
+  id: number;
+  lead_id: number | null;
+  owners: number[];
+}
+
+type ChangeHandlers = Partial<Record<ChangeEntity, (event: ChangeEvent) => void>> & {
+  // Called when events were dropped and cached data should be refetched
+  resync?: () => void;
+};
+
+/**
+ * Subscribe to server-sent change events so views can refetch precisely
+ * instead of polling. Each connection uses a fresh single-use ticket, so
+ * the access token never appears in a URL.
+ */
+export function useEventStream(handlers: ChangeHandlers) {
+  const handlersRef = useRef(handlers);
+  handlersRef.current = handlers;
+
+  useEffect(() => {
+    let source: EventSource | null = null;
+    let timer: ReturnType<typeof setTimeout> | null = null;
+    let failures = 0;
+    let opened = false;
+    let closed = false;
+
+    const reconnect = () => {
+      source?.close();
+      source = null;
+      if (closed) return;
+      const delay = Math.min(RECONNECT_DELAY_MS * 2 ** failures, MAX_RECONNECT_DELAY_MS);
+      failures += 1;
+      timer = setTimeout(connect, delay);
+    };
+
+    const connect = async () => {
+      if (closed || !localStorage.getItem('access_token')) return;
+
+      let ticket: string;
+      try {
+        // The API client refreshes an expired access token here
+        ({ ticket } = await EventService.getStreamTicket());
+      } catch {
+        reconnect();
+        return;
+      }
+      if (closed) return;
+
+      source = new EventSource(`${API_BASE_URL}/events/stream?ticket=${encodeURIComponent(ticket)}`);
+      source.onopen = () => {
+        failures = 0;
+        // Changes made while disconnected were missed
+        if (opened) handlersRef.current.resync?.();
+        opened = true;
+      };
+      // Tickets are single-use, so reconnect with a new one instead of letting EventSource retry
+      source.onerror = reconnect;
+
+      (['lead', 'task', 'activity', 'application'] as ChangeEntity[]).forEach((entity) => {
+        source?.addEventListener(entity, (message) => {
+          handlersRef.current[entity]?.(JSON.parse((message as MessageEvent).data));
+        });
+      });
+      source.addEventListener('resync', () => handlersRef.current.resync?.());
+      source.addEventListener('expired', reconnect);
+    };
+
+    connect();
+    return () => {
+      closed = true;
+      if (timer) clearTimeout(timer);
+      source?.close();
+    };
+  }, []);
+}
@@ -1,8 +1,12 @@
-import { useCallback } from 'react';
+import { useCallback, useEffect, useRef } from 'react';
 import { useLeadStore, fetchLeadsStart, fetchLeadsSuccess, fetchLeadsFailure, selectLead, updateLead, deleteLead, fetchStagesStart, fetchStagesSuccess, fetchStagesFailure, fetchSourcesStart, fetchSourcesSuccess, fetchSourcesFailure } from '@/store/leadStore';
 import { LeadService } from '@/services';
 import { Lead, LeadFormData, PaginatedResponse } from '@/types';
 import { toast } from 'sonner';
+import { useEventStream } from './useEventStream';
+
+// Debounce for refetching after change events, so a burst causes one request
+const REFRESH_DELAY_MS = 500;
 
 interface LeadFilters {
   search?: string;
@@ -16,8 +20,11 @@ interface LeadFilters {
 
 export function useLeads() {
   const { state, dispatch } = useLeadStore();
+  const lastFiltersRef = useRef<LeadFilters | null>(null);
+  const refreshTimerRef = useRef<ReturnType<typeof setTimeout> | null>(null);
 
   const fetchLeads = useCallback(async (filters: LeadFilters = {}) => {
+    lastFiltersRef.current = filters;
     dispatch(fetchLeadsStart());
     try {
       const response = await LeadService.getLeads(filters);
@@ -31,6 +38,26 @@ export function useLeads() {
     }
   }, [dispatch]);
 
+  // Quietly refetch the current list when leads change elsewhere
+  const scheduleRefresh = useCallback(() => {
+    if (!lastFiltersRef.current || refreshTimerRef.current) return;
+    refreshTimerRef.current = setTimeout(async () => {
+      refreshTimerRef.current = null;
+      if (!lastFiltersRef.current) return;
+      try {
+        dispatch(fetchLeadsSuccess(await LeadService.getLeads(lastFiltersRef.current)));
+      } catch {
+        // The next change event or fetch tries again
+      }
+    }, REFRESH_DELAY_MS);
+  }, [dispatch]);
+
+  useEffect(() => () => {
+    if (refreshTimerRef.current) clearTimeout(refreshTimerRef.current);
+  }, []);
+
+  useEventStream({ lead: scheduleRefresh, application: scheduleRefresh, resync: scheduleRefresh });
+
   const fetchStages = useCallback(async () => {
     dispatch(fetchStagesStart());
     try {
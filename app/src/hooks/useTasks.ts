@@ -1,8 +1,12 @@
-import { useCallback } from 'react';
+import { useCallback, useEffect, useRef } from 'react';
 import { useTaskStore, fetchTasksStart, fetchTasksSuccess, fetchTasksFailure, fetchPendingStart, fetchPendingSuccess, fetchPendingFailure, selectTask, updateTask, completeTask, deleteTask } from '@/store/taskStore';
 import { TaskService } from '@/services';
 import { Task, TaskFormData } from '@/types';
 import { toast } from 'sonner';
+import { useEventStream } from './useEventStream';
+
+// Debounce for refetching after change events, so a burst causes one request
+const REFRESH_DELAY_MS = 500;
 
 interface TaskFilters {
   status?: string;
@@ -17,8 +21,12 @@ interface TaskFilters {
 
 export function useTasks() {
   const { state, dispatch } = useTaskStore();
+  const lastFiltersRef = useRef<TaskFilters | null>(null);
+  const pendingFetchedRef = useRef(false);
+  const refreshTimerRef = useRef<ReturnType<typeof setTimeout> | null>(null);
 
   const fetchTasks = useCallback(async (filters: TaskFilters = {}) => {
+    lastFiltersRef.current = filters;
     dispatch(fetchTasksStart());
     try {
       const response = await TaskService.getTasks(filters);
@@ -33,6 +41,7 @@ export function useTasks() {
   }, [dispatch]);
 
   const fetchPendingTasks = useCallback(async () => {
+    pendingFetchedRef.current = true;
     dispatch(fetchPendingStart());
     try {
       const response = await TaskService.getPendingTasks();
@@ -45,6 +54,30 @@ export function useTasks() {
     }
   }, [dispatch]);
 
+  // Quietly refetch the lists already shown when tasks change elsewhere
+  const scheduleRefresh = useCallback(() => {
+    if ((!lastFiltersRef.current && !pendingFetchedRef.current) || refreshTimerRef.current) return;
+    refreshTimerRef.current = setTimeout(async () => {
+      refreshTimerRef.current = null;
+      try {
+        if (lastFiltersRef.current) {
+          dispatch(fetchTasksSuccess(await TaskService.getTasks(lastFiltersRef.current)));
+        }
+        if (pendingFetchedRef.current) {
+          dispatch(fetchPendingSuccess((await TaskService.getPendingTasks()).tasks));
+        }
+      } catch {
+        // The next change event or fetch tries again
+      }
+    }, REFRESH_DELAY_MS);
+  }, [dispatch]);
+
+  useEffect(() => () => {
+    if (refreshTimerRef.current) clearTimeout(refreshTimerRef.current);
+  }, []);
+
+  useEventStream({ task: scheduleRefresh, resync: scheduleRefresh });
+
   const createTask = useCallback(async (taskData: TaskFormData) => {
     try {
       const response = await TaskService.createTask(taskData);
@@ -0,0 +1,9 @@
+import apiClient from '@/api/client';
+
+export const EventService = {
+  // Single-use credential for opening one event stream (EventSource cannot send headers)
+  async getStreamTicket(): Promise<{ ticket: string; expires_in: number }> {
+    const response = await apiClient.post('/events/ticket');
+    return response.data;
+  },
+};
@@ -5,3 +5,4 @@ export { TaskService } from './taskService';
 export { ActivityService } from './activityService';
 export { ReportService } from './reportService';
 export { AdminService } from './adminService';
+export { EventService } from './eventService';
@@ -7,6 +7,7 @@ interface LeadFilters {
   source_id?: number;
   assigned_to?: number;
   status?: string;
+  sort?: 'score' | 'created_at';
   page?: number;
   per_page?: number;
 }
@@ -70,4 +71,13 @@ export const LeadService = {
     const response = await apiClient.get('/leads/source-distribution');
     return response.data;
   },
+
+  async getTimeline(leadId: number, cursor?: string, limit = 50): Promise<{
+    items: { type: 'activity' | 'task_created' | 'task_completed' | 'application'; timestamp: string; data: Record<string, unknown> }[];
+    next_cursor: string | null;
+    has_more: boolean;
+  }> {
+    const response = await apiClient.get(`/leads/${leadId}/timeline`, { params: { cursor, limit } });
+    return response.data;
+  },
 };
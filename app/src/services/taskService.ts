@@ -43,6 +43,23 @@ export const TaskService = {
     return response.data;
   },
 
+  async bulkOperation(request: {
+    operation: 'assign' | 'reschedule' | 'complete';
+    task_ids?: number[];
+    filters?: TaskFilters;
+    assigned_to?: number;
+    due_date?: string;
+    notes?: string;
+  }): Promise<{
+    operation: string;
+    affected: number;
+    task_ids: number[];
+    skipped_ids?: number[];
+  }> {
+    const response = await apiClient.post('/tasks/bulk', request);
+    return response.data;
+  },
+
   async getPendingTasks(): Promise<{ tasks: Task[] }> {
     const response = await apiClient.get('/tasks/pending');
     return response.data;
@@ -29,6 +29,7 @@ export interface Lead {
   assigned_user?: User;
   status: LeadStatus;
   re_inquiry_count: number;
+  score: number;
   last_activity_at?: string;
   created_at: string;
   updated_at: string;
@@ -230,6 +231,7 @@ export interface PaginatedResponse<T> {
   pages: number;
   current_page: number;
   per_page: number;
+  total_is_approximate?: boolean;
 }
 
 // API Types
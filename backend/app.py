@@ -1,10 +1,20 @@
 """Main Flask application."""
 import os
+import time
+import click
 from flask import Flask, jsonify
 from config import config_by_name
-from extensions import db, migrate, cors, jwt, scheduler
-from routes import auth_bp, lead_bp, application_bp, task_bp, activity_bp, report_bp, admin_bp
+from extensions import db, cors, jwt, scheduler
+from database import init_database
+from json_provider import init_json_provider
+from middleware import init_compression, init_read_replica
+from routes import auth_bp, lead_bp, application_bp, task_bp, activity_bp, report_bp, admin_bp, publisher_bp, event_bp, health_bp
 from services.automation_service import AutomationService
+from services.kpi_service import KpiService
+from services.scoring_service import ScoringService
+from services.event_service import EventService
+from services.publisher_service import PublisherService
+from services.warmup_service import WarmupService
 
 
 
@@ -15,11 +25,33 @@ def create_app(config_name=None):
     app.config.from_object(config_by_name[config_name])
     
     # Initialize extensions
-    db.init_app(app)
-    migrate.init_app(app, db)
-    cors.init_app(app, origins=app.config['CORS_ORIGINS'])
+    init_database(app)
+    if click.get_current_context(silent=True):
+        # Only the `flask db` commands need migrations, and alembic is slow to import
+        from flask_migrate import Migrate
+        Migrate(app, db)
+    cors.init_app(app, origins=app.config['CORS_ORIGINS'], expose_headers=['X-Write-Position'])
     jwt.init_app(app)
     
+    # Response encoding
+    init_json_provider(app)
+    init_compression(app)
+    
+    # Read-your-writes positions for replica-routed reads
+    init_read_replica(app)
+    
+    # Keep KPI counters in step with lead, application and task writes
+    KpiService.register_listeners()
+    
+    # Rescore leads whose activities or scoring attributes changed
+    ScoringService.register_listeners()
+    
+    # Publish committed changes to event stream subscribers
+    EventService.register_listeners()
+    
+    # Drop cached publisher API keys when a publisher changes
+    PublisherService.register_listeners()
+    
     # Register blueprints
     app.register_blueprint(auth_bp)
     app.register_blueprint(lead_bp)
@@ -28,6 +60,9 @@ def create_app(config_name=None):
     app.register_blueprint(activity_bp)
     app.register_blueprint(report_bp)
     app.register_blueprint(admin_bp)
+    app.register_blueprint(publisher_bp)
+    app.register_blueprint(event_bp)
+    app.register_blueprint(health_bp)
     
     # Error handlers
     @app.errorhandler(400)
@@ -51,19 +86,6 @@ def create_app(config_name=None):
         db.session.rollback()
         return jsonify({'error': 'Internal server error', 'message': str(error)}), 500
     
-    # Health check endpoint
-    @app.route('/health', methods=['GET'])
-    def health_check():
-        return jsonify({
-            'status': 'healthy',
-            'service': 'admissions-crm-api',
-            'version': '1.0.0'
-        }), 200
-    
-    # Setup scheduled jobs
-    with app.app_context():
-        AutomationService.setup_scheduled_jobs()
-    
     return app
 
 
@@ -121,9 +143,75 @@ def init_db():
             print("Admin user created: admin@university.edu / admin123")
         
         db.session.commit()
+        
+        # Seed KPI counters from any existing rows
+        KpiService.reconcile()
         print("Database initialized successfully!")
 
 
+@app.cli.command('backfill-dedupe-keys')
+def backfill_dedupe_keys():
+    """Populate normalized email and duplicate-blocking keys on existing leads."""
+    with app.app_context():
+        from services import LeadService
+        result = LeadService.backfill_dedupe_keys()
+        print(f"Dedupe keys set on {result['updated']} leads")
+        if result['duplicates']:
+            print(f"Duplicate leads left unkeyed: {result['duplicates']}")
+
+
+# Name the email key backfill was introduced under
+app.cli.add_command(backfill_dedupe_keys, 'backfill-email-keys')
+
+
+@app.cli.command('backfill-stage-transitions')
+def backfill_stage_transitions():
+    """Create stage transitions from historical stage_change activities."""
+    with app.app_context():
+        from services import LeadService
+        created = LeadService.backfill_stage_transitions(app.config['BACKFILL_BATCH_SIZE'])
+        print(f"Stage transitions backfilled ({created} created)")
+
+
+@app.cli.command('detect-duplicates')
+def detect_duplicates():
+    """Score every lead against its blocking candidates and record likely duplicates."""
+    with app.app_context():
+        from services import DuplicateService
+        found = DuplicateService.detect_all()
+        print(f"Duplicate detection complete ({found} likely pairs)")
+
+
+@app.cli.command('score-leads')
+def score_leads():
+    """Recompute every lead's priority score."""
+    with app.app_context():
+        scored = ScoringService.score_leads()
+        print(f"Scored {scored} leads")
+
+
+@app.cli.command('run-scheduler')
+def run_scheduler():
+    """Run the scheduled jobs in this process (for SCHEDULER_MODE=off deployments)."""
+    AutomationService.start_scheduler(app, force=True)
+    print("Scheduler running; press Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        scheduler.shutdown()
+
+
+@app.cli.command('reconcile-kpis')
+def reconcile_kpis():
+    """Recompute KPI counters from source tables."""
+    with app.app_context():
+        repaired = KpiService.reconcile()
+        print(f"KPI counters reconciled ({repaired} corrected)")
+
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
+    WarmupService.warm_up(app)
+    AutomationService.start_scheduler(app)
     app.run(host='0.0.0.0', port=port)
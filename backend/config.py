@@ -16,6 +16,34 @@ class Config:
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Database pool: one per worker process, sized from the gunicorn worker and thread counts
+    WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', 2))  # worker processes (gunicorn.conf.py)
+    WEB_THREADS = int(os.environ.get('WEB_THREADS', 4))  # request threads per worker (gunicorn.conf.py)
+    GUNICORN_WORKER_CLASS = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')  # gthread, gevent or sync (gunicorn.conf.py)
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 0))  # 0 derives WEB_THREADS + 2
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 2))
+    DB_MAX_CONNECTIONS = int(os.environ.get('DB_MAX_CONNECTIONS', 0))  # budget across workers, 0 = unchecked
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 10))  # seconds waiting for a connection
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))  # seconds
+    DB_CONNECT_TIMEOUT = int(os.environ.get('DB_CONNECT_TIMEOUT', 5))  # seconds
+    DB_QUERY_CACHE_SIZE = int(os.environ.get('DB_QUERY_CACHE_SIZE', 1000))  # compiled statements
+    
+    # Connections each worker opens while warming up, before it accepts traffic
+    WARMUP_CONNECTIONS = int(os.environ.get('WARMUP_CONNECTIONS', 2))
+    
+    # Statement timeouts (milliseconds, 0 disables): requests, report routes, and jobs/CLI commands
+    DB_STATEMENT_TIMEOUT = int(os.environ.get('DB_STATEMENT_TIMEOUT', 15000))
+    REPORT_STATEMENT_TIMEOUT = int(os.environ.get('REPORT_STATEMENT_TIMEOUT', 60000))
+    DB_BACKGROUND_STATEMENT_TIMEOUT = int(os.environ.get('DB_BACKGROUND_STATEMENT_TIMEOUT', 0))
+    
+    # Read replica for reports and list endpoints; everything uses the primary when unset
+    SQLALCHEMY_BINDS = {'replica': os.environ['DATABASE_REPLICA_URL']} if os.environ.get('DATABASE_REPLICA_URL') else {}
+    REPLICA_MAX_LAG = int(os.environ.get('REPLICA_MAX_LAG', 5))  # seconds behind before reads fall back to the primary
+    REPLICA_STATUS_TTL = int(os.environ.get('REPLICA_STATUS_TTL', 1))  # seconds between lag checks
+    
+    # PgBouncer transaction pooling: no startup options; timeouts are set per transaction
+    DB_PGBOUNCER = os.environ.get('DB_PGBOUNCER', 'False').lower() == 'true'
+    
     # JWT
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET', 'jwt-secret-key-change-in-production')
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(minutes=15)
@@ -33,16 +61,88 @@ class Config:
     # Default Pagination
     DEFAULT_PER_PAGE = 20
     MAX_PER_PAGE = 100
+    
+    # Bulk Operations
+    MAX_BULK_TASKS = int(os.environ.get('MAX_BULK_TASKS', 1000))
+    MAX_BULK_LEADS = int(os.environ.get('MAX_BULK_LEADS', 1000))
+    
+    # Responses: 'orjson' or 'default' JSON encoding; brotli/gzip for bodies over COMPRESS_MIN_SIZE bytes (0 disables)
+    JSON_PROVIDER = os.environ.get('JSON_PROVIDER', 'orjson')
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))  # gzip, 1-9
+    COMPRESS_BROTLI_QUALITY = int(os.environ.get('COMPRESS_BROTLI_QUALITY', 4))  # 0-11
+    
+    # HTTP caching: seconds clients may reuse stages, sources and executives without revalidating
+    REFERENCE_DATA_MAX_AGE = int(os.environ.get('REFERENCE_DATA_MAX_AGE', 300))
+    
+    # Publisher Ingestion
+    PUBLISHER_MAX_BATCH = int(os.environ.get('PUBLISHER_MAX_BATCH', 1000))
+    PUBLISHER_KEY_CACHE_TTL = int(os.environ.get('PUBLISHER_KEY_CACHE_TTL', 60))  # seconds
+    PUBLISHER_RATE_LIMIT = int(os.environ.get('PUBLISHER_RATE_LIMIT', 120))  # requests per window
+    PUBLISHER_RATE_WINDOW = int(os.environ.get('PUBLISHER_RATE_WINDOW', 60))  # seconds
+    PUBLISHER_MAX_CONCURRENT_INGESTS = int(os.environ.get('PUBLISHER_MAX_CONCURRENT_INGESTS', 16))  # per process
+    
+    # Shared rate-limit store (e.g. redis://localhost:6379/0); in-memory when unset
+    RATE_LIMIT_STORAGE_URL = os.environ.get('REDIS_URL')
+    
+    # Scheduled jobs: 'leader' (one elected serving process), 'always' (every serving process)
+    # or 'off' (run `flask run-scheduler` as its own process)
+    SCHEDULER_MODE = os.environ.get('SCHEDULER_MODE', 'leader')
+    SCHEDULER_ELECTION_INTERVAL = int(os.environ.get('SCHEDULER_ELECTION_INTERVAL', 30))  # seconds between leader checks
+    SCHEDULER_MAX_LAG = int(os.environ.get('SCHEDULER_MAX_LAG', 300))  # seconds a job may be overdue before health degrades
+    
+    # Deep health diagnostics: result cache and per-query cap
+    HEALTH_DIAGNOSTICS_TTL = int(os.environ.get('HEALTH_DIAGNOSTICS_TTL', 10))  # seconds
+    HEALTH_QUERY_TIMEOUT = int(os.environ.get('HEALTH_QUERY_TIMEOUT', 500))  # milliseconds
+    
+    # Change event stream: 'memory' (single process) or 'postgres' (LISTEN/NOTIFY across workers)
+    EVENTS_BACKEND = os.environ.get('EVENTS_BACKEND', 'postgres' if WEB_CONCURRENCY > 1 else 'memory')
+    EVENT_STREAM_HEARTBEAT = int(os.environ.get('EVENT_STREAM_HEARTBEAT', 15))  # seconds
+    EVENT_STREAM_QUEUE_SIZE = int(os.environ.get('EVENT_STREAM_QUEUE_SIZE', 500))  # batches per client
+    # Open streams per process; 0 derives 200 under gevent and WEB_THREADS - 2 on thread workers
+    EVENT_STREAM_MAX_PER_WORKER = int(os.environ.get('EVENT_STREAM_MAX_PER_WORKER', 0))
+    EVENT_TICKET_TTL = int(os.environ.get('EVENT_TICKET_TTL', 30))  # seconds to redeem a stream ticket
+    
+    # Duplicate Detection
+    DUPLICATE_MATCH_THRESHOLD = float(os.environ.get('DUPLICATE_MATCH_THRESHOLD', 0.6))  # 0-1 pair score
+    DUPLICATE_MAX_BLOCK_SIZE = int(os.environ.get('DUPLICATE_MAX_BLOCK_SIZE', 200))  # leads sharing one blocking key
+    
+    # List totals: 'approximate' uses table statistics / planner estimates at or above the threshold, 'exact' always counts
+    COUNT_MODE = os.environ.get('COUNT_MODE', 'approximate')
+    APPROX_COUNT_THRESHOLD = int(os.environ.get('APPROX_COUNT_THRESHOLD', 100000))
+    
+    # Calendar for report day/week/month boundaries when a request passes no tz (IANA name)
+    REPORT_TIMEZONE = os.environ.get('REPORT_TIMEZONE', 'UTC')
+    
+    # Background report jobs: worker threads per process, per-job statement limit and result retention
+    REPORT_JOB_WORKERS = int(os.environ.get('REPORT_JOB_WORKERS', 2))
+    REPORT_JOB_TIMEOUT = int(os.environ.get('REPORT_JOB_TIMEOUT', 1800))  # seconds
+    REPORT_JOB_HEARTBEAT = int(os.environ.get('REPORT_JOB_HEARTBEAT', 10))  # seconds between progress updates
+    REPORT_JOB_RESULT_TTL = int(os.environ.get('REPORT_JOB_RESULT_TTL', 86400))  # seconds
+    
+    # Cohort analytics: cohorts older than this are final; open ones are recomputed after the TTL
+    COHORT_CLOSE_AFTER_DAYS = int(os.environ.get('COHORT_CLOSE_AFTER_DAYS', 365))
+    COHORT_CACHE_TTL = int(os.environ.get('COHORT_CACHE_TTL', 900))  # seconds
+    COHORT_MAX_MONTHS = int(os.environ.get('COHORT_MAX_MONTHS', 36))  # cohorts per request
+    
+    # Rows per committed batch in backfill commands
+    BACKFILL_BATCH_SIZE = int(os.environ.get('BACKFILL_BATCH_SIZE', 5000))
 
 
 class DevelopmentConfig(Config):
     """Development configuration."""
     DEBUG = True
+    
+    # The development server runs each request on its own thread
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
 
 
 class ProductionConfig(Config):
     """Production configuration."""
     DEBUG = False
+    
+    # Leave headroom below Postgres' default max_connections of 100
+    DB_MAX_CONNECTIONS = int(os.environ.get('DB_MAX_CONNECTIONS', 80))
 
 
 class TestingConfig(Config):
@@ -0,0 +1,242 @@
+"""Database engine configuration, read replica routing and pool metrics."""
+import os
+import threading
+import time
+from flask import current_app, g, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, text
+from sqlalchemy.sql import Select
+
+
+def engine_options(config) -> dict:
+    """Build SQLAlchemy engine options for one worker process.
+    
+    The pool holds a connection per request thread plus headroom for
+    scheduled jobs. With DB_MAX_CONNECTIONS set, pools are capped so that
+    WEB_CONCURRENCY workers together stay within the server's budget.
+    """
+    workers = max(1, config['WEB_CONCURRENCY'])
+    pool_size = config['DB_POOL_SIZE'] or config['WEB_THREADS'] + 2
+    max_overflow = config['DB_MAX_OVERFLOW']
+    
+    budget = config['DB_MAX_CONNECTIONS']
+    if budget:
+        per_worker = max(1, budget // workers)
+        if pool_size + max_overflow > per_worker:
+            print(f"Pool of {pool_size}+{max_overflow} connections x {workers} workers exceeds "
+                  f"DB_MAX_CONNECTIONS={budget}; capping at {per_worker} per worker")
+            pool_size = min(pool_size, per_worker)
+            max_overflow = per_worker - pool_size
+    
+    connect_args = {
+        'application_name': 'admissions-crm-api',
+        'connect_timeout': config['DB_CONNECT_TIMEOUT']
+    }
+    # PgBouncer in transaction mode rejects startup options; the timeout is set per transaction instead
+    if not config['DB_PGBOUNCER'] and config['DB_STATEMENT_TIMEOUT']:
+        connect_args['options'] = f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT']}"
+    
+    return {
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': True,
+        'query_cache_size': config['DB_QUERY_CACHE_SIZE'],
+        'connect_args': connect_args
+    }
+
+
+def apply_statement_timeout(connection, milliseconds: int) -> None:
+    """Set the statement timeout for the rest of the current transaction."""
+    connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(milliseconds)}")
+
+
+class RoutingSession(Session):
+    """Session sending plain SELECTs to the 'replica' bind once a route opts in.
+    
+    Flushes, DML, locking reads and raw SQL go to the primary, and after
+    the first of those the rest of the session stays on the primary so a
+    request always reads its own writes.
+    """
+    
+    REPLICA_KEY = 'use_replica'
+    
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self.info.get(self.REPLICA_KEY):
+            if isinstance(clause, Select) and clause._for_update_arg is None and not self._flushing:
+                return self._db.engines['replica']
+            if clause is not None or self._flushing:
+                self.info[self.REPLICA_KEY] = False
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def parse_wal_position(position: str) -> int:
+    """Convert a Postgres WAL position ('16/B374D848') to a comparable integer."""
+    high, low = position.split('/')
+    return (int(high, 16) << 32) + int(low, 16)
+
+
+class ReplicaGuard:
+    """Cached replica lag check deciding whether reads may use the replica."""
+    
+    # Lag is zero when the standby has replayed everything it received (e.g. an idle primary).
+    # A server that is not in recovery is a local stand-in and counts as caught up.
+    STATUS_SQL = text("""
+        SELECT
+            pg_last_wal_replay_lsn()::text AS replay_position,
+            CASE
+                WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+            END AS lag
+    """)
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._status = None
+    
+    def status(self, engine, ttl: int) -> tuple:
+        """Get (replay position, lag seconds), or None when the replica is unreachable.
+        
+        One thread per process refreshes the status every `ttl` seconds;
+        others use the last result meanwhile.
+        """
+        if time.monotonic() - self._checked_at < ttl or not self._lock.acquire(blocking=False):
+            return self._status
+        try:
+            with engine.connect() as connection:
+                row = connection.execute(self.STATUS_SQL).one()
+            position = parse_wal_position(row.replay_position) if row.replay_position else None
+            self._status = (position, float(row.lag or 0))
+        except Exception as e:
+            print(f"Replica status check failed: {str(e)}")
+            self._status = None
+        finally:
+            self._checked_at = time.monotonic()
+            self._lock.release()
+        return self._status
+    
+    def ready(self, engine, min_position: str = None) -> bool:
+        """Check the replica is within REPLICA_MAX_LAG and has replayed `min_position`."""
+        config = current_app.config
+        status = self.status(engine, config['REPLICA_STATUS_TTL'])
+        if status is None:
+            return False
+        position, lag = status
+        if lag > config['REPLICA_MAX_LAG']:
+            return False
+        if min_position and position is not None:
+            try:
+                return position >= parse_wal_position(min_position)
+            except ValueError:
+                return False
+        return True
+
+
+replica_guard = ReplicaGuard()
+
+
+class PoolMetrics:
+    """Per-process connection pool counters."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.engine = None
+        self.reset()
+    
+    def bind(self, engine) -> None:
+        """Start counting events on an engine's pool."""
+        self.engine = engine
+        if event.contains(engine, 'checkout', self.on_checkout):
+            return
+        event.listen(engine, 'connect', self.on_connect)
+        event.listen(engine, 'checkout', self.on_checkout)
+        event.listen(engine, 'checkin', self.on_checkin)
+        event.listen(engine, 'invalidate', self.on_invalidate)
+    
+    def reset(self) -> None:
+        with self._lock:
+            self.connects = 0
+            self.checkouts = 0
+            self.invalidations = 0
+            self.max_checked_out = 0
+            self.hold_seconds_total = 0.0
+            self.hold_seconds_max = 0.0
+    
+    def on_connect(self, dbapi_connection, connection_record) -> None:
+        with self._lock:
+            self.connects += 1
+    
+    def on_checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        connection_record.info['checked_out_at'] = time.perf_counter()
+        checked_out = self.engine.pool.checkedout()
+        with self._lock:
+            self.checkouts += 1
+            self.max_checked_out = max(self.max_checked_out, checked_out)
+    
+    def on_checkin(self, dbapi_connection, connection_record) -> None:
+        checked_out_at = connection_record.info.pop('checked_out_at', None)
+        if checked_out_at is None:
+            return
+        held = time.perf_counter() - checked_out_at
+        with self._lock:
+            self.hold_seconds_total += held
+            self.hold_seconds_max = max(self.hold_seconds_max, held)
+    
+    def on_invalidate(self, dbapi_connection, connection_record, exception) -> None:
+        with self._lock:
+            self.invalidations += 1
+    
+    def snapshot(self) -> dict:
+        """Get the counters alongside the pool's current state."""
+        pool = self.engine.pool
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'pool_size': pool.size(),
+                'checked_in': pool.checkedin(),
+                'checked_out': pool.checkedout(),
+                'overflow': pool.overflow(),
+                'max_checked_out': self.max_checked_out,
+                'connects': self.connects,
+                'checkouts': self.checkouts,
+                'invalidations': self.invalidations,
+                'avg_hold_ms': round(self.hold_seconds_total / self.checkouts * 1000, 2) if self.checkouts else 0,
+                'max_hold_ms': round(self.hold_seconds_max * 1000, 2)
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+def _after_begin(session, transaction, connection) -> None:
+    """Apply the route's statement timeout, or the background one outside requests."""
+    config = current_app.config
+    if has_request_context():
+        milliseconds = g.get('statement_timeout')
+        if milliseconds is None and config['DB_PGBOUNCER']:
+            milliseconds = config['DB_STATEMENT_TIMEOUT'] or None
+    else:
+        # Background work may set its own limit in session.info (e.g. report jobs)
+        milliseconds = session.info.get('statement_timeout', config['DB_BACKGROUND_STATEMENT_TIMEOUT'])
+        if not config['DB_PGBOUNCER'] and milliseconds == config['DB_STATEMENT_TIMEOUT']:
+            return
+    if milliseconds is not None:
+        apply_statement_timeout(connection, milliseconds)
+
+
+def init_database(app) -> None:
+    """Configure the engine and hook up statement timeouts and pool metrics."""
+    from extensions import db
+    
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config))
+    db.init_app(app)
+    
+    if app.config['DB_PGBOUNCER'] and app.config['EVENTS_BACKEND'] == 'postgres':
+        print("LISTEN needs a session-pooled connection; the postgres events backend will not work through PgBouncer transaction mode")
+    
+    with app.app_context():
+        pool_metrics.bind(db.engine)
+    if not event.contains(db.session, 'after_begin', _after_begin):
+        event.listen(db.session, 'after_begin', _after_begin)
@@ -1,15 +1,12 @@
 """Flask extensions initialization."""
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from apscheduler.schedulers.background import BackgroundScheduler
+from database import RoutingSession
 
 # Database
-db = SQLAlchemy()
-
-# Migrations
-migrate = Migrate()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 # CORS
 cors = CORS()
@@ -0,0 +1,49 @@
+"""Gunicorn configuration.
+
+Serving modes, chosen with GUNICORN_WORKER_CLASS:
+- gthread (default): WEB_CONCURRENCY processes with WEB_THREADS threads
+  each; a request waiting on the database or a webhook blocks only its
+  thread. An event stream holds a thread for its whole life, so each
+  process serves at most WEB_THREADS - 2 streams.
+- gevent: each process serves up to GUNICORN_WORKER_CONNECTIONS requests
+  on greenlets, with psycopg2 made cooperative by psycogreen. Set
+  DB_POOL_SIZE; greenlets beyond it wait up to DB_POOL_TIMEOUT for a
+  connection. Suits many concurrent event streams.
+- sync: one request per process at a time.
+"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+threads = int(os.environ.get('WEB_THREADS', 4))
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))
+
+# Seconds a worker may go silent before it is restarted, and to finish requests on shutdown
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+
+# Outlive the load balancer's idle timeout so it never reuses a closed connection
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 75))
+
+accesslog = '-'
+errorlog = '-'
+
+# Log the path without its query string, which may carry credentials such as stream tickets
+access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(m)s %(U)s %(H)s" %(s)s %(b)s "%(f)s" "%(a)s"'
+
+
+def post_worker_init(worker):
+    """Prepare a worker once the app is loaded, before it accepts requests."""
+    # Let psycopg2 yield to other greenlets while waiting on the database
+    if worker_class == 'gevent':
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+    
+    # Pay first-request costs before accepting traffic; /health/ready retries on failure
+    from services import AutomationService, WarmupService
+    WarmupService.warm_up(worker.wsgi)
+    
+    # Scheduled jobs run in the worker elected by SCHEDULER_MODE
+    AutomationService.start_scheduler(worker.wsgi)
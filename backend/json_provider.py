@@ -0,0 +1,62 @@
+"""JSON provider for the Flask application."""
+import decimal
+import json
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider encoding with orjson.
+    
+    orjson serializes datetimes, dates and UUIDs natively (as ISO 8601)
+    and writes bytes straight into the response. Calls passing stdlib
+    json arguments fall back to the default provider.
+    """
+    
+    @staticmethod
+    def _default(o):
+        if isinstance(o, decimal.Decimal):
+            return str(o)
+        if hasattr(o, '__html__'):
+            return str(o.__html__())
+        raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+    
+    def _options(self, pretty: bool = False) -> int:
+        options = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if pretty:
+            options |= orjson.OPT_INDENT_2
+        return options
+    
+    def dumps(self, obj, **kwargs) -> str:
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self._default, option=self._options()).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return json.loads(s, **kwargs)
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = self.compact is False or (self.compact is None and self._app.debug)
+        return self._app.response_class(
+            orjson.dumps(obj, default=self._default, option=self._options(pretty)),
+            mimetype=self.mimetype
+        )
+
+
+def init_json_provider(app) -> None:
+    """Install the JSON provider named by JSON_PROVIDER ('orjson' or 'default')."""
+    if app.config['JSON_PROVIDER'] != 'orjson':
+        return
+    if orjson is None:
+        print("orjson is not installed; using the default JSON provider")
+        return
+    app.json = OrjsonProvider(app)
@@ -1,12 +1,22 @@
 """Middleware package."""
 from .jwt_required import jwt_required_middleware
-from .role_required import role_required, admin_required, team_lead_required
-from .auth_middleware import manager_required   # ← ADD THIS
+from .role_required import role_required, admin_required, team_lead_required, manager_required
+from .api_key_required import api_key_required
+from .conditional import conditional
+from .compression import init_compression
+from .statement_timeout import statement_timeout
+from .read_replica import use_replica, init_read_replica
 
 __all__ = [
     'jwt_required_middleware',
     'role_required',
     'admin_required',
     'team_lead_required',
-    'manager_required'
+    'manager_required',
+    'api_key_required',
+    'conditional',
+    'init_compression',
+    'statement_timeout',
+    'use_replica',
+    'init_read_replica'
 ]
@@ -0,0 +1,22 @@
+"""Publisher API key middleware."""
+from functools import wraps
+from flask import jsonify, request, g
+
+
+def api_key_required(fn):
+    """Decorator to authenticate a publisher by its X-API-Key header."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        from services.publisher_service import PublisherService
+        
+        api_key = request.headers.get('X-API-Key')
+        if not api_key:
+            return jsonify({'error': 'Unauthorized', 'message': 'X-API-Key header is required'}), 401
+        
+        publisher = PublisherService.get_publisher_for_key(api_key)
+        if not publisher:
+            return jsonify({'error': 'Unauthorized', 'message': 'Invalid or inactive API key'}), 401
+        
+        g.publisher = publisher
+        return fn(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,47 @@
+"""Response compression middleware."""
+import gzip
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# Response types worth compressing
+COMPRESSIBLE_MIMETYPES = ['application/json', 'text/csv', 'text/plain', 'text/html']
+
+
+def _compress(data: bytes, encoding: str, config) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=config['COMPRESS_BROTLI_QUALITY'])
+    return gzip.compress(data, compresslevel=config['COMPRESS_LEVEL'], mtime=0)
+
+
+def init_compression(app) -> None:
+    """Compress responses over COMPRESS_MIN_SIZE bytes with brotli or gzip.
+    
+    The encoding is negotiated from Accept-Encoding. Streamed responses
+    (the event stream) and file passthroughs are sent as they are.
+    """
+    encodings = ['br', 'gzip'] if brotli else ['gzip']
+    
+    @app.after_request
+    def compress_response(response):
+        min_size = app.config['COMPRESS_MIN_SIZE']
+        if (not min_size or response.mimetype not in COMPRESSIBLE_MIMETYPES
+                or response.direct_passthrough or response.is_streamed):
+            return response
+        
+        response.vary.add('Accept-Encoding')
+        if (request.method == 'HEAD' or not 200 <= response.status_code < 300
+                or response.status_code in (204, 206) or 'Content-Encoding' in response.headers):
+            return response
+        
+        encoding = request.accept_encodings.best_match(encodings)
+        if not encoding or response.content_length is None or response.content_length < min_size:
+            return response
+        
+        response.set_data(_compress(response.get_data(), encoding, app.config))
+        response.headers['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,51 @@
+"""Conditional request middleware."""
+import hashlib
+from datetime import timezone
+from functools import wraps
+from flask import request, make_response, current_app
+from flask_jwt_extended import get_jwt, get_jwt_identity
+
+
+def conditional(version_fn, reference: bool = False):
+    """Decorator answering If-None-Match / If-Modified-Since without running the view.
+    
+    `version_fn(**view_kwargs)` returns (version, last_modified) from a cheap
+    query; version must change whenever the response body would. Returning
+    a None version skips validation (e.g. so the view can answer 404).
+    If-Modified-Since is only honoured when the version is the timestamp
+    itself; a composite version (counts, flags, other tables) can change
+    without last_modified moving, so those clients must send If-None-Match.
+    The ETag also covers the URL and caller, since bodies vary by role.
+    Reference data may be cached for REFERENCE_DATA_MAX_AGE seconds;
+    everything else must be revalidated on each use.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            version, last_modified = version_fn(**kwargs)
+            if version is None:
+                return fn(*args, **kwargs)
+            
+            seed = f"{request.full_path}|{get_jwt_identity()}|{get_jwt().get('role')}|{version}"
+            etag = hashlib.sha1(seed.encode('utf-8')).hexdigest()[:24]
+            timestamp_based = last_modified is not None and version == str(last_modified)
+            if last_modified:
+                last_modified = last_modified.replace(microsecond=0, tzinfo=timezone.utc)
+            
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains_weak(etag)
+            else:
+                not_modified = bool(timestamp_based and request.if_modified_since
+                                    and last_modified <= request.if_modified_since)
+            
+            response = current_app.response_class(status=304) if not_modified else make_response(fn(*args, **kwargs))
+            if response.status_code in (200, 304):
+                response.set_etag(etag, weak=True)
+                if last_modified:
+                    response.last_modified = last_modified
+                max_age = current_app.config['REFERENCE_DATA_MAX_AGE'] if reference else 0
+                response.headers['Cache-Control'] = f"private, max-age={max_age}" if max_age else "private, no-cache"
+                response.vary.add('Authorization')
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,38 @@
+"""Read replica middleware."""
+from functools import wraps
+from flask import request, current_app
+from sqlalchemy import text
+from extensions import db
+from database import RoutingSession, replica_guard
+
+
+def use_replica(fn):
+    """Decorator sending a read-only route's queries to the read replica.
+    
+    The primary is used instead when no replica is configured, when it lags
+    more than REPLICA_MAX_LAG seconds, or when it has not yet replayed the
+    caller's last write (the X-Read-After header echoing X-Write-Position).
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        if 'replica' in current_app.config['SQLALCHEMY_BINDS']:
+            if replica_guard.ready(db.engines['replica'], request.headers.get('X-Read-After')):
+                db.session().info[RoutingSession.REPLICA_KEY] = True
+        return fn(*args, **kwargs)
+    return wrapper
+
+
+def init_read_replica(app) -> None:
+    """Report the primary's WAL position after writes so clients can read them back."""
+    if 'replica' not in app.config['SQLALCHEMY_BINDS']:
+        return
+    
+    @app.after_request
+    def add_write_position(response):
+        if request.method in ('POST', 'PUT', 'PATCH', 'DELETE') and response.status_code < 400:
+            try:
+                position = db.session.execute(text("SELECT pg_current_wal_lsn()::text")).scalar()
+                response.headers['X-Write-Position'] = position
+            except Exception as e:
+                print(f"Could not read WAL position: {str(e)}")
+        return response
@@ -0,0 +1,23 @@
+"""Statement timeout middleware."""
+from functools import wraps
+from flask import g, current_app
+from extensions import db
+from database import apply_statement_timeout
+
+
+def statement_timeout(setting):
+    """Decorator overriding the statement timeout for a route's transactions.
+    
+    `setting` is a config key or a number of milliseconds (0 disables).
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            milliseconds = current_app.config[setting] if isinstance(setting, str) else setting
+            g.statement_timeout = milliseconds
+            # Transactions begun from here on pick the override up when they start
+            if db.session().in_transaction():
+                apply_statement_timeout(db.session.connection(), milliseconds)
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -8,6 +8,12 @@ from .source import Source
 from .stage import Stage
 from .publisher import Publisher
 from .workflow import Workflow
+from .kpi_counter import KpiCounter
+from .lead_duplicate import LeadDuplicate
+from .stage_transition import StageTransition
+from .cohort_snapshot import CohortSnapshot
+from .report_job import ReportJob
+from .event_ticket import EventTicket
 
 __all__ = [
     'User',
@@ -18,5 +24,11 @@ __all__ = [
     'Source',
     'Stage',
     'Publisher',
-    'Workflow'
+    'Workflow',
+    'KpiCounter',
+    'LeadDuplicate',
+    'StageTransition',
+    'CohortSnapshot',
+    'ReportJob',
+    'EventTicket'
 ]
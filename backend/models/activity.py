@@ -7,6 +7,13 @@ class Activity(db.Model):
     """Activity model for tracking all interactions with leads."""
     
     __tablename__ = 'activities'
+    __table_args__ = (
+        # Per-lead history in keyset order (timeline and activity feeds)
+        db.Index('ix_activities_lead_id_created_at_id', 'lead_id', 'created_at', 'id'),
+        # Recent activity feed and per-user report date ranges
+        db.Index('ix_activities_created_at', 'created_at'),
+        db.Index('ix_activities_user_id_created_at', 'user_id', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     
@@ -67,6 +74,41 @@ class Activity(db.Model):
         
         return activity
     
+    @classmethod
+    def log_many(cls, entries: list) -> int:
+        """Insert many activity logs in one statement without committing.
+        
+        Each entry is a dict with lead_id, type, description and optional
+        user_id and metadata. The caller owns the transaction.
+        """
+        if not entries:
+            return 0
+        
+        now = datetime.utcnow()
+        db.session.execute(cls.__table__.insert(), [
+            {
+                'lead_id': entry['lead_id'],
+                'type': entry['type'],
+                'description': entry['description'],
+                'user_id': entry.get('user_id'),
+                'metadata_json': entry.get('metadata') or {},
+                'created_at': now
+            }
+            for entry in entries
+        ])
+        
+        # Update the affected leads' last activity in one statement
+        from .lead import Lead
+        lead_ids = {entry['lead_id'] for entry in entries}
+        db.session.execute(
+            Lead.__table__.update()
+            .where(Lead.__table__.c.id.in_(lead_ids))
+            .values(last_activity_at=now)
+        )
+        Lead.mark_for_rescore(lead_ids)
+        
+        return len(entries)
+    
     @classmethod
     def get_for_lead(cls, lead_id: int, limit: int = None):
         """Get activities for a lead."""
@@ -7,6 +7,10 @@ class Application(db.Model):
     """Application model for student applications."""
     
     __tablename__ = 'applications'
+    __table_args__ = (
+        # Report date ranges
+        db.Index('ix_applications_created_at', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     lead_id = db.Column(db.Integer, db.ForeignKey('leads.id'), nullable=False, unique=True)
@@ -107,10 +111,12 @@ class Application(db.Model):
     @classmethod
     def get_stats(cls) -> dict:
         """Get application statistics."""
-        total = cls.query.count()
-        completed = cls.query.filter_by(overall_status='completed').count()
-        in_progress = cls.query.filter_by(overall_status='in_progress').count()
-        cancelled = cls.query.filter_by(overall_status='cancelled').count()
+        from .kpi_counter import KpiCounter
+        by_status = KpiCounter.get_dimension('application', 'status')
+        total = KpiCounter.get_value('application')
+        completed = by_status.get('completed', 0)
+        in_progress = by_status.get('in_progress', 0)
+        cancelled = by_status.get('cancelled', 0)
         
         return {
             'total': total,
@@ -0,0 +1,22 @@
+"""Cohort snapshot model."""
+from datetime import datetime
+from extensions import db
+
+
+class CohortSnapshot(db.Model):
+    """Stored time-to-conversion statistics of one monthly lead cohort."""
+    
+    __tablename__ = 'cohort_snapshots'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    cohort = db.Column(db.Date, nullable=False, unique=True)  # first day of the month
+    
+    # Closed cohorts are past COHORT_CLOSE_AFTER_DAYS and no longer recomputed
+    closed = db.Column(db.Boolean, default=False, nullable=False)
+    data = db.Column(db.JSON, nullable=False)
+    
+    # Timestamps
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self) -> str:
+        return f'<CohortSnapshot {self.cohort:%Y-%m}{" (closed)" if self.closed else ""}>'
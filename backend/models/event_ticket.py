@@ -0,0 +1,28 @@
+"""Event stream ticket model."""
+from datetime import datetime
+from extensions import db
+
+
+class EventTicket(db.Model):
+    """Short-lived, single-use credential for opening one event stream.
+    
+    EventSource cannot send headers, so clients exchange their access
+    token for a ticket and pass that in the stream URL instead. Only the
+    SHA-256 of the ticket is stored.
+    """
+    
+    __tablename__ = 'event_tickets'
+    
+    ticket_hash = db.Column(db.String(64), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    role = db.Column(db.String(50), nullable=True)
+    
+    # The stream ends when the access token the ticket was issued for expires
+    token_expires_at = db.Column(db.DateTime, nullable=True)
+    
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    
+    def __repr__(self) -> str:
+        return f'<EventTicket user={self.user_id}>'
@@ -0,0 +1,139 @@
+"""KPI counter model."""
+from datetime import date, datetime
+from sqlalchemy import func
+from extensions import db
+
+
+class KpiCounter(db.Model):
+    """Pre-aggregated row counts maintained alongside lead, application and task writes."""
+    
+    __tablename__ = 'kpi_counters'
+    __table_args__ = (
+        db.UniqueConstraint('entity', 'dimension', 'key', name='uq_kpi_counters_entity_dimension_key'),
+        db.Index('ix_kpi_counters_updated_at', 'updated_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(30), nullable=False)  # lead, application, task
+    dimension = db.Column(db.String(30), nullable=False)  # total, status, stage, source, assignee, day, ...
+    key = db.Column(db.String(50), nullable=False)
+    value = db.Column(db.BigInteger, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Key used for the 'total' dimension and for NULL dimension values
+    TOTAL_KEY = 'all'
+    NONE_KEY = 'none'
+    
+    # Counted dimensions per entity: dimension name -> model attribute, or a
+    # tuple of attributes for composite keys joined with ':' (e.g. 'active:5').
+    # Every entity additionally gets a 'total' and a 'day' (created_at) dimension.
+    DIMENSIONS = {
+        'lead': {
+            'status': 'status',
+            'stage': 'stage_id',
+            'source': 'source_id',
+            'assignee': 'assigned_to',
+            'status_assignee': ('status', 'assigned_to')
+        },
+        'application': {
+            'status': 'overall_status',
+            'document_status': 'document_status',
+            'fee_status': 'fee_status',
+            'admission_status': 'admission_status',
+            'enrollment_status': 'enrollment_status'
+        },
+        'task': {
+            'status': 'status',
+            'priority': 'priority',
+            'assignee': 'assigned_to',
+            'status_assignee': ('status', 'assigned_to')
+        }
+    }
+    
+    def to_dict(self) -> dict:
+        """Convert counter to dictionary."""
+        return {
+            'entity': self.entity,
+            'dimension': self.dimension,
+            'key': self.key,
+            'value': self.value,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+    
+    @classmethod
+    def format_key(cls, value) -> str:
+        """Convert a dimension value to its counter key."""
+        if value is None:
+            return cls.NONE_KEY
+        if isinstance(value, datetime):
+            return value.date().isoformat()
+        if isinstance(value, date):
+            return value.isoformat()
+        return str(value)
+    
+    @classmethod
+    def dimension_attrs(cls, entity: str) -> list:
+        """Get every model attribute the dimensions of an entity depend on."""
+        attrs = []
+        for attr in cls.DIMENSIONS[entity].values():
+            for name in (attr if isinstance(attr, tuple) else (attr,)):
+                if name not in attrs:
+                    attrs.append(name)
+        return attrs
+    
+    @classmethod
+    def composite_key(cls, *values) -> str:
+        """Build the key of a composite dimension."""
+        return ':'.join(cls.format_key(value) for value in values)
+    
+    @classmethod
+    def get_values(cls, entity: str, dimension: str, keys: list) -> dict:
+        """Get several counter values of a dimension in one query."""
+        keys = [cls.format_key(key) for key in keys]
+        rows = db.session.query(cls.key, cls.value).filter(
+            cls.entity == entity,
+            cls.dimension == dimension,
+            cls.key.in_(keys)
+        ).all()
+        values = {key: 0 for key in keys}
+        values.update({row.key: int(row.value) for row in rows})
+        return values
+    
+    @classmethod
+    def get_value(cls, entity: str, dimension: str = 'total', key=TOTAL_KEY) -> int:
+        """Get a single counter value."""
+        value = db.session.query(cls.value).filter_by(
+            entity=entity,
+            dimension=dimension,
+            key=cls.format_key(key)
+        ).scalar()
+        return int(value or 0)
+    
+    @classmethod
+    def get_dimension(cls, entity: str, dimension: str) -> dict:
+        """Get all counter values for a dimension keyed by dimension value."""
+        rows = db.session.query(cls.key, cls.value).filter_by(
+            entity=entity,
+            dimension=dimension
+        ).all()
+        return {row.key: int(row.value) for row in rows if row.value}
+    
+    @classmethod
+    def get_range_sum(cls, entity: str, dimension: str, start_key: str, end_key: str) -> int:
+        """Sum counter values with start_key <= key < end_key (e.g. day buckets of a month)."""
+        value = db.session.query(db.func.sum(cls.value)).filter(
+            cls.entity == entity,
+            cls.dimension == dimension,
+            cls.key >= start_key,
+            cls.key < end_key
+        ).scalar()
+        return int(value or 0)
+    
+    @classmethod
+    def get_version(cls) -> tuple:
+        """Get a (version, last_modified) validator that changes with every counted write."""
+        last_modified = db.session.query(func.max(cls.updated_at)).scalar()
+        return str(last_modified), last_modified
+    
+    def __repr__(self) -> str:
+        return f'<KpiCounter {self.entity}.{self.dimension}[{self.key}]={self.value}>'
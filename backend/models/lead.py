@@ -1,5 +1,8 @@
 """Lead model."""
+import hashlib
 from datetime import datetime, timedelta
+from sqlalchemy import func
+from sqlalchemy.orm import validates
 from extensions import db
 
 
@@ -7,33 +10,160 @@ class Lead(db.Model):
     """Lead model for prospective students."""
     
     __tablename__ = 'leads'
+    __table_args__ = (
+        # Serves "ORDER BY score DESC, id DESC" with a backward index scan
+        db.Index('ix_leads_score_id', 'score', 'id'),
+        # Report date ranges
+        db.Index('ix_leads_created_at', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     first_name = db.Column(db.String(100), nullable=False)
     last_name = db.Column(db.String(100), nullable=False)
     email = db.Column(db.String(120), nullable=False, index=True)
+    email_key = db.Column(db.String(64), nullable=True, unique=True)  # sha256 of normalized email
     phone = db.Column(db.String(20), nullable=True)
     
+    # Duplicate-detection blocking keys
+    email_local_key = db.Column(db.String(64), nullable=True, index=True)  # normalized email local part
+    phone_key = db.Column(db.String(10), nullable=True, index=True)  # last 10 phone digits
+    name_key = db.Column(db.String(5), nullable=True, index=True)  # last name soundex + first initial
+    
     # Foreign Keys
     source_id = db.Column(db.Integer, db.ForeignKey('sources.id'), nullable=True)
     stage_id = db.Column(db.Integer, db.ForeignKey('stages.id'), nullable=True)
     assigned_to = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    publisher_id = db.Column(db.Integer, db.ForeignKey('publishers.id'), nullable=True, index=True)
+    merged_into_id = db.Column(db.Integer, db.ForeignKey('leads.id'), nullable=True)
     
     # Status
-    status = db.Column(db.String(50), default='active')  # active, converted, lost, dormant
+    status = db.Column(db.String(50), default='active')  # active, converted, lost, dormant, merged
     re_inquiry_count = db.Column(db.Integer, default=0)
     
+    # Priority score (0-100), maintained by the scoring service
+    score = db.Column(db.Float, default=0, nullable=False)
+    scored_at = db.Column(db.DateTime, nullable=True)
+    
     # Timestamps
     last_activity_at = db.Column(db.DateTime, default=datetime.utcnow)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Session info key holding lead ids to rescore on commit
+    RESCORE_KEY = 'rescore_lead_ids'
+    
+    # Mailbox providers that ignore dots and/or "+tag" suffixes in the local part
+    EMAIL_PROVIDER_RULES = {
+        'gmail.com': {'strip_dots': True, 'strip_tag': True},
+        'googlemail.com': {'strip_dots': True, 'strip_tag': True, 'domain': 'gmail.com'},
+        'outlook.com': {'strip_tag': True},
+        'hotmail.com': {'strip_tag': True},
+        'live.com': {'strip_tag': True},
+        'icloud.com': {'strip_tag': True},
+        'me.com': {'strip_tag': True, 'domain': 'icloud.com'},
+        'protonmail.com': {'strip_tag': True},
+        'proton.me': {'strip_tag': True, 'domain': 'protonmail.com'}
+    }
+    
     # Relationships
     application = db.relationship('Application', backref='lead', uselist=False, lazy='joined')
     tasks = db.relationship('Task', backref='lead', lazy='dynamic')
     activities = db.relationship('Activity', backref='lead', lazy='dynamic',
                                   order_by='Activity.created_at.desc()')
     
+    @validates('email')
+    def _set_email_key(self, key, email):
+        self.email_key = Lead.email_key_for(email)
+        self.email_local_key = Lead.email_local_key_for(email)
+        return email
+    
+    @validates('phone')
+    def _set_phone_key(self, key, phone):
+        self.phone_key = Lead.phone_key_for(phone)
+        return phone
+    
+    @validates('first_name', 'last_name')
+    def _set_name_key(self, key, value):
+        first_name = value if key == 'first_name' else self.first_name
+        last_name = value if key == 'last_name' else self.last_name
+        self.name_key = Lead.name_key_for(first_name, last_name)
+        return value
+    
+    @classmethod
+    def normalize_email(cls, email: str) -> str:
+        """Canonicalize an email: trimmed, lowercased, provider aliases folded."""
+        email = (email or '').strip().lower()
+        if email.count('@') != 1:
+            return email
+        
+        local, domain = email.split('@')
+        rules = cls.EMAIL_PROVIDER_RULES.get(domain, {})
+        if rules.get('strip_tag'):
+            local = local.split('+', 1)[0]
+        if rules.get('strip_dots'):
+            local = local.replace('.', '')
+        return f"{local}@{rules.get('domain', domain)}"
+    
+    @classmethod
+    def email_key_for(cls, email: str) -> str:
+        """Get the dedupe key (hashed normalized email) for an email."""
+        if not email:
+            return None
+        return hashlib.sha256(cls.normalize_email(email).encode('utf-8')).hexdigest()
+    
+    @classmethod
+    def email_local_key_for(cls, email: str) -> str:
+        """Get the normalized local part of an email."""
+        local = cls.normalize_email(email).split('@', 1)[0]
+        return local or None
+    
+    @classmethod
+    def phone_key_for(cls, phone: str) -> str:
+        """Get the last ten digits of a phone number, ignoring formatting and country code."""
+        digits = ''.join(ch for ch in (phone or '') if ch.isdigit())
+        return digits[-10:] if len(digits) >= 7 else None
+    
+    @staticmethod
+    def soundex(name: str) -> str:
+        """Get the American Soundex code of a name."""
+        codes = {}
+        for letters, code in (('bfpv', '1'), ('cgjkqsxz', '2'), ('dt', '3'),
+                              ('l', '4'), ('mn', '5'), ('r', '6')):
+            for letter in letters:
+                codes[letter] = code
+        
+        letters = [ch for ch in (name or '').lower() if ch.isalpha()]
+        if not letters:
+            return None
+        
+        result = letters[0].upper()
+        previous = codes.get(letters[0])
+        for letter in letters[1:]:
+            code = codes.get(letter)
+            if code and code != previous:
+                result += code
+            # 'h' and 'w' do not separate letters with the same code
+            if letter not in 'hw':
+                previous = code
+        return (result + '000')[:4]
+    
+    @classmethod
+    def name_key_for(cls, first_name: str, last_name: str) -> str:
+        """Get the name blocking key: last name soundex plus first initial."""
+        code = cls.soundex(last_name)
+        initial = (first_name or '').strip()[:1].upper()
+        return f"{code}{initial}" if code and initial else None
+    
+    @classmethod
+    def dedupe_keys(cls, first_name: str, last_name: str, email: str, phone: str) -> dict:
+        """Get every dedupe column value, for rows written with bulk statements."""
+        return {
+            'email_key': cls.email_key_for(email),
+            'email_local_key': cls.email_local_key_for(email),
+            'phone_key': cls.phone_key_for(phone),
+            'name_key': cls.name_key_for(first_name, last_name)
+        }
+    
     def get_full_name(self) -> str:
         """Get full name."""
         return f"{self.first_name} {self.last_name}".strip()
@@ -70,8 +200,11 @@ class Lead(db.Model):
             'stage': self.stage.to_dict() if self.stage else None,
             'assigned_to': self.assigned_to,
             'assigned_user': self.assigned_user.to_dict() if self.assigned_user else None,
+            'publisher_id': self.publisher_id,
+            'merged_into_id': self.merged_into_id,
             'status': self.status,
             're_inquiry_count': self.re_inquiry_count,
+            'score': round(self.score or 0, 2),
             'last_activity_at': self.last_activity_at.isoformat() if self.last_activity_at else None,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
@@ -97,8 +230,39 @@ class Lead(db.Model):
     
     @classmethod
     def get_by_email(cls, email: str):
-        """Get lead by email."""
-        return cls.query.filter_by(email=email).first()
+        """Get lead by email, matching on the normalized email key."""
+        return cls.query.filter_by(email_key=cls.email_key_for(email)).first()
+    
+    @classmethod
+    def get_version(cls, lead_id: int) -> tuple:
+        """Get a (version, last_modified) validator for one lead's detail view.
+        
+        Covers the lead row plus the reference rows embedded in to_dict();
+        last_modified is the newest of those timestamps.
+        """
+        from .stage import Stage
+        from .source import Source
+        from .user import User
+        from .application import Application
+        
+        row = db.session.query(
+            cls.updated_at,
+            cls.last_activity_at,
+            cls.scored_at,
+            db.session.query(func.max(Stage.updated_at)).scalar_subquery(),
+            db.session.query(func.max(Source.updated_at)).scalar_subquery(),
+            db.session.query(User.updated_at).filter(User.id == cls.assigned_to).scalar_subquery(),
+            db.session.query(Application.id).filter(Application.lead_id == cls.id).exists()
+        ).filter(cls.id == lead_id).first()
+        if not row:
+            return None, None
+        timestamps = [value for value in row if isinstance(value, datetime)]
+        return '|'.join(str(value) for value in row), max(timestamps, default=None)
+    
+    @classmethod
+    def mark_for_rescore(cls, lead_ids) -> None:
+        """Queue leads for rescoring when the current transaction commits."""
+        db.session.info.setdefault(cls.RESCORE_KEY, set()).update(lead_ids)
     
     @classmethod
     def get_inactive_leads(cls, hours: int = 48):
@@ -0,0 +1,56 @@
+"""Lead duplicate model."""
+from datetime import datetime
+from extensions import db
+
+
+class LeadDuplicate(db.Model):
+    """Candidate pair of leads that likely belong to the same student."""
+    
+    __tablename__ = 'lead_duplicates'
+    __table_args__ = (
+        db.UniqueConstraint('lead_id', 'duplicate_id', name='uq_lead_duplicates_pair'),
+        db.Index('ix_lead_duplicates_status_score', 'status', 'score'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    
+    # Pairs are stored once, with lead_id < duplicate_id
+    lead_id = db.Column(db.Integer, db.ForeignKey('leads.id'), nullable=False, index=True)
+    duplicate_id = db.Column(db.Integer, db.ForeignKey('leads.id'), nullable=False, index=True)
+    
+    score = db.Column(db.Float, nullable=False)
+    reasons = db.Column(db.JSON, nullable=True)  # per-signal similarity scores
+    status = db.Column(db.String(20), default='pending', nullable=False)  # pending, merged, dismissed
+    
+    # Resolution
+    resolved_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    resolved_at = db.Column(db.DateTime, nullable=True)
+    
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Relationships
+    lead = db.relationship('Lead', foreign_keys=[lead_id])
+    duplicate = db.relationship('Lead', foreign_keys=[duplicate_id])
+    
+    STATUSES = ['pending', 'merged', 'dismissed']
+    
+    def to_dict(self, mask_sensitive: bool = False) -> dict:
+        """Convert duplicate pair to dictionary."""
+        return {
+            'id': self.id,
+            'lead_id': self.lead_id,
+            'lead': self.lead.to_dict(mask_sensitive=mask_sensitive) if self.lead else None,
+            'duplicate_id': self.duplicate_id,
+            'duplicate': self.duplicate.to_dict(mask_sensitive=mask_sensitive) if self.duplicate else None,
+            'score': round(self.score, 3),
+            'reasons': self.reasons,
+            'status': self.status,
+            'resolved_by': self.resolved_by,
+            'resolved_at': self.resolved_at.isoformat() if self.resolved_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+    
+    def __repr__(self) -> str:
+        return f'<LeadDuplicate {self.lead_id}~{self.duplicate_id} ({self.score:.2f})>'
@@ -27,6 +27,11 @@ class Publisher(db.Model):
     leads_submitted = db.Column(db.Integer, default=0)
     leads_converted = db.Column(db.Integer, default=0)
     
+    # Monthly quota token bucket: holds up to lead_limit tokens and refills
+    # at lead_limit per QUOTA_PERIOD_DAYS. NULL tokens means a full bucket.
+    quota_tokens = db.Column(db.Float, nullable=True)
+    quota_refilled_at = db.Column(db.DateTime, nullable=True)
+    
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -35,6 +40,8 @@ class Publisher(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
     user = db.relationship('User', backref='publisher_profile')
     
+    QUOTA_PERIOD_DAYS = 30
+    
     def to_dict(self) -> dict:
         """Convert publisher to dictionary."""
         return {
@@ -47,6 +54,7 @@ class Publisher(db.Model):
             'is_active': self.is_active,
             'leads_submitted': self.leads_submitted,
             'leads_converted': self.leads_converted,
+            'quota_available': int(self.get_available_quota()),
             'conversion_rate': (self.leads_converted / self.leads_submitted * 100) 
                               if self.leads_submitted > 0 else 0,
             'user_id': self.user_id,
@@ -54,9 +62,13 @@ class Publisher(db.Model):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
     
-    def increment_leads_submitted(self) -> None:
-        """Increment leads submitted count."""
-        self.leads_submitted += 1
+    def increment_leads_submitted(self, count: int = 1) -> None:
+        """Increment leads submitted count atomically in the database."""
+        db.session.execute(
+            db.update(Publisher)
+            .where(Publisher.id == self.id)
+            .values(leads_submitted=Publisher.leads_submitted + count)
+        )
         db.session.commit()
     
     def increment_leads_converted(self) -> None:
@@ -64,11 +76,20 @@ class Publisher(db.Model):
         self.leads_converted += 1
         db.session.commit()
     
+    def get_available_quota(self) -> float:
+        """Get the tokens currently in the monthly quota bucket."""
+        limit = self.lead_limit or 0
+        if self.quota_tokens is None or self.quota_refilled_at is None:
+            return float(limit)
+        elapsed = (datetime.utcnow() - self.quota_refilled_at).total_seconds()
+        refill = limit * elapsed / (self.QUOTA_PERIOD_DAYS * 86400)
+        return min(float(limit), self.quota_tokens + refill)
+    
     def can_submit_lead(self) -> bool:
         """Check if publisher can submit more leads."""
         if not self.is_active:
             return False
-        return self.leads_submitted < self.lead_limit
+        return self.get_available_quota() >= 1
     
     @classmethod
     def get_active_publishers(cls):
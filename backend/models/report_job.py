@@ -0,0 +1,63 @@
+"""Report job model."""
+import uuid
+from datetime import datetime
+from extensions import db
+
+
+class ReportJob(db.Model):
+    """Report computed in the background, with its stored result."""
+    
+    __tablename__ = 'report_jobs'
+    
+    # Job IDs are handed to clients, so they are not guessable
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    
+    # Spec: report name and resolved parameters; the hash identifies identical specs
+    report = db.Column(db.String(50), nullable=False)
+    params = db.Column(db.JSON, nullable=False)
+    spec_hash = db.Column(db.String(64), nullable=False)
+    
+    # Progress
+    status = db.Column(db.String(20), default='queued', nullable=False)  # queued, running, completed, failed
+    progress = db.Column(db.Integer, default=0, nullable=False)  # percent
+    result = db.Column(db.JSON, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    
+    requested_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    started_at = db.Column(db.DateTime, nullable=True)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)  # last sign of life from the running worker
+    finished_at = db.Column(db.DateTime, nullable=True)
+    expires_at = db.Column(db.DateTime, nullable=True)
+    
+    STATUSES = ['queued', 'running', 'completed', 'failed']
+    ACTIVE_STATUSES = ['queued', 'running']
+    
+    __table_args__ = (
+        # At most one queued or running job per spec
+        db.Index('uq_report_jobs_active_spec_hash', spec_hash, unique=True,
+                 postgresql_where=status.in_(ACTIVE_STATUSES)),
+        db.Index('ix_report_jobs_expires_at', expires_at),
+    )
+    
+    def to_dict(self) -> dict:
+        """Convert report job to dictionary (without the result)."""
+        return {
+            'id': self.id,
+            'report': self.report,
+            'params': self.params,
+            'status': self.status,
+            'progress': self.progress,
+            'error': self.error,
+            'requested_by': self.requested_by,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'heartbeat_at': self.heartbeat_at.isoformat() if self.heartbeat_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None
+        }
+    
+    def __repr__(self) -> str:
+        return f'<ReportJob {self.report} {self.id} ({self.status})>'
@@ -1,5 +1,6 @@
 """Source model."""
 from datetime import datetime
+from sqlalchemy import func
 from extensions import db
 
 
@@ -37,5 +38,11 @@ class Source(db.Model):
         """Get all active sources."""
         return cls.query.filter_by(is_active=True).all()
     
+    @classmethod
+    def get_version(cls) -> tuple:
+        """Get a cheap (version, last_modified) validator for the source list."""
+        last_modified, count = db.session.query(func.max(cls.updated_at), func.count(cls.id)).one()
+        return f"{count}:{last_modified}", last_modified
+    
     def __repr__(self) -> str:
         return f'<Source {self.name} ({self.category})>'
@@ -1,5 +1,6 @@
 """Stage model."""
 from datetime import datetime
+from sqlalchemy import func
 from extensions import db
 
 
@@ -57,5 +58,11 @@ class Stage(db.Model):
         """Get all active application stages ordered by order."""
         return cls.query.filter_by(type='application', is_active=True).order_by(cls.order).all()
     
+    @classmethod
+    def get_version(cls) -> tuple:
+        """Get a cheap (version, last_modified) validator for the stage list."""
+        last_modified, count = db.session.query(func.max(cls.updated_at), func.count(cls.id)).one()
+        return f"{count}:{last_modified}", last_modified
+    
     def __repr__(self) -> str:
         return f'<Stage {self.name} ({self.type})>'
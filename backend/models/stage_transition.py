@@ -0,0 +1,56 @@
+"""Stage transition model."""
+from datetime import datetime
+from extensions import db
+
+
+class StageTransition(db.Model):
+    """One move of a lead from a stage to another, for funnel and time-in-stage reports."""
+    
+    __tablename__ = 'stage_transitions'
+    __table_args__ = (
+        # Per-lead history in order (stage intervals)
+        db.Index('ix_stage_transitions_lead_id_changed_at_id', 'lead_id', 'changed_at', 'id'),
+        db.Index('ix_stage_transitions_to_stage_id_changed_at', 'to_stage_id', 'changed_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    
+    # Foreign Keys
+    lead_id = db.Column(db.Integer, db.ForeignKey('leads.id', ondelete='CASCADE'), nullable=False)
+    from_stage_id = db.Column(db.Integer, db.ForeignKey('stages.id'), nullable=True)
+    to_stage_id = db.Column(db.Integer, db.ForeignKey('stages.id'), nullable=False)
+    changed_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    
+    # Source stage_change activity for rows created by the backfill
+    activity_id = db.Column(db.Integer, unique=True, nullable=True)
+    
+    # Timestamps
+    changed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    def to_dict(self) -> dict:
+        """Convert stage transition to dictionary."""
+        return {
+            'id': self.id,
+            'lead_id': self.lead_id,
+            'from_stage_id': self.from_stage_id,
+            'to_stage_id': self.to_stage_id,
+            'changed_by': self.changed_by,
+            'changed_at': self.changed_at.isoformat() if self.changed_at else None
+        }
+    
+    @classmethod
+    def record(cls, lead_id: int, from_stage_id: int, to_stage_id: int,
+               user_id: int = None) -> 'StageTransition':
+        """Add a transition to the session; it is saved with the caller's commit."""
+        transition = cls(
+            lead_id=lead_id,
+            from_stage_id=from_stage_id,
+            to_stage_id=to_stage_id,
+            changed_by=user_id,
+            changed_at=datetime.utcnow()
+        )
+        db.session.add(transition)
+        return transition
+    
+    def __repr__(self) -> str:
+        return f'<StageTransition {self.from_stage_id}->{self.to_stage_id} (Lead: {self.lead_id})>'
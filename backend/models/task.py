@@ -20,6 +20,16 @@ class Task(db.Model):
     status = db.Column(db.String(50), default='pending')  # pending, in_progress, completed, cancelled
     priority = db.Column(db.String(20), default='medium')  # low, medium, high, urgent
     
+    # Ordinal of priority (low=1 .. urgent=4) so queues sort by urgency, not alphabetically
+    priority_rank = db.Column(
+        db.SmallInteger,
+        db.Computed(
+            "CASE priority WHEN 'low' THEN 1 WHEN 'medium' THEN 2 "
+            "WHEN 'high' THEN 3 WHEN 'urgent' THEN 4 ELSE 2 END",
+            persisted=True
+        )
+    )
+    
     # Foreign Keys
     assigned_to = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
     lead_id = db.Column(db.Integer, db.ForeignKey('leads.id'), nullable=True)
@@ -34,8 +44,22 @@ class Task(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Task queue indexes: status filter, then due date and urgency in queue order
+    __table_args__ = (
+        db.Index('ix_tasks_status_due_date_priority_rank',
+                 status, due_date, priority_rank.desc()),
+        db.Index('ix_tasks_assigned_to_status_due_date_priority_rank',
+                 assigned_to, status, due_date, priority_rank.desc()),
+        # Per-lead timeline keysets
+        db.Index('ix_tasks_lead_id_created_at_id', lead_id, created_at, id),
+        db.Index('ix_tasks_lead_id_completed_at_id', lead_id, completed_at, id),
+        # Report date ranges on completion
+        db.Index('ix_tasks_completed_at', completed_at),
+    )
+    
     # Status options
     STATUSES = ['pending', 'in_progress', 'completed', 'cancelled']
+    OPEN_STATUSES = ['pending', 'in_progress']
     PRIORITIES = ['low', 'medium', 'high', 'urgent']
     TYPES = ['follow_up', 'call', 'email', 'meeting', 'document_collection', 'fee_reminder', 'system']
     
@@ -86,29 +110,41 @@ class Task(db.Model):
         self.completion_notes = None
         db.session.commit()
     
+    @classmethod
+    def queue_order(cls) -> tuple:
+        """Get the task queue ordering: soonest due first, most urgent first."""
+        return (cls.due_date.asc(), cls.priority_rank.desc())
+    
     @classmethod
     def get_pending_for_user(cls, user_id: int):
         """Get pending tasks for a user."""
         return cls.query.filter_by(
             assigned_to=user_id,
             status='pending'
-        ).order_by(cls.due_date.asc()).all()
+        ).order_by(*cls.queue_order()).all()
+    
+    @classmethod
+    def overdue_criteria(cls, now: datetime = None) -> tuple:
+        """Get SQL filter criteria matching overdue tasks."""
+        return (
+            cls.due_date < (now or datetime.utcnow()),
+            cls.status.in_(cls.OPEN_STATUSES)
+        )
     
     @classmethod
     def get_overdue_tasks(cls):
         """Get all overdue tasks."""
-        return cls.query.filter(
-            cls.due_date < datetime.utcnow(),
-            cls.status.in_(['pending', 'in_progress'])
-        ).all()
+        return cls.query.filter(*cls.overdue_criteria()).all()
     
     @classmethod
     def get_stats(cls) -> dict:
         """Get task statistics."""
-        total = cls.query.count()
-        pending = cls.query.filter_by(status='pending').count()
-        completed = cls.query.filter_by(status='completed').count()
-        overdue = len(cls.get_overdue_tasks())
+        from .kpi_counter import KpiCounter
+        by_status = KpiCounter.get_dimension('task', 'status')
+        total = KpiCounter.get_value('task')
+        pending = by_status.get('pending', 0)
+        completed = by_status.get('completed', 0)
+        overdue = cls.query.filter(*cls.overdue_criteria()).count()
         
         return {
             'total': total,
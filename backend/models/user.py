@@ -1,5 +1,6 @@
 """User model."""
 from datetime import datetime
+from sqlalchemy import func
 from extensions import db
 import bcrypt
 
@@ -15,6 +16,10 @@ class User(db.Model):
     password_hash = db.Column(db.String(255), nullable=False)
     role = db.Column(db.String(50), nullable=False, default='Executive')
     is_active = db.Column(db.Boolean, default=True, nullable=False)
+    
+    # Lead assignment
+    assignment_weight = db.Column(db.Integer, default=1, nullable=False)  # Relative share for weighted assignment
+    last_assigned_at = db.Column(db.DateTime, nullable=True)  # Round-robin cursor
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -50,6 +55,7 @@ class User(db.Model):
             'email': self.email,
             'role': self.role,
             'is_active': self.is_active,
+            'assignment_weight': self.assignment_weight,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
@@ -61,5 +67,11 @@ class User(db.Model):
             roles = [roles]
         return self.role in roles
     
+    @classmethod
+    def get_version(cls) -> tuple:
+        """Get a cheap (version, last_modified) validator for the user list."""
+        last_modified, count = db.session.query(func.max(cls.updated_at), func.count(cls.id)).one()
+        return f"{count}:{last_modified}", last_modified
+    
     def __repr__(self) -> str:
         return f'<User {self.email} ({self.role})>'
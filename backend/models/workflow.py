@@ -77,9 +77,9 @@ class Workflow(db.Model):
         """Get parsed actions."""
         return self.actions_json or []
     
-    def increment_execution(self) -> None:
+    def increment_execution(self, count: int = 1) -> None:
         """Increment execution count."""
-        self.execution_count += 1
+        self.execution_count += count
         self.last_executed_at = datetime.utcnow()
         db.session.commit()
     
@@ -6,6 +6,9 @@ from .task_routes import task_bp
 from .activity_routes import activity_bp
 from .report_routes import report_bp
 from .admin_routes import admin_bp
+from .publisher_routes import publisher_bp
+from .event_routes import event_bp
+from .health_routes import health_bp
 
 __all__ = [
     'auth_bp',
@@ -14,5 +17,8 @@ __all__ = [
     'task_bp',
     'activity_bp',
     'report_bp',
-    'admin_bp'
+    'admin_bp',
+    'publisher_bp',
+    'event_bp',
+    'health_bp'
 ]
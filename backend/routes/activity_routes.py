@@ -3,13 +3,15 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import Activity
 from extensions import db
-from middleware import admin_required
+from services import CountService
+from middleware import admin_required, use_replica
 
 activity_bp = Blueprint('activities', __name__, url_prefix='/activities')
 
 
 @activity_bp.route('/', methods=['GET'])
 @jwt_required()
+@use_replica
 def get_activities():
     """Get activities with filters."""
     try:
@@ -29,15 +31,10 @@ def get_activities():
         # Order by created_at desc
         query = query.order_by(Activity.created_at.desc())
         
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-        
-        return jsonify({
-            'items': [activity.to_dict() for activity in pagination.items],
-            'total': pagination.total,
-            'pages': pagination.pages,
-            'current_page': page,
-            'per_page': per_page
-        }), 200
+        exact = request.args.get('exact_count', 'false').lower() == 'true'
+        result = CountService.paginate(query, page, per_page, exact)
+        result['items'] = [activity.to_dict() for activity in result['items']]
+        return jsonify(result), 200
     
     except Exception as e:
         return jsonify({'error': 'Server error', 'message': str(e)}), 500
@@ -45,6 +42,7 @@ def get_activities():
 
 @activity_bp.route('/<int:lead_id>', methods=['GET'])
 @jwt_required()
+@use_replica
 def get_lead_activities(lead_id):
     """Get activities for a specific lead."""
     try:
@@ -91,6 +89,7 @@ def create_activity():
 
 @activity_bp.route('/recent', methods=['GET'])
 @jwt_required()
+@use_replica
 def get_recent_activities():
     """Get recent activities across all leads."""
     try:
@@ -3,7 +3,7 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
 from models import Stage, Source, Workflow
 from extensions import db
-from middleware import admin_required
+from middleware import admin_required, conditional
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
@@ -11,6 +11,7 @@ admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 # Stage Management
 @admin_bp.route('/stages', methods=['GET'])
 @jwt_required()
+@conditional(lambda: Stage.get_version(), reference=True)
 def get_stages():
     """Get all stages."""
     try:
@@ -85,6 +86,7 @@ def update_stage(stage_id):
 # Source Management
 @admin_bp.route('/sources', methods=['GET'])
 @jwt_required()
+@conditional(lambda: Source.get_version(), reference=True)
 def get_sources():
     """Get all sources."""
     try:
@@ -252,7 +254,16 @@ def delete_workflow(workflow_id):
 def get_system_stats():
     """Get system-wide statistics (Admin only)."""
     try:
-        from models import User, Lead, Application, Task
+        from models import User, KpiCounter, Activity
+        from services import CountService
+        
+        # Activities have no counters; the total is estimated on large tables
+        exact = request.args.get('exact_count', 'false').lower() == 'true'
+        activity_total, activity_approximate = CountService.count(Activity.query, exact)
+        
+        lead_status = KpiCounter.get_dimension('lead', 'status')
+        application_status = KpiCounter.get_dimension('application', 'status')
+        task_status = KpiCounter.get_dimension('task', 'status')
         
         stats = {
             'users': {
@@ -261,19 +272,23 @@ def get_system_stats():
                 'by_role': {}
             },
             'leads': {
-                'total': Lead.query.count(),
-                'active': Lead.query.filter_by(status='active').count(),
-                'converted': Lead.query.filter_by(status='converted').count()
+                'total': KpiCounter.get_value('lead'),
+                'active': lead_status.get('active', 0),
+                'converted': lead_status.get('converted', 0)
             },
             'applications': {
-                'total': Application.query.count(),
-                'in_progress': Application.query.filter_by(overall_status='in_progress').count(),
-                'completed': Application.query.filter_by(overall_status='completed').count()
+                'total': KpiCounter.get_value('application'),
+                'in_progress': application_status.get('in_progress', 0),
+                'completed': application_status.get('completed', 0)
             },
             'tasks': {
-                'total': Task.query.count(),
-                'pending': Task.query.filter_by(status='pending').count(),
-                'completed': Task.query.filter_by(status='completed').count()
+                'total': KpiCounter.get_value('task'),
+                'pending': task_status.get('pending', 0),
+                'completed': task_status.get('completed', 0)
+            },
+            'activities': {
+                'total': activity_total,
+                'total_is_approximate': activity_approximate
             }
         }
         
@@ -286,3 +301,15 @@ def get_system_stats():
     
     except Exception as e:
         return jsonify({'error': 'Server error', 'message': str(e)}), 500
+
+
+@admin_bp.route('/db-pool', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_db_pool_metrics():
+    """Get this worker's database connection pool metrics (Admin only)."""
+    try:
+        from database import pool_metrics
+        return jsonify(pool_metrics.snapshot()), 200
+    except Exception as e:
+        return jsonify({'error': 'Server error', 'message': str(e)}), 500
@@ -3,13 +3,15 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import Application
 from extensions import db
-from middleware import admin_required
+from services import CountService
+from middleware import admin_required, use_replica
 
 application_bp = Blueprint('applications', __name__, url_prefix='/applications')
 
 
 @application_bp.route('/', methods=['GET'])
 @jwt_required()
+@use_replica
 def get_applications():
     """Get applications with pagination and filters."""
     try:
@@ -33,15 +35,10 @@ def get_applications():
         # Order by created_at desc
         query = query.order_by(Application.created_at.desc())
         
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-        
-        return jsonify({
-            'items': [app.to_dict() for app in pagination.items],
-            'total': pagination.total,
-            'pages': pagination.pages,
-            'current_page': page,
-            'per_page': per_page
-        }), 200
+        exact = request.args.get('exact_count', 'false').lower() == 'true'
+        result = CountService.paginate(query, page, per_page, exact)
+        result['items'] = [app.to_dict() for app in result['items']]
+        return jsonify(result), 200
     
     except Exception as e:
         return jsonify({'error': 'Server error', 'message': str(e)}), 500
@@ -147,6 +144,7 @@ def delete_application(application_id):
 
 @application_bp.route('/stats', methods=['GET'])
 @jwt_required()
+@use_replica
 def get_stats():
     """Get application statistics."""
     try:
@@ -2,7 +2,8 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from services import AuthService
-from middleware import admin_required
+from models import User
+from middleware import admin_required, conditional
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
 
@@ -122,6 +123,7 @@ def delete_user(user_id):
 
 @auth_bp.route('/executives', methods=['GET'])
 @jwt_required()
+@conditional(lambda: User.get_version(), reference=True)
 def get_executives():
     """Get all active executives for lead assignment."""
     try:
@@ -0,0 +1,95 @@
+"""Event stream routes."""
+import calendar
+import json
+import queue
+import time
+from datetime import datetime
+from flask import Blueprint, Response, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt, decode_token
+from services.event_service import EventService
+
+event_bp = Blueprint('events', __name__, url_prefix='/events')
+
+
+@event_bp.route('/ticket', methods=['POST'])
+@jwt_required()
+def issue_ticket():
+    """Exchange the access token for a single-use event stream ticket.
+    
+    EventSource cannot send headers; passing the ticket in the stream URL
+    keeps the access token out of URLs and logs.
+    """
+    try:
+        claims = get_jwt()
+        token_expires_at = datetime.utcfromtimestamp(claims['exp']) if claims.get('exp') else None
+        ticket = EventService.issue_ticket(int(get_jwt_identity()), claims.get('role'), token_expires_at)
+        return jsonify({
+            'ticket': ticket,
+            'expires_in': current_app.config['EVENT_TICKET_TTL']
+        }), 201
+    
+    except Exception as e:
+        return jsonify({'error': 'Server error', 'message': str(e)}), 500
+
+
+@event_bp.route('/stream', methods=['GET'])
+def stream_events():
+    """Stream lead, task, activity and application changes as server-sent events.
+    
+    Browsers authenticate with ?ticket= (see POST /events/ticket); other
+    clients may send the access token as a Bearer header. The stream ends
+    when the access token expires; clients reconnect with a new ticket.
+    """
+    ticket = request.args.get('ticket')
+    auth_header = request.headers.get('Authorization', '')
+    if ticket:
+        redeemed = EventService.redeem_ticket(ticket)
+        if not redeemed:
+            return jsonify({'error': 'Unauthorized', 'message': 'Invalid or expired ticket'}), 401
+        user_id, role, token_expires_at = redeemed
+        expires_at = calendar.timegm(token_expires_at.timetuple()) if token_expires_at else None
+    elif auth_header.startswith('Bearer '):
+        try:
+            claims = decode_token(auth_header[len('Bearer '):])
+        except Exception as e:
+            return jsonify({'error': 'Unauthorized', 'message': str(e)}), 401
+        if claims.get('type') != 'access':
+            return jsonify({'error': 'Unauthorized', 'message': 'Access token required'}), 401
+        user_id = int(claims['sub'])
+        role = claims.get('role')
+        expires_at = claims.get('exp')
+    else:
+        return jsonify({'error': 'Unauthorized', 'message': 'Authentication required'}), 401
+    
+    heartbeat = current_app.config['EVENT_STREAM_HEARTBEAT']
+    subscription = EventService.subscribe()
+    if subscription is None:
+        response = jsonify({'error': 'Service unavailable', 'message': 'Too many open event streams, retry later'})
+        response.headers['Retry-After'] = str(heartbeat)
+        return response, 503
+    
+    def generate():
+        try:
+            yield f"retry: {heartbeat * 1000}\n\n"
+            while True:
+                if expires_at and time.time() >= expires_at:
+                    yield "event: expired\ndata: {}\n\n"
+                    return
+                try:
+                    events = subscription.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                
+                for change in EventService.visible_events(events, user_id, role):
+                    yield f"event: {change['entity']}\ndata: {json.dumps(change)}\n\n"
+        finally:
+            EventService.unsubscribe(subscription)
+    
+    response = Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    # Free the stream slot even if the client leaves before the first chunk
+    response.call_on_close(lambda: EventService.unsubscribe(subscription))
+    return response
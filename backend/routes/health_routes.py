@@ -0,0 +1,50 @@
+"""Health check routes."""
+from flask import Blueprint, jsonify, current_app
+from sqlalchemy import text
+from extensions import db
+from services.warmup_service import WarmupService
+from services.health_service import HealthService
+
+health_bp = Blueprint('health', __name__, url_prefix='/health')
+
+
+@health_bp.route('', methods=['GET'])
+def health_check():
+    """Liveness: the process is up and serving requests."""
+    return jsonify({
+        'status': 'healthy',
+        'service': 'admissions-crm-api',
+        'version': '1.0.0'
+    }), 200
+
+
+@health_bp.route('/ready', methods=['GET'])
+def readiness_check():
+    """Readiness: this worker has warmed up and can reach the database.
+    
+    A worker whose warm-up failed (e.g. the database was down at boot)
+    retries it here.
+    """
+    if not WarmupService.is_ready() and not WarmupService.warm_up(current_app._get_current_object()):
+        return jsonify({'status': 'warming_up', 'warmup': WarmupService.get_report()}), 503
+    
+    try:
+        db.session.execute(text("SELECT 1"))
+    except Exception as e:
+        return jsonify({'status': 'unavailable', 'message': str(e)}), 503
+    
+    return jsonify({'status': 'ready', 'warmup': WarmupService.get_report()}), 200
+
+
+@health_bp.route('/diagnostics', methods=['GET'])
+def diagnostics_check():
+    """Deep health: database latency, pool use, scheduler lag and queued automation work.
+    
+    Returns 503 when this worker cannot serve requests (database down or
+    pool exhausted). Results are cached for HEALTH_DIAGNOSTICS_TTL seconds.
+    """
+    try:
+        diagnostics = HealthService.get_diagnostics()
+        return jsonify(diagnostics), 503 if diagnostics['status'] == 'failing' else 200
+    except Exception as e:
+        return jsonify({'status': 'failing', 'error': type(e).__name__}), 503
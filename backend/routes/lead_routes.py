@@ -1,15 +1,17 @@
 """Lead routes."""
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from models import Lead
 from services import LeadService
 from services.automation_service import AutomationService
-from middleware import admin_required, role_required
+from middleware import admin_required, role_required, team_lead_required, conditional, use_replica
 
 lead_bp = Blueprint('leads', __name__, url_prefix='/leads')
 
 
 @lead_bp.route('/', methods=['GET'])
 @jwt_required()
+@use_replica
 def get_leads():
     """Get leads with pagination and filters."""
     try:
@@ -28,12 +30,14 @@ def get_leads():
             'source_id': request.args.get('source_id', type=int),
             'assigned_to': request.args.get('assigned_to', type=int),
             'status': request.args.get('status'),
+            'sort': request.args.get('sort'),
             'user_role': user_role,
             'user_id': user_id,
             'mask_sensitive': user_role != 'Admin'
         }
         
-        result = LeadService.get_leads(filters, page, per_page)
+        exact = request.args.get('exact_count', 'false').lower() == 'true'
+        result = LeadService.get_leads(filters, page, per_page, exact)
         return jsonify(result), 200
     
     except Exception as e:
@@ -42,6 +46,7 @@ def get_leads():
 
 @lead_bp.route('/<int:lead_id>', methods=['GET'])
 @jwt_required()
+@conditional(lambda lead_id: Lead.get_version(lead_id))
 def get_lead(lead_id):
     """Get single lead."""
     try:
@@ -57,6 +62,29 @@ def get_lead(lead_id):
         return jsonify({'error': 'Server error', 'message': str(e)}), 500
 
 
+@lead_bp.route('/<int:lead_id>/timeline', methods=['GET'])
+@jwt_required()
+@use_replica
+def get_lead_timeline(lead_id):
+    """Get a lead's activities, tasks and application milestones as one cursor-paged stream."""
+    try:
+        from services.timeline_service import TimelineService
+        
+        result = TimelineService.get_timeline(
+            lead_id,
+            cursor=request.args.get('cursor'),
+            limit=request.args.get('limit', 50, type=int)
+        )
+        return jsonify(result), 200
+    
+    except ValueError as e:
+        if str(e) == "Lead not found":
+            return jsonify({'error': 'Lead not found', 'message': str(e)}), 404
+        return jsonify({'error': 'Validation error', 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': 'Server error', 'message': str(e)}), 500
+
+
 @lead_bp.route('/', methods=['POST'])
 @jwt_required()
 def create_lead():
@@ -101,6 +129,111 @@ def update_lead(lead_id):
         return jsonify({'error': 'Server error', 'message': str(e)}), 500
 
 
+@lead_bp.route('/bulk-assign', methods=['POST'])
+@jwt_required()
+@team_lead_required
+def bulk_assign():
+    """Reassign many leads to a user or distribute them by strategy (Team Lead/Admin)."""
+    try:
+        from services.assignment_service import AssignmentService
+        
+        data = request.get_json() or {}
+        
+        result = AssignmentService.bulk_reassign(
+            lead_ids=data.get('lead_ids'),
+            filters=data.get('filters'),
+            assigned_to=data.get('assigned_to'),
+            strategy=data.get('strategy'),
+            include_tasks=data.get('include_tasks', True)
+        )
+        return jsonify(result), 200
+    
+    except ValueError as e:
+        return jsonify({'error': 'Validation error', 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': 'Server error', 'message': str(e)}), 500
+
+
+@lead_bp.route('/assignment-load', methods=['GET'])
+@jwt_required()
+@use_replica
+def get_assignment_load():
+    """Get open lead and task load per executive."""
+    try:
+        from services import AuthService
+        from services.assignment_service import AssignmentService
+        
+        executives = AuthService.get_executives()
+        loads = AssignmentService.get_loads([user.id for user in executives])
+        
+        return jsonify({
+            'executives': [
+                {**user.to_dict(), 'load': loads[user.id]}
+                for user in executives
+            ]
+        }), 200
+    except Exception as e:
+        return jsonify({'error': 'Server error', 'message': str(e)}), 500
+
+
+@lead_bp.route('/duplicates', methods=['GET'])
+@jwt_required()
+@use_replica
+@team_lead_required
+def get_duplicates():
+    """Get likely duplicate lead pairs for review (Team Lead/Admin)."""
+    try:
+        from services.duplicate_service import DuplicateService
+        
+        claims = get_jwt()
+        result = DuplicateService.get_duplicates(
+            status=request.args.get('status', 'pending'),
+            page=request.args.get('page', 1, type=int),
+            per_page=request.args.get('per_page', 20, type=int),
+            mask_sensitive=claims.get('role') != 'Admin',
+            exact_count=request.args.get('exact_count', 'false').lower() == 'true'
+        )
+        return jsonify(result), 200
+    
+    except Exception as e:
+        return jsonify({'error': 'Server error', 'message': str(e)}), 500
+
+
+@lead_bp.route('/duplicates/<int:pair_id>/dismiss', methods=['POST'])
+@jwt_required()
+@team_lead_required
+def dismiss_duplicate(pair_id):
+    """Mark a candidate pair as not a duplicate (Team Lead/Admin)."""
+    try:
+        from services.duplicate_service import DuplicateService
+        
+        pair = DuplicateService.dismiss(pair_id, get_jwt_identity())
+        return jsonify({'duplicate': pair.to_dict()}), 200
+    
+    except ValueError as e:
+        return jsonify({'error': 'Not found', 'message': str(e)}), 404
+    except Exception as e:
+        return jsonify({'error': 'Server error', 'message': str(e)}), 500
+
+
+@lead_bp.route('/<int:lead_id>/merge', methods=['POST'])
+@jwt_required()
+@team_lead_required
+def merge_leads(lead_id):
+    """Merge duplicate leads into this lead (Team Lead/Admin)."""
+    try:
+        from services.duplicate_service import DuplicateService
+        
+        data = request.get_json() or {}
+        result = DuplicateService.merge(lead_id, data.get('duplicate_ids'), get_jwt_identity())
+        return jsonify(result), 200
+    
+    except ValueError as e:
+        return jsonify({'error': 'Validation error', 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': 'Server error', 'message': str(e)}), 500
+
+
 @lead_bp.route('/<int:lead_id>', methods=['DELETE'])
 @jwt_required()
 @admin_required
@@ -162,6 +295,7 @@ def convert_to_application(lead_id):
 
 @lead_bp.route('/kpis', methods=['GET'])
 @jwt_required()
+@use_replica
 def get_kpis():
     """Get lead KPIs."""
     try:
@@ -173,6 +307,7 @@ def get_kpis():
 
 @lead_bp.route('/stage-distribution', methods=['GET'])
 @jwt_required()
+@use_replica
 def get_stage_distribution():
     """Get leads distribution by stage."""
     try:
@@ -184,6 +319,7 @@ def get_stage_distribution():
 
 @lead_bp.route('/source-distribution', methods=['GET'])
 @jwt_required()
+@use_replica
 def get_source_distribution():
     """Get leads distribution by source."""
     try:
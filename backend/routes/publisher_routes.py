@@ -0,0 +1,63 @@
+"""Publisher routes."""
+from flask import Blueprint, request, jsonify, g, current_app
+from models import Publisher
+from services.publisher_service import PublisherService
+from services.quota_service import QuotaService, QuotaExceededError
+from middleware import api_key_required
+
+publisher_bp = Blueprint('publisher', __name__, url_prefix='/publisher')
+
+
+@publisher_bp.route('/leads', methods=['POST'])
+@api_key_required
+def ingest_leads():
+    """Ingest a batch of leads from a publisher (API key auth)."""
+    try:
+        data = request.get_json() or {}
+        
+        # Accept {"leads": [...]} or a single lead object
+        items = data.get('leads') if 'leads' in data else [data]
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'leads must be a non-empty list'}), 400
+        
+        with QuotaService.admit(g.publisher):
+            QuotaService.check_rate(g.publisher)
+            result = PublisherService.ingest_leads(g.publisher, items)
+        
+        if result['accepted']:
+            status = 201
+        elif result['over_quota']:
+            status = 429
+        else:
+            status = 200
+        return jsonify(result), status
+    
+    except QuotaExceededError as e:
+        response = jsonify({'error': 'Too many requests', 'message': str(e)})
+        if e.retry_after:
+            response.headers['Retry-After'] = str(e.retry_after)
+        return response, e.status_code
+    except ValueError as e:
+        return jsonify({'error': 'Validation error', 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': 'Server error', 'message': str(e)}), 500
+
+
+@publisher_bp.route('/quota', methods=['GET'])
+@api_key_required
+def get_quota():
+    """Get the calling publisher's monthly quota usage."""
+    try:
+        publisher = Publisher.query.get(g.publisher['id'])
+        
+        return jsonify({
+            'lead_limit': publisher.lead_limit,
+            'quota_available': int(publisher.get_available_quota()),
+            'quota_period_days': Publisher.QUOTA_PERIOD_DAYS,
+            'rate_limit': current_app.config['PUBLISHER_RATE_LIMIT'],
+            'rate_window': current_app.config['PUBLISHER_RATE_WINDOW'],
+            'can_submit': publisher.can_submit_lead()
+        }), 200
+    
+    except Exception as e:
+        return jsonify({'error': 'Server error', 'message': str(e)}), 500
@@ -1,101 +1,291 @@
 """Report routes."""
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required
-from services import ReportService
-from backend.middleware import manager_required
+import time
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
+from sqlalchemy import func
+from models import KpiCounter, Activity
+from extensions import db
+from services import ReportService, CohortService, ReportRange, ReportJobService
+from middleware import manager_required, conditional, statement_timeout, use_replica
 
 
 report_bp = Blueprint('reports', __name__, url_prefix='/reports')
 
 
+def report_version() -> tuple:
+    """Get a validator for report responses.
+    
+    Lead, application and task writes bump the KPI counters and activity
+    writes bump the activity sequence. Reports also depend on the clock
+    (overdue tasks, rolling day windows), so the version rolls every minute.
+    """
+    counters_version, _ = KpiCounter.get_version()
+    last_activity_id = db.session.query(func.max(Activity.id)).scalar()
+    return f"{counters_version}|{last_activity_id}|{int(time.time() // 60)}", None
+
+
+def cohort_version() -> tuple:
+    """Get a validator for cohort responses; forced refreshes always run the view."""
+    if request.args.get('refresh', 'false').lower() == 'true':
+        return None, None
+    return report_version()
+
+
 @report_bp.route('/dashboard', methods=['GET'])
 @jwt_required()
+@statement_timeout('REPORT_STATEMENT_TIMEOUT')
+@use_replica
+@conditional(report_version)
 def get_dashboard_stats():
     """Get dashboard statistics."""
     try:
-        stats = ReportService.get_dashboard_stats()
+        tz = request.args.get('tz') or current_app.config['REPORT_TIMEZONE']
+        stats = ReportService.get_dashboard_stats(tz)
         return jsonify(stats), 200
+    except ValueError as e:
+        return jsonify({'error': 'Validation error', 'message': str(e)}), 400
     except Exception as e:
         return jsonify({'error': 'Server error', 'message': str(e)}), 500
 
 
 @report_bp.route('/conversion', methods=['GET'])
 @jwt_required()
+@statement_timeout('REPORT_STATEMENT_TIMEOUT')
+@use_replica
+@conditional(report_version)
 def get_conversion_funnel():
     """Get conversion funnel data."""
     try:
-        funnel = ReportService.get_conversion_funnel()
-        return jsonify({'funnel': funnel}), 200
+        period = ReportRange.from_args(request.args)
+        funnel = ReportService.get_conversion_funnel(period)
+        return jsonify({'funnel': funnel, 'range': period.to_dict()}), 200
+    except ValueError as e:
+        return jsonify({'error': 'Validation error', 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': 'Server error', 'message': str(e)}), 500
+
+
+@report_bp.route('/cohort-funnel', methods=['GET'])
+@jwt_required()
+@statement_timeout('REPORT_STATEMENT_TIMEOUT')
+@use_replica
+@conditional(report_version)
+def get_cohort_funnel():
+    """Get the stage funnel per monthly lead cohort."""
+    try:
+        period = ReportRange.from_args(request.args, default_days=180, default_bucket='month')
+        cohorts = ReportService.get_cohort_funnel(period)
+        return jsonify({'cohorts': cohorts, 'range': period.to_dict()}), 200
+    except ValueError as e:
+        return jsonify({'error': 'Validation error', 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': 'Server error', 'message': str(e)}), 500
+
+
+@report_bp.route('/time-in-stage', methods=['GET'])
+@jwt_required()
+@statement_timeout('REPORT_STATEMENT_TIMEOUT')
+@use_replica
+@conditional(report_version)
+def get_time_in_stage():
+    """Get time spent in each stage."""
+    try:
+        period = ReportRange.from_args(request.args, default_days=180)
+        stages = ReportService.get_time_in_stage(period)
+        return jsonify({'stages': stages, 'range': period.to_dict()}), 200
+    except ValueError as e:
+        return jsonify({'error': 'Validation error', 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': 'Server error', 'message': str(e)}), 500
+
+
+@report_bp.route('/cohorts', methods=['GET'])
+@jwt_required()
+@statement_timeout('REPORT_STATEMENT_TIMEOUT')
+@use_replica
+@conditional(cohort_version)
+def get_cohorts():
+    """Get time to application, fee payment and enrollment per monthly lead cohort."""
+    try:
+        months = request.args.get('months', 12, type=int)
+        source_id = request.args.get('source_id', type=int)
+        refresh = request.args.get('refresh', 'false').lower() == 'true'
+        if refresh and get_jwt().get('role') not in CohortService.REFRESH_ROLES:
+            return jsonify({
+                'error': 'Forbidden',
+                'message': f"refresh requires one of: {', '.join(CohortService.REFRESH_ROLES)}"
+            }), 403
+        period = ReportRange.from_args(request.args)
+        cohorts = CohortService.get_cohorts(months, source_id, refresh, period)
+        return jsonify({'cohorts': cohorts}), 200
+    except ValueError as e:
+        return jsonify({'error': 'Validation error', 'message': str(e)}), 400
     except Exception as e:
         return jsonify({'error': 'Server error', 'message': str(e)}), 500
 
 
 @report_bp.route('/source-performance', methods=['GET'])
 @jwt_required()
+@statement_timeout('REPORT_STATEMENT_TIMEOUT')
+@use_replica
+@conditional(report_version)
 def get_source_performance():
     """Get source performance report."""
     try:
-        days = request.args.get('days', 30, type=int)
-        performance = ReportService.get_source_performance(days)
-        return jsonify({'performance': performance}), 200
+        period = ReportRange.from_args(request.args, default_days=30)
+        performance = ReportService.get_source_performance(period)
+        return jsonify({'performance': performance, 'range': period.to_dict()}), 200
+    except ValueError as e:
+        return jsonify({'error': 'Validation error', 'message': str(e)}), 400
     except Exception as e:
         return jsonify({'error': 'Server error', 'message': str(e)}), 500
 
 
 @report_bp.route('/lead-trends', methods=['GET'])
 @jwt_required()
+@statement_timeout('REPORT_STATEMENT_TIMEOUT')
+@use_replica
+@conditional(report_version)
 def get_lead_trends():
     """Get lead trends."""
     try:
-        days = request.args.get('days', 30, type=int)
-        trends = ReportService.get_lead_trends(days)
-        return jsonify({'trends': trends}), 200
+        period = ReportRange.from_args(request.args, default_days=30)
+        trends = ReportService.get_lead_trends(period)
+        return jsonify({'trends': trends, 'range': period.to_dict()}), 200
+    except ValueError as e:
+        return jsonify({'error': 'Validation error', 'message': str(e)}), 400
     except Exception as e:
         return jsonify({'error': 'Server error', 'message': str(e)}), 500
 
 
 @report_bp.route('/user-performance', methods=['GET'])
 @jwt_required()
+@statement_timeout('REPORT_STATEMENT_TIMEOUT')
+@use_replica
 @manager_required
+@conditional(report_version)
 def get_user_performance():
     """Get user performance report (Manager only)."""
     try:
-        days = request.args.get('days', 30, type=int)
-        performance = ReportService.get_user_performance(days)
-        return jsonify({'performance': performance}), 200
+        period = ReportRange.from_args(request.args, default_days=30)
+        performance = ReportService.get_user_performance(period)
+        return jsonify({'performance': performance, 'range': period.to_dict()}), 200
+    except ValueError as e:
+        return jsonify({'error': 'Validation error', 'message': str(e)}), 400
     except Exception as e:
         return jsonify({'error': 'Server error', 'message': str(e)}), 500
 
 
 @report_bp.route('/stage-distribution', methods=['GET'])
 @jwt_required()
+@statement_timeout('REPORT_STATEMENT_TIMEOUT')
+@use_replica
+@conditional(report_version)
 def get_stage_distribution():
     """Get stage distribution."""
     try:
-        distribution = ReportService.get_stage_distribution()
-        return jsonify({'distribution': distribution}), 200
+        period = ReportRange.from_args(request.args)
+        distribution = ReportService.get_stage_distribution(period)
+        return jsonify({'distribution': distribution, 'range': period.to_dict()}), 200
+    except ValueError as e:
+        return jsonify({'error': 'Validation error', 'message': str(e)}), 400
     except Exception as e:
         return jsonify({'error': 'Server error', 'message': str(e)}), 500
 
 
 @report_bp.route('/application-status', methods=['GET'])
 @jwt_required()
+@statement_timeout('REPORT_STATEMENT_TIMEOUT')
+@use_replica
+@conditional(report_version)
 def get_application_status():
     """Get application status breakdown."""
     try:
-        breakdown = ReportService.get_application_status_breakdown()
+        period = ReportRange.from_args(request.args)
+        breakdown = ReportService.get_application_status_breakdown(period)
         return jsonify(breakdown), 200
+    except ValueError as e:
+        return jsonify({'error': 'Validation error', 'message': str(e)}), 400
     except Exception as e:
         return jsonify({'error': 'Server error', 'message': str(e)}), 500
 
 
 @report_bp.route('/recent-activities', methods=['GET'])
 @jwt_required()
+@statement_timeout('REPORT_STATEMENT_TIMEOUT')
+@use_replica
+@conditional(report_version)
 def get_recent_activities():
     """Get recent activities."""
     try:
         limit = request.args.get('limit', 50, type=int)
-        activities = ReportService.get_recent_activities(limit)
+        period = ReportRange.from_args(request.args)
+        activities = ReportService.get_recent_activities(limit, period)
         return jsonify({'activities': activities}), 200
+    except ValueError as e:
+        return jsonify({'error': 'Validation error', 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': 'Server error', 'message': str(e)}), 500
+
+
+@report_bp.route('/jobs', methods=['POST'])
+@jwt_required()
+def submit_report_job():
+    """Run a report in the background.
+    
+    Body: {"report": "<name>", "params": {"from", "to", "days", "tz", "bucket"}}.
+    An identical job already queued or running is returned instead of a new one.
+    """
+    try:
+        data = request.get_json() or {}
+        report = data.get('report')
+        if report not in ReportJobService.REPORTS:
+            return jsonify({
+                'error': 'Validation error',
+                'message': f"report must be one of: {', '.join(ReportJobService.REPORTS)}"
+            }), 400
+        if not ReportJobService.can_run(report, get_jwt().get('role')):
+            return jsonify({'error': 'Forbidden', 'message': 'You cannot run this report'}), 403
+        
+        params = data.get('params') or {}
+        if not isinstance(params, dict):
+            return jsonify({'error': 'Validation error', 'message': 'params must be an object'}), 400
+        
+        job, created = ReportJobService.submit(report, params, int(get_jwt_identity()))
+        return jsonify({'job': job.to_dict(), 'deduplicated': not created}), 202
+    except ValueError as e:
+        return jsonify({'error': 'Validation error', 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': 'Server error', 'message': str(e)}), 500
+
+
+@report_bp.route('/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_report_job(job_id):
+    """Get a report job's status and progress."""
+    try:
+        job = ReportJobService.get_job(job_id)
+        if not job or not ReportJobService.can_run(job.report, get_jwt().get('role')):
+            return jsonify({'error': 'Report job not found'}), 404
+        return jsonify({'job': job.to_dict()}), 200
+    except Exception as e:
+        return jsonify({'error': 'Server error', 'message': str(e)}), 500
+
+
+@report_bp.route('/jobs/<job_id>/result', methods=['GET'])
+@jwt_required()
+def get_report_job_result(job_id):
+    """Get a completed report job's stored result."""
+    try:
+        job = ReportJobService.get_job(job_id)
+        if not job or not ReportJobService.can_run(job.report, get_jwt().get('role')):
+            return jsonify({'error': 'Report job not found'}), 404
+        if job.status != 'completed':
+            return jsonify({
+                'error': 'Report not ready',
+                'message': job.error if job.status == 'failed' else f"Report job is {job.status}",
+                'job': job.to_dict()
+            }), 409
+        return jsonify(job.result), 200
     except Exception as e:
         return jsonify({'error': 'Server error', 'message': str(e)}), 500
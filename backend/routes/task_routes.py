@@ -2,13 +2,14 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from services import TaskService
-from middleware import admin_required
+from middleware import admin_required, use_replica
 
 task_bp = Blueprint('tasks', __name__, url_prefix='/tasks')
 
 
 @task_bp.route('/', methods=['GET'])
 @jwt_required()
+@use_replica
 def get_tasks():
     """Get tasks with pagination and filters."""
     try:
@@ -28,7 +29,8 @@ def get_tasks():
         # Remove None values
         filters = {k: v for k, v in filters.items() if v is not None}
         
-        result = TaskService.get_tasks(filters, page, per_page)
+        exact = request.args.get('exact_count', 'false').lower() == 'true'
+        result = TaskService.get_tasks(filters, page, per_page, exact)
         return jsonify(result), 200
     
     except Exception as e:
@@ -104,6 +106,32 @@ def complete_task(task_id):
         return jsonify({'error': 'Server error', 'message': str(e)}), 500
 
 
+@task_bp.route('/bulk', methods=['POST'])
+@jwt_required()
+def bulk_operation():
+    """Apply one operation (assign, reschedule, complete) to many tasks."""
+    try:
+        user_id = get_jwt_identity()
+        data = request.get_json() or {}
+        
+        if not data.get('operation'):
+            return jsonify({'error': 'operation is required'}), 400
+        
+        result = TaskService.bulk_operation(
+            data['operation'],
+            data,
+            task_ids=data.get('task_ids'),
+            filters=data.get('filters'),
+            user_id=user_id
+        )
+        return jsonify(result), 200
+    
+    except ValueError as e:
+        return jsonify({'error': 'Validation error', 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': 'Server error', 'message': str(e)}), 500
+
+
 @task_bp.route('/<int:task_id>', methods=['DELETE'])
 @jwt_required()
 @admin_required
@@ -121,6 +149,7 @@ def delete_task(task_id):
 
 @task_bp.route('/pending', methods=['GET'])
 @jwt_required()
+@use_replica
 def get_pending_tasks():
     """Get pending tasks for current user."""
     try:
@@ -136,7 +165,7 @@ def get_pending_tasks():
         if target_user:
             tasks = tasks.filter_by(assigned_to=target_user)
         
-        tasks = tasks.order_by(Task.due_date.asc()).all()
+        tasks = tasks.order_by(*Task.queue_order()).all()
         
         return jsonify({'tasks': [task.to_dict() for task in tasks]}), 200
     
@@ -146,6 +175,7 @@ def get_pending_tasks():
 
 @task_bp.route('/stats', methods=['GET'])
 @jwt_required()
+@use_replica
 def get_stats():
     """Get task statistics."""
     try:
@@ -154,3 +184,23 @@ def get_stats():
         return jsonify(stats), 200
     except Exception as e:
         return jsonify({'error': 'Server error', 'message': str(e)}), 500
+
+
+@task_bp.route('/analytics', methods=['GET'])
+@jwt_required()
+@use_replica
+def get_analytics():
+    """Get overdue, aging and SLA aggregates for open tasks."""
+    try:
+        from services.task_analytics_service import TaskAnalyticsService
+        
+        user_id = get_jwt_identity()
+        claims = get_jwt()
+        
+        # Admin sees the whole backlog, others see their own
+        target_user = None if claims.get('role') == 'Admin' else user_id
+        
+        summary = TaskAnalyticsService.get_backlog_summary(target_user)
+        return jsonify(summary), 200
+    except Exception as e:
+        return jsonify({'error': 'Server error', 'message': str(e)}), 500
@@ -2,13 +2,43 @@
 from .auth_service import AuthService
 from .lead_service import LeadService
 from .task_service import TaskService
+from .report_range import ReportRange
 from .report_service import ReportService
 from .automation_service import AutomationService
+from .kpi_service import KpiService
+from .task_analytics_service import TaskAnalyticsService
+from .assignment_service import AssignmentService
+from .publisher_service import PublisherService
+from .quota_service import QuotaService
+from .duplicate_service import DuplicateService
+from .scoring_service import ScoringService
+from .timeline_service import TimelineService
+from .event_service import EventService
+from .warmup_service import WarmupService
+from .health_service import HealthService
+from .cohort_service import CohortService
+from .count_service import CountService
+from .report_job_service import ReportJobService
 
 __all__ = [
     'AuthService',
     'LeadService',
     'TaskService',
+    'ReportRange',
     'ReportService',
-    'AutomationService'
+    'AutomationService',
+    'KpiService',
+    'TaskAnalyticsService',
+    'AssignmentService',
+    'PublisherService',
+    'QuotaService',
+    'DuplicateService',
+    'ScoringService',
+    'TimelineService',
+    'EventService',
+    'WarmupService',
+    'HealthService',
+    'CohortService',
+    'CountService',
+    'ReportJobService'
 ]
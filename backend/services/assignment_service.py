@@ -0,0 +1,223 @@
+"""Lead assignment service."""
+import heapq
+from datetime import datetime, timedelta
+from models import Lead, Task, User, KpiCounter
+from extensions import db
+from services.auth_service import AuthService
+from services.event_service import EventService
+
+
+class AssignmentService:
+    """Service distributing leads across executives."""
+    
+    STRATEGIES = ['round_robin', 'least_loaded', 'weighted']
+    
+    @staticmethod
+    def get_loads(user_ids: list) -> dict:
+        """Get open lead plus open task counts per user from the KPI counters."""
+        lead_keys = [KpiCounter.composite_key('active', user_id) for user_id in user_ids]
+        task_keys = [
+            KpiCounter.composite_key(status, user_id)
+            for status in Task.OPEN_STATUSES
+            for user_id in user_ids
+        ]
+        open_leads = KpiCounter.get_values('lead', 'status_assignee', lead_keys)
+        open_tasks = KpiCounter.get_values('task', 'status_assignee', task_keys)
+        
+        loads = {}
+        for user_id in user_ids:
+            tasks = sum(
+                open_tasks[KpiCounter.composite_key(status, user_id)]
+                for status in Task.OPEN_STATUSES
+            )
+            loads[user_id] = {
+                'open_leads': open_leads[KpiCounter.composite_key('active', user_id)],
+                'open_tasks': tasks
+            }
+            loads[user_id]['total'] = loads[user_id]['open_leads'] + loads[user_id]['open_tasks']
+        return loads
+    
+    @staticmethod
+    def plan(count: int, strategy: str = 'round_robin') -> list:
+        """Pick an executive for each of `count` leads.
+        
+        Returns a list of user IDs in assignment order. Executives are
+        locked for the rest of the transaction so concurrent plans queue.
+        """
+        if strategy not in AssignmentService.STRATEGIES:
+            raise ValueError(f"Invalid strategy. Must be one of: {', '.join(AssignmentService.STRATEGIES)}")
+        
+        executive_ids = [user.id for user in AuthService.get_executives()]
+        executives = User.query.filter(
+            User.id.in_(executive_ids),
+            User.assignment_weight > 0
+        ).order_by(
+            User.last_assigned_at.asc().nullsfirst(),
+            User.id
+        ).with_for_update().all()
+        
+        if not executives:
+            raise ValueError("No active executives available for assignment")
+        
+        if strategy == 'round_robin':
+            # Continue the rotation from whoever was assigned least recently
+            plan = [executives[i % len(executives)].id for i in range(count)]
+        
+        elif strategy == 'least_loaded':
+            loads = AssignmentService.get_loads([user.id for user in executives])
+            heap = [(loads[user.id]['total'], position, user.id) for position, user in enumerate(executives)]
+            heapq.heapify(heap)
+            plan = []
+            for _ in range(count):
+                load, position, user_id = heapq.heappop(heap)
+                plan.append(user_id)
+                heapq.heappush(heap, (load + 1, position, user_id))
+        
+        else:
+            # Smooth weighted distribution: next pick minimizes (assigned + 1) / weight
+            heap = [(1 / user.assignment_weight, position, user.id, user.assignment_weight, 0)
+                    for position, user in enumerate(executives)]
+            heapq.heapify(heap)
+            plan = []
+            for _ in range(count):
+                _, position, user_id, weight, assigned = heapq.heappop(heap)
+                plan.append(user_id)
+                assigned += 1
+                heapq.heappush(heap, ((assigned + 1) / weight, position, user_id, weight, assigned))
+        
+        # Advance the round-robin cursor in pick order
+        now = datetime.utcnow()
+        last_pick = {user_id: index for index, user_id in enumerate(plan)}
+        for user in executives:
+            if user.id in last_pick:
+                user.last_assigned_at = now + timedelta(microseconds=last_pick[user.id])
+        
+        return plan
+    
+    @staticmethod
+    def assign_lead(lead_id: int, strategy: str = 'round_robin') -> Lead:
+        """Assign a single lead using a strategy."""
+        lead = Lead.query.get(lead_id)
+        if not lead:
+            raise ValueError("Lead not found")
+        
+        lead.assigned_to = AssignmentService.plan(1, strategy)[0]
+        lead.updated_at = datetime.utcnow()
+        db.session.commit()
+        return lead
+    
+    @staticmethod
+    def bulk_reassign(lead_ids: list = None, filters: dict = None, assigned_to: int = None,
+                      strategy: str = None, include_tasks: bool = True) -> dict:
+        """Reassign many leads in one transaction with set-based UPDATEs.
+        
+        Leads go to `assigned_to` when given, otherwise they are distributed
+        with `strategy`. Open tasks of moved leads follow their lead when
+        `include_tasks` is set.
+        """
+        from services.lead_service import LeadService
+        from services.kpi_service import KpiService
+        
+        from flask import current_app
+        
+        if not lead_ids and not filters:
+            raise ValueError("lead_ids or filters is required")
+        if lead_ids and (
+            not isinstance(lead_ids, list)
+            or not all(isinstance(lead_id, int) and not isinstance(lead_id, bool) for lead_id in lead_ids)
+        ):
+            raise ValueError("lead_ids must be a list of integers")
+        if filters:
+            if not isinstance(filters, dict):
+                raise ValueError("filters must be an object")
+            unknown = [key for key in filters if key not in LeadService.FILTER_KEYS]
+            if unknown:
+                raise ValueError(f"Unknown filters: {', '.join(unknown)}")
+            # Filters with only empty values would select every lead
+            if not any(filters.get(key) for key in LeadService.FILTER_KEYS):
+                raise ValueError(f"filters must set at least one of: {', '.join(LeadService.FILTER_KEYS)}")
+        if assigned_to is None and not strategy:
+            raise ValueError("assigned_to or strategy is required")
+        if assigned_to is not None and not User.query.filter_by(id=assigned_to, is_active=True).first():
+            raise ValueError("Assignee not found or inactive")
+        
+        # Lock the leads and capture the values the counters depend on
+        query = db.session.query(Lead.id, Lead.status, Lead.assigned_to)
+        if lead_ids:
+            query = query.filter(Lead.id.in_(lead_ids))
+        if filters:
+            query = LeadService._apply_filters(query, filters)
+        # Merged tombstones keep pointing at their primary lead's owner
+        query = query.filter(Lead.status != 'merged')
+        
+        max_rows = current_app.config['MAX_BULK_LEADS']
+        rows = query.order_by(Lead.id).limit(max_rows + 1).with_for_update().all()
+        if len(rows) > max_rows:
+            raise ValueError(f"Bulk reassignment is limited to {max_rows} leads")
+        
+        if assigned_to is not None:
+            targets = [assigned_to] * len(rows)
+        else:
+            targets = AssignmentService.plan(len(rows), strategy)
+        
+        # One UPDATE per target user
+        moves = {}
+        for row, target in zip(rows, targets):
+            if row.assigned_to != target:
+                moves.setdefault(target, []).append(row)
+        
+        now = datetime.utcnow()
+        lead_changes = []
+        task_changes = []
+        lead_events = []
+        task_events = []
+        for target, moved in moves.items():
+            moved_ids = [row.id for row in moved]
+            db.session.execute(
+                Lead.__table__.update()
+                .where(Lead.__table__.c.id.in_(moved_ids))
+                .values(assigned_to=target, updated_at=now)
+            )
+            lead_changes.extend(
+                ({'status': row.status, 'assigned_to': row.assigned_to},
+                 {'status': row.status, 'assigned_to': target})
+                for row in moved
+            )
+            lead_events.extend(
+                {'id': row.id, 'owners': sorted({row.assigned_to, target} - {None})}
+                for row in moved
+            )
+            
+            if include_tasks:
+                tasks = db.session.query(Task.id, Task.status, Task.assigned_to).filter(
+                    Task.lead_id.in_(moved_ids),
+                    Task.status.in_(Task.OPEN_STATUSES)
+                ).with_for_update().all()
+                if tasks:
+                    db.session.execute(
+                        Task.__table__.update()
+                        .where(Task.__table__.c.id.in_([task.id for task in tasks]))
+                        .values(assigned_to=target, updated_at=now)
+                    )
+                    task_changes.extend(
+                        ({'status': task.status, 'assigned_to': task.assigned_to},
+                         {'status': task.status, 'assigned_to': target})
+                        for task in tasks
+                    )
+                    task_events.extend(
+                        {'id': task.id, 'owners': sorted({task.assigned_to, target} - {None})}
+                        for task in tasks
+                    )
+        
+        KpiService.record_changes('lead', lead_changes)
+        KpiService.record_changes('task', task_changes)
+        EventService.queue_events('lead', 'updated', lead_events)
+        EventService.queue_events('task', 'updated', task_events)
+        db.session.commit()
+        
+        return {
+            'matched': len(rows),
+            'reassigned': len(lead_changes),
+            'tasks_reassigned': len(task_changes),
+            'assignments': {str(target): len(moved) for target, moved in moves.items()}
+        }
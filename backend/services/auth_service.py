@@ -120,6 +120,10 @@ class AuthService:
             user.role = data['role']
         if 'is_active' in data:
             user.is_active = data['is_active']
+        if 'assignment_weight' in data:
+            if int(data['assignment_weight']) < 0:
+                raise ValueError("assignment_weight must be zero or greater")
+            user.assignment_weight = int(data['assignment_weight'])
         if 'password' in data and data['password']:
             user.set_password(data['password'])
         
@@ -1,5 +1,8 @@
 """Automation service."""
+import threading
 from datetime import datetime, timedelta
+from apscheduler.events import EVENT_JOB_EXECUTED, EVENT_JOB_ERROR
+from flask import current_app
 from models import Workflow, Lead, Application, Task, Activity
 from extensions import db, scheduler
 from services.task_service import TaskService
@@ -29,6 +32,33 @@ class AutomationService:
         
         return executed
     
+    @staticmethod
+    def trigger_workflow_batch(trigger: str, contexts: list) -> dict:
+        """Trigger workflows for many events of the same type.
+        
+        Active workflows are loaded once for the whole batch and each
+        workflow's execution count is updated once.
+        """
+        workflows = Workflow.get_active_for_trigger(trigger)
+        executed = {}
+        
+        for workflow in workflows:
+            count = 0
+            for context in contexts:
+                try:
+                    if AutomationService._check_conditions(workflow.trigger_conditions, context):
+                        AutomationService._execute_actions(workflow, context)
+                        count += 1
+                except Exception as e:
+                    # Log error but continue with other events
+                    print(f"Error executing workflow {workflow.id}: {str(e)}")
+            
+            if count:
+                workflow.increment_execution(count)
+                executed[workflow.id] = count
+        
+        return executed
+    
     @staticmethod
     def _check_conditions(conditions: dict, context: dict) -> bool:
         """Check if workflow conditions are met."""
@@ -121,6 +151,12 @@ class AutomationService:
         if not lead_id:
             return
         
+        # Without a fixed user, distribute through the assignment engine
+        if not action.get('user_id'):
+            from services.assignment_service import AssignmentService
+            AssignmentService.assign_lead(lead_id, action.get('strategy', 'round_robin'))
+            return
+        
         lead = Lead.query.get(lead_id)
         if lead:
             lead.assigned_to = action.get('user_id')
@@ -146,21 +182,274 @@ class AutomationService:
             except Exception as e:
                 print(f"Webhook error: {str(e)}")
     
+    # Postgres advisory lock held by the process elected to run scheduled jobs
+    SCHEDULER_LOCK_ID = 482305117
+    _scheduler_lock = None
+    _election_thread = None
+    _election_stop = threading.Event()
+    
+    # Outcome of each job's last run in this process
+    _job_runs = {}
+    _job_runs_lock = threading.Lock()
+    
+    @staticmethod
+    def start_scheduler(app, force: bool = False) -> bool:
+        """Start the scheduled jobs if this process is designated to run them.
+        
+        Serving processes call this once they are up; CLI commands never do.
+        SCHEDULER_MODE 'leader' runs the jobs in one process across all
+        workers and instances, elected by an advisory lock (see
+        `_elect`); 'always' runs them in every serving process; 'off'
+        leaves them to `flask run-scheduler` (which passes force).
+        """
+        if scheduler.running:
+            return True
+        
+        mode = app.config['SCHEDULER_MODE']
+        if not force:
+            if mode == 'off':
+                return False
+            if mode == 'leader':
+                started = AutomationService._elect(app)
+                AutomationService._start_election_loop(app)
+                return started
+        
+        with app.app_context():
+            AutomationService.setup_scheduled_jobs()
+        return True
+    
+    @staticmethod
+    def _elect(app) -> bool:
+        """Run one election round; returns whether this process now runs the jobs.
+        
+        A leader whose lock connection is gone has lost the lock (another
+        process may already hold it), so it stops its scheduler and stands
+        again. A follower takes the lock if it is free.
+        """
+        if AutomationService._scheduler_lock is not None and not AutomationService._holds_scheduler_lock():
+            print("Scheduler lock lost; stopping scheduled jobs in this process")
+            try:
+                # Close the driver connection directly; resetting a dead session would fail
+                AutomationService._scheduler_lock.dbapi_connection.close()
+            except Exception:
+                pass
+            AutomationService._scheduler_lock = None
+            if scheduler.running:
+                scheduler.shutdown(wait=False)
+                # A shut down executor cannot take jobs; start() creates a fresh one
+                scheduler.remove_executor('default', shutdown=False)
+        
+        if AutomationService._scheduler_lock is None:
+            if not AutomationService._acquire_scheduler_lock(app):
+                return False
+            print("Elected to run scheduled jobs in this process")
+        
+        if not scheduler.running:
+            with app.app_context():
+                AutomationService.setup_scheduled_jobs()
+        return True
+    
+    @staticmethod
+    def _start_election_loop(app) -> None:
+        """Repeat the election every SCHEDULER_ELECTION_INTERVAL seconds on a daemon thread.
+        
+        Followers take over when the leader dies; a leader that loses its
+        lock connection steps down.
+        """
+        if AutomationService._election_thread is not None or app.config['DB_PGBOUNCER']:
+            return
+        
+        def run():
+            interval = app.config['SCHEDULER_ELECTION_INTERVAL']
+            while not AutomationService._election_stop.wait(interval):
+                try:
+                    AutomationService._elect(app)
+                except Exception as e:
+                    print(f"Scheduler election failed: {str(e)}")
+        
+        AutomationService._election_thread = threading.Thread(target=run, name='scheduler-election', daemon=True)
+        AutomationService._election_thread.start()
+    
+    @staticmethod
+    def _holds_scheduler_lock() -> bool:
+        """Check that the lock connection is alive and still holds the advisory lock."""
+        try:
+            cursor = AutomationService._scheduler_lock.dbapi_connection.cursor()
+            cursor.execute(
+                "SELECT EXISTS (SELECT 1 FROM pg_locks WHERE locktype = 'advisory' AND granted "
+                "AND pid = pg_backend_pid() AND classid = 0 AND objid = %s AND objsubid = 1)",
+                (AutomationService.SCHEDULER_LOCK_ID,)
+            )
+            return cursor.fetchone()[0]
+        except Exception:
+            return False
+    
+    @staticmethod
+    def _acquire_scheduler_lock(app) -> bool:
+        """Try to take the scheduler advisory lock on a dedicated connection."""
+        if app.config['DB_PGBOUNCER']:
+            print("Advisory locks are unreliable through PgBouncer transaction mode; "
+                  "use SCHEDULER_MODE=off with `flask run-scheduler`")
+            return False
+        
+        try:
+            with app.app_context():
+                connection = db.engine.raw_connection()
+                # Keep the lock's session out of the request pool while it is held
+                connection.detach()
+        except Exception as e:
+            print(f"Scheduler election failed: {str(e)}")
+            return False
+        try:
+            raw = connection.dbapi_connection
+            raw.autocommit = True
+            cursor = raw.cursor()
+            cursor.execute("SELECT pg_try_advisory_lock(%s)", (AutomationService.SCHEDULER_LOCK_ID,))
+            acquired = cursor.fetchone()[0]
+        except Exception as e:
+            print(f"Scheduler election failed: {str(e)}")
+            acquired = False
+        
+        if acquired:
+            AutomationService._scheduler_lock = connection
+        else:
+            connection.close()
+        return acquired
+    
     @staticmethod
     def setup_scheduled_jobs():
         """Setup scheduled background jobs."""
+        app = current_app._get_current_object()
+        
         # Check for inactive leads every hour
         scheduler.add_job(
-            AutomationService._check_inactive_leads,
+            AutomationService._run_in_app_context,
             'interval',
+            args=[app, AutomationService._check_inactive_leads],
             hours=1,
             id='check_inactive_leads',
             replace_existing=True
         )
         
-        # Start scheduler
+        # Repair any drift in the KPI counters every night
+        scheduler.add_job(
+            AutomationService._run_in_app_context,
+            'cron',
+            args=[app, AutomationService._reconcile_kpi_counters],
+            hour=3,
+            id='reconcile_kpi_counters',
+            replace_existing=True
+        )
+        
+        # Sweep the whole lead table for duplicates every night
+        scheduler.add_job(
+            AutomationService._run_in_app_context,
+            'cron',
+            args=[app, AutomationService._detect_duplicate_leads],
+            hour=2,
+            id='detect_duplicate_leads',
+            replace_existing=True
+        )
+        
+        # Refresh lead scores nightly so activity recency decays
+        scheduler.add_job(
+            AutomationService._run_in_app_context,
+            'cron',
+            args=[app, AutomationService._rescore_leads],
+            hour=4,
+            id='rescore_leads',
+            replace_existing=True
+        )
+        
+        # Drop expired report job results and fail jobs whose worker went away
+        scheduler.add_job(
+            AutomationService._run_in_app_context,
+            'interval',
+            args=[app, AutomationService._clean_up_report_jobs],
+            minutes=15,
+            id='clean_up_report_jobs',
+            replace_existing=True
+        )
+        
+        # Start scheduler (again, after a re-election, without a second listener)
+        scheduler.remove_listener(AutomationService._record_job_run)
+        scheduler.add_listener(AutomationService._record_job_run, EVENT_JOB_EXECUTED | EVENT_JOB_ERROR)
         scheduler.start()
     
+    @staticmethod
+    def _record_job_run(event) -> None:
+        with AutomationService._job_runs_lock:
+            AutomationService._job_runs[event.job_id] = {
+                'scheduled_at': event.scheduled_run_time,
+                'finished_at': datetime.now(event.scheduled_run_time.tzinfo),
+                'error': type(event.exception).__name__ if event.exception else None
+            }
+    
+    @staticmethod
+    def get_job_status() -> list:
+        """Get each scheduled job's next run, lag and last outcome in this process.
+        
+        Lag is how long a job has been due without starting, which grows
+        when the executor is stuck or the process was suspended. Turnaround
+        runs from the scheduled time to the end of the last run.
+        """
+        if not scheduler.running:
+            return []
+        
+        with AutomationService._job_runs_lock:
+            runs = dict(AutomationService._job_runs)
+        
+        jobs = []
+        for job in scheduler.get_jobs():
+            next_run = job.next_run_time
+            now = datetime.now(next_run.tzinfo) if next_run else None
+            last = runs.get(job.id)
+            jobs.append({
+                'id': job.id,
+                'next_run_at': next_run.isoformat() if next_run else None,
+                'lag_seconds': max(0, round((now - next_run).total_seconds())) if next_run else None,
+                'last_finished_at': last['finished_at'].isoformat() if last else None,
+                'last_turnaround_seconds': round((last['finished_at'] - last['scheduled_at']).total_seconds(), 1) if last else None,
+                'last_error': last['error'] if last else None
+            })
+        return jobs
+    
+    @staticmethod
+    def _run_in_app_context(app, job) -> None:
+        """Run a scheduled job inside the application context."""
+        with app.app_context():
+            job()
+    
+    @staticmethod
+    def _reconcile_kpi_counters():
+        """Recompute KPI counters and report repaired drift."""
+        from services.kpi_service import KpiService
+        repaired = KpiService.reconcile()
+        if repaired > 0:
+            print(f"Reconciled {repaired} drifted KPI counters")
+    
+    @staticmethod
+    def _detect_duplicate_leads():
+        """Run batch duplicate detection over all leads."""
+        from services.duplicate_service import DuplicateService
+        found = DuplicateService.detect_all()
+        if found > 0:
+            print(f"Found {found} likely duplicate lead pairs")
+    
+    @staticmethod
+    def _rescore_leads():
+        """Recompute every lead's priority score."""
+        from services.scoring_service import ScoringService
+        ScoringService.score_leads()
+    
+    @staticmethod
+    def _clean_up_report_jobs():
+        """Delete expired report jobs and fail abandoned ones."""
+        from services.report_job_service import ReportJobService
+        result = ReportJobService.clean_up()
+        if result['failed'] > 0:
+            print(f"Failed {result['failed']} abandoned report jobs")
+    
     @staticmethod
     def _check_inactive_leads():
         """Check for inactive leads and create follow-up tasks."""
@@ -210,3 +499,16 @@ class AutomationService:
                 'user_id': user_id
             }
             AutomationService.trigger_workflow('task_completed', context)
+    
+    @staticmethod
+    def on_tasks_completed(tasks: list, user_id: int = None) -> None:
+        """Handle a batch of task completed events.
+        
+        Each task is a dict with task_id and lead_id.
+        """
+        contexts = [
+            {'task_id': task['task_id'], 'lead_id': task['lead_id'], 'user_id': user_id}
+            for task in tasks
+        ]
+        if contexts:
+            AutomationService.trigger_workflow_batch('task_completed', contexts)
@@ -0,0 +1,229 @@
+"""Cohort and time-to-conversion analytics service."""
+from datetime import date, datetime, timedelta
+from flask import current_app
+from sqlalchemy import func, extract, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from models import Lead, Application, Source, CohortSnapshot
+from extensions import db
+from services.report_range import ReportRange
+
+
+class CohortService:
+    """Service for conversion timing of monthly lead cohorts.
+    
+    A cohort is the leads created in one calendar month (UTC). For each
+    milestone it reports how many leads reached it, how long they took
+    (mean, median and p90 days from lead creation) and a conversion curve.
+    Results are stored per cohort; closed cohorts are computed once and
+    open ones again after COHORT_CACHE_TTL.
+    """
+    
+    # Milestone name -> timestamp reached
+    MILESTONES = {
+        'application': Application.created_at,
+        'fee_paid': Application.fee_paid_at,
+        'enrolled': Application.enrollment_date
+    }
+    
+    # Conversion curve points, in days since lead creation
+    CURVE_DAYS = [7, 14, 30, 60, 90, 180, 365]
+    
+    # Roles allowed to force a recompute
+    REFRESH_ROLES = ['Admin', 'Team Lead', 'Digital Manager']
+    
+    @staticmethod
+    def _add_months(month: date, months: int) -> date:
+        index = month.year * 12 + month.month - 1 + months
+        return date(index // 12, index % 12 + 1, 1)
+    
+    @staticmethod
+    def _is_closed(cohort: date, now: datetime) -> bool:
+        ends = datetime.combine(CohortService._add_months(cohort, 1), datetime.min.time())
+        return ends + timedelta(days=current_app.config['COHORT_CLOSE_AFTER_DAYS']) <= now
+    
+    @staticmethod
+    def _compute(start: date, end: date) -> dict:
+        """Compute the statistics of every cohort in [start, end) in one query.
+        
+        Grouping sets return each cohort per source and in total. Durations
+        are ordered-set aggregates over the lead/application join, so only
+        one row per cohort and source leaves the database.
+        """
+        cohort = func.date_trunc('month', Lead.created_at)
+        columns = [
+            cohort.label('cohort'),
+            Lead.source_id,
+            func.grouping(Lead.source_id).label('all_sources'),
+            func.count(Lead.id).label('leads')
+        ]
+        for name, reached_at in CohortService.MILESTONES.items():
+            days = func.greatest(extract('epoch', reached_at - Lead.created_at) / 86400, 0)
+            columns += [
+                func.count(reached_at).label(f'{name}_reached'),
+                func.avg(days).label(f'{name}_mean'),
+                func.percentile_cont(0.5).within_group(days).label(f'{name}_median'),
+                func.percentile_cont(0.9).within_group(days).label(f'{name}_p90')
+            ]
+            columns += [
+                func.count(reached_at).filter(days <= within).label(f'{name}_within_{within}')
+                for within in CohortService.CURVE_DAYS
+            ]
+        
+        rows = db.session.query(*columns).select_from(Lead).outerjoin(
+            Application, Application.lead_id == Lead.id
+        ).filter(
+            Lead.created_at >= start,
+            Lead.created_at < end,
+            Lead.status != 'merged'
+        ).group_by(
+            func.grouping_sets(tuple_(cohort, Lead.source_id), tuple_(cohort))
+        ).all()
+        
+        def rounded(value):
+            return round(float(value), 2) if value is not None else None
+        
+        def stats(row) -> dict:
+            milestones = {}
+            for name in CohortService.MILESTONES:
+                reached = getattr(row, f'{name}_reached')
+                milestones[name] = {
+                    'reached': reached,
+                    'conversion_rate': round(reached / row.leads * 100, 2) if row.leads else 0,
+                    'mean_days': rounded(getattr(row, f'{name}_mean')),
+                    'median_days': rounded(getattr(row, f'{name}_median')),
+                    'p90_days': rounded(getattr(row, f'{name}_p90')),
+                    'curve': [
+                        {
+                            'days': within,
+                            'conversion_rate': round(getattr(row, f'{name}_within_{within}') / row.leads * 100, 2) if row.leads else 0
+                        }
+                        for within in CohortService.CURVE_DAYS
+                    ]
+                }
+            return {'leads': row.leads, 'milestones': milestones}
+        
+        cohorts = {}
+        for row in rows:
+            entry = cohorts.setdefault(row.cohort.date(), {'sources': []})
+            if row.all_sources:
+                entry.update(stats(row))
+            else:
+                entry['sources'].append({'source_id': row.source_id, **stats(row)})
+        return cohorts
+    
+    @staticmethod
+    def _empty() -> dict:
+        return {
+            'leads': 0,
+            'milestones': {
+                name: {
+                    'reached': 0,
+                    'conversion_rate': 0,
+                    'mean_days': None,
+                    'median_days': None,
+                    'p90_days': None,
+                    'curve': [{'days': within, 'conversion_rate': 0} for within in CohortService.CURVE_DAYS]
+                }
+                for name in CohortService.MILESTONES
+            },
+            'sources': []
+        }
+    
+    @staticmethod
+    def refresh(cohorts: list, now: datetime = None) -> dict:
+        """Recompute and store the given cohorts; returns {cohort: snapshot data}."""
+        now = now or datetime.utcnow()
+        computed = CohortService._compute(min(cohorts), CohortService._add_months(max(cohorts), 1))
+        
+        results = {}
+        for cohort in cohorts:
+            data = computed.get(cohort) or CohortService._empty()
+            closed = CohortService._is_closed(cohort, now)
+            db.session.execute(
+                insert(CohortSnapshot).values(cohort=cohort, closed=closed, data=data, computed_at=now)
+                .on_conflict_do_update(
+                    index_elements=['cohort'],
+                    set_={'closed': closed, 'data': data, 'computed_at': now}
+                )
+            )
+            results[cohort] = data
+        db.session.commit()
+        return results
+    
+    @staticmethod
+    def get_cohorts(months: int = 12, source_id: int = None, refresh: bool = False,
+                    period: ReportRange = None) -> list:
+        """Get time-to-conversion statistics for monthly cohorts.
+        
+        Covers the UTC months overlapping `period` where it is bounded,
+        otherwise the last `months` months. Stored snapshots are used for
+        closed cohorts and for open ones computed within COHORT_CACHE_TTL;
+        the rest are recomputed together. `refresh` recomputes every
+        requested open cohort; closed ones no longer change. At most
+        COHORT_MAX_MONTHS cohorts are covered.
+        """
+        max_months = current_app.config['COHORT_MAX_MONTHS']
+        if not 1 <= months <= max_months:
+            raise ValueError(f"months must be between 1 and {max_months}")
+        
+        now = datetime.utcnow()
+        current = now.date().replace(day=1)
+        last = current
+        if period is not None and period.end:
+            last = min(current, (period.end_utc - timedelta(microseconds=1)).date().replace(day=1))
+        if period is not None and period.start:
+            first = period.start_utc.date().replace(day=1)
+        else:
+            first = CohortService._add_months(last, 1 - months)
+        count = (last.year - first.year) * 12 + last.month - first.month + 1
+        if count > max_months:
+            raise ValueError(f"Cohort reports cover at most {max_months} months; narrow 'from' and 'to'")
+        cohorts = [CohortService._add_months(first, offset) for offset in range(count)]
+        if not cohorts:
+            return []
+        
+        snapshots = {
+            snapshot.cohort: snapshot
+            for snapshot in CohortSnapshot.query.filter(
+                CohortSnapshot.cohort >= first, CohortSnapshot.cohort <= last
+            ).all()
+        }
+        fresh_after = now - timedelta(seconds=current_app.config['COHORT_CACHE_TTL'])
+        stale = [
+            cohort for cohort in cohorts
+            if cohort not in snapshots
+            or (not snapshots[cohort].closed and (refresh or snapshots[cohort].computed_at < fresh_after))
+        ]
+        
+        data = {cohort: snapshots[cohort].data for cohort in cohorts if cohort in snapshots}
+        computed_at = {cohort: snapshots[cohort].computed_at for cohort in data}
+        if stale:
+            data.update(CohortService.refresh(stale, now))
+            computed_at.update({cohort: now for cohort in stale})
+        
+        source_names = dict(db.session.query(Source.id, Source.name).all())
+        results = []
+        for cohort in cohorts:
+            entry = data[cohort]
+            sources = [
+                {**source, 'source_name': source_names.get(source['source_id'])}
+                for source in entry['sources']
+            ]
+            result = {
+                'cohort': cohort.strftime('%Y-%m'),
+                'closed': CohortService._is_closed(cohort, now),
+                'computed_at': computed_at[cohort].isoformat(),
+                'leads': entry['leads'],
+                'milestones': entry['milestones'],
+                'sources': sorted(sources, key=lambda x: x['leads'], reverse=True)
+            }
+            if source_id is not None:
+                match = next((source for source in sources if source['source_id'] == source_id), None)
+                result.update({
+                    'leads': match['leads'] if match else 0,
+                    'milestones': match['milestones'] if match else CohortService._empty()['milestones'],
+                    'sources': [match] if match else []
+                })
+            results.append(result)
+        
+        return results
@@ -0,0 +1,75 @@
+"""Row count service."""
+import math
+from flask import current_app
+from sqlalchemy import select, func, table, column
+from extensions import db
+
+
+class CountService:
+    """Service for list totals that avoid full counts on large tables.
+    
+    Exact COUNT(*) reads every matching row. In 'approximate' COUNT_MODE,
+    totals come from statistics instead: pg_class.reltuples for a whole
+    table and the planner's row estimate for a filtered query. Estimates
+    below APPROX_COUNT_THRESHOLD are replaced by an exact count, which is
+    cheap at that size, so small lists and narrow filters stay exact.
+    """
+    
+    @staticmethod
+    def table_rows(table_name: str) -> int:
+        """Get the row estimate Postgres keeps for a table, or None before its first ANALYZE."""
+        # A SELECT, so routes reading from the replica keep doing so
+        reltuples = db.session.execute(
+            select(column('reltuples')).select_from(table('pg_class'))
+            .where(column('oid') == func.to_regclass(table_name))
+        ).scalar()
+        if reltuples is None or reltuples < 0:
+            return None
+        return int(reltuples)
+    
+    @staticmethod
+    def estimate_rows(query) -> int:
+        """Get the planner's row estimate for a query without running it."""
+        statement = query.order_by(None).statement
+        connection = db.session.connection(bind_arguments={
+            'mapper': query.column_descriptions[0]['entity'],
+            'clause': statement
+        })
+        compiled = statement.compile(dialect=connection.dialect, compile_kwargs={'render_postcompile': True})
+        plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled.string}", compiled.params).scalar()
+        return int(plan[0]['Plan']['Plan Rows'])
+    
+    @staticmethod
+    def count(query, exact: bool = False) -> tuple:
+        """Count a query's rows; returns (total, is_approximate)."""
+        query = query.order_by(None)
+        if exact or current_app.config['COUNT_MODE'] != 'approximate':
+            return query.count(), False
+        
+        statement = query.statement
+        if statement.whereclause is None:
+            estimate = CountService.table_rows(query.column_descriptions[0]['entity'].__tablename__)
+        else:
+            estimate = CountService.estimate_rows(query)
+        
+        if estimate is None or estimate < current_app.config['APPROX_COUNT_THRESHOLD']:
+            return query.count(), False
+        return estimate, True
+    
+    @staticmethod
+    def paginate(query, page: int = 1, per_page: int = 20, exact: bool = False) -> dict:
+        """Get one page of a query with its total.
+        
+        Returns the page's model instances under 'items' plus the usual
+        pagination fields and 'total_is_approximate'.
+        """
+        pagination = query.paginate(page=page, per_page=per_page, error_out=False, count=False)
+        total, approximate = CountService.count(query, exact)
+        return {
+            'items': pagination.items,
+            'total': total,
+            'pages': math.ceil(total / per_page) if per_page else 0,
+            'current_page': page,
+            'per_page': per_page,
+            'total_is_approximate': approximate
+        }
@@ -0,0 +1,340 @@
+"""Duplicate lead detection service."""
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import select, func, or_, and_
+from sqlalchemy.orm import aliased
+from sqlalchemy.dialects.postgresql import insert
+from models import Lead, LeadDuplicate, Application, Activity, Task, StageTransition
+from extensions import db
+from services.count_service import CountService
+
+
+class DuplicateService:
+    """Service for detecting and merging leads that belong to the same student."""
+    
+    # Similarity signals and their weight in the pair score
+    SIGNALS = ['phone', 'email_local', 'full_name', 'last_name_sound']
+    WEIGHTS = [0.35, 0.25, 0.3, 0.1]
+    
+    # Character bigrams are hashed into this many count columns
+    BIGRAM_BUCKETS = 512
+    
+    # Pairs scored per chunk, bounding the gathered bigram matrices
+    SCORE_CHUNK_SIZE = 4096
+    
+    @staticmethod
+    def _bigram_counts(strings: list):
+        """Encode strings as hashed character-bigram count rows.
+        
+        Strings are lowercased and padded with a space at each end, then
+        turned into a fixed-width code point array, so every bigram of
+        every string is hashed and counted without a Python loop per
+        character. Missing strings get an all-zero row.
+        """
+        import numpy as np
+        
+        padded = [f" {value.lower()} " if value else '' for value in strings]
+        width = max((len(value) for value in padded), default=0)
+        counts = np.zeros((len(strings), DuplicateService.BIGRAM_BUCKETS), dtype=np.float32)
+        if width < 2:
+            return counts
+        
+        codes = np.array(padded, dtype=f'U{width}').view(np.uint32).reshape(len(strings), width).astype(np.int64)
+        first, second = codes[:, :-1], codes[:, 1:]
+        present = (first != 0) & (second != 0)
+        buckets = (first * 1000003 + second) % DuplicateService.BIGRAM_BUCKETS
+        rows = np.broadcast_to(np.arange(len(strings))[:, None], buckets.shape)
+        np.add.at(counts, (rows[present], buckets[present]), 1)
+        return counts
+    
+    @staticmethod
+    def _similarities(counts, a_index, b_index):
+        """Get the bigram Dice coefficient of each (a, b) row pair, 0 when either is missing."""
+        import numpy as np
+        
+        similarity = np.zeros(len(a_index))
+        for start in range(0, len(a_index), DuplicateService.SCORE_CHUNK_SIZE):
+            chunk = slice(start, start + DuplicateService.SCORE_CHUNK_SIZE)
+            a, b = counts[a_index[chunk]], counts[b_index[chunk]]
+            overlap = np.minimum(a, b).sum(axis=1)
+            total = a.sum(axis=1) + b.sum(axis=1)
+            similarity[chunk] = np.divide(2 * overlap, total, out=np.zeros(len(total)), where=total > 0)
+        return similarity
+    
+    @staticmethod
+    def _matches(values: list, a_index, b_index):
+        """Get 1.0 where both leads of a pair have the same non-empty value."""
+        import numpy as np
+        
+        keys, codes = np.unique(np.array([value or '' for value in values], dtype=str), return_inverse=True)
+        missing = 0 if len(keys) and keys[0] == '' else -1
+        return ((codes[a_index] == codes[b_index]) & (codes[a_index] != missing)).astype(float)
+    
+    @staticmethod
+    def _candidate_pairs(lead_ids: list) -> set:
+        """Find candidate pairs for leads that share a blocking key with another lead.
+        
+        Key values shared by more than DUPLICATE_MAX_BLOCK_SIZE leads (a
+        switchboard number, a common surname) are skipped: they carry little
+        evidence and would make the pair count quadratic in the block size.
+        Leads in such a block still pair through their other keys.
+        """
+        max_block = current_app.config['DUPLICATE_MAX_BLOCK_SIZE']
+        other = aliased(Lead)
+        conditions = []
+        for key in ('phone_key', 'name_key', 'email_local_key'):
+            column = getattr(Lead, key)
+            oversized = select(column).where(
+                column.in_(select(column).where(Lead.id.in_(lead_ids))),
+                Lead.status != 'merged'
+            ).group_by(column).having(func.count() > max_block)
+            conditions.append(and_(
+                column.isnot(None),
+                getattr(other, key) == column,
+                column.notin_(oversized)
+            ))
+        
+        rows = db.session.query(Lead.id, other.id).join(
+            other,
+            and_(other.id != Lead.id, or_(*conditions))
+        ).filter(
+            Lead.id.in_(lead_ids),
+            Lead.status != 'merged',
+            other.status != 'merged'
+        ).all()
+        return {(min(a, b), max(a, b)) for a, b in rows}
+    
+    @staticmethod
+    def score_pairs(pairs: list) -> tuple:
+        """Score candidate pairs.
+        
+        Each lead's strings are encoded once; the features of all pairs
+        are then computed with array operations over the pair indexes and
+        scored with a single weighted matrix product. Returns (scores, features).
+        """
+        import numpy as np
+        
+        lead_ids = sorted({lead_id for pair in pairs for lead_id in pair})
+        leads = {
+            row.id: row
+            for row in db.session.query(
+                Lead.id, Lead.first_name, Lead.last_name,
+                Lead.email_local_key, Lead.phone_key, Lead.name_key
+            ).filter(Lead.id.in_(lead_ids))
+        }
+        leads = [leads[lead_id] for lead_id in lead_ids]
+        position = {lead_id: i for i, lead_id in enumerate(lead_ids)}
+        a_index = np.array([position[a] for a, _ in pairs], dtype=np.int64)
+        b_index = np.array([position[b] for _, b in pairs], dtype=np.int64)
+        
+        features = np.column_stack([
+            DuplicateService._matches([lead.phone_key for lead in leads], a_index, b_index),
+            DuplicateService._similarities(
+                DuplicateService._bigram_counts([lead.email_local_key for lead in leads]), a_index, b_index
+            ),
+            DuplicateService._similarities(
+                DuplicateService._bigram_counts([f"{lead.first_name} {lead.last_name}" for lead in leads]),
+                a_index, b_index
+            ),
+            DuplicateService._matches([(lead.name_key or '')[:4] for lead in leads], a_index, b_index)
+        ])
+        
+        return features @ DuplicateService.WEIGHTS, features
+    
+    @staticmethod
+    def detect_for_leads(lead_ids: list) -> int:
+        """Score candidates for the given leads and record likely duplicates.
+        
+        Returns the number of pairs at or above the match threshold.
+        """
+        if not lead_ids:
+            return 0
+        
+        pairs = sorted(DuplicateService._candidate_pairs(lead_ids))
+        if not pairs:
+            return 0
+        
+        scores, features = DuplicateService.score_pairs(pairs)
+        threshold = current_app.config['DUPLICATE_MATCH_THRESHOLD']
+        matches = (scores >= threshold).nonzero()[0]
+        if not len(matches):
+            return 0
+        
+        now = datetime.utcnow()
+        rows = [
+            {
+                'lead_id': pairs[i][0],
+                'duplicate_id': pairs[i][1],
+                'score': float(scores[i]),
+                'reasons': {
+                    signal: round(float(value), 3)
+                    for signal, value in zip(DuplicateService.SIGNALS, features[i])
+                },
+                'status': 'pending',
+                'created_at': now,
+                'updated_at': now
+            }
+            for i in matches
+        ]
+        
+        # Re-scoring refreshes pending pairs; resolved pairs keep their decision
+        table = LeadDuplicate.__table__
+        stmt = insert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            constraint='uq_lead_duplicates_pair',
+            set_={
+                'score': stmt.excluded.score,
+                'reasons': stmt.excluded.reasons,
+                'updated_at': stmt.excluded.updated_at
+            },
+            where=table.c.status == 'pending'
+        )
+        db.session.execute(stmt)
+        db.session.commit()
+        
+        return len(rows)
+    
+    @staticmethod
+    def detect_all(batch_size: int = 1000) -> int:
+        """Run detection over every lead in id-ordered batches."""
+        found = 0
+        last_id = 0
+        while True:
+            lead_ids = [
+                lead_id for (lead_id,) in db.session.query(Lead.id).filter(
+                    Lead.id > last_id,
+                    Lead.status != 'merged'
+                ).order_by(Lead.id).limit(batch_size)
+            ]
+            if not lead_ids:
+                break
+            found += DuplicateService.detect_for_leads(lead_ids)
+            last_id = lead_ids[-1]
+        return found
+    
+    @staticmethod
+    def get_duplicates(status: str = 'pending', page: int = 1, per_page: int = 20,
+                       mask_sensitive: bool = False, exact_count: bool = False) -> dict:
+        """Get duplicate pairs, highest score first."""
+        query = LeadDuplicate.query
+        if status:
+            query = query.filter(LeadDuplicate.status == status)
+        
+        result = CountService.paginate(
+            query.order_by(LeadDuplicate.score.desc(), LeadDuplicate.id),
+            page, per_page, exact_count
+        )
+        result['items'] = [pair.to_dict(mask_sensitive=mask_sensitive) for pair in result['items']]
+        return result
+    
+    @staticmethod
+    def dismiss(pair_id: int, user_id: int = None) -> LeadDuplicate:
+        """Mark a candidate pair as not a duplicate."""
+        pair = LeadDuplicate.query.get(pair_id)
+        if not pair:
+            raise ValueError("Duplicate pair not found")
+        
+        pair.status = 'dismissed'
+        pair.resolved_by = user_id
+        pair.resolved_at = datetime.utcnow()
+        db.session.commit()
+        return pair
+    
+    @staticmethod
+    def merge(primary_id: int, duplicate_ids: list, user_id: int = None) -> dict:
+        """Merge duplicate leads into a primary lead.
+        
+        Tasks, activities and stage transitions are reparented with one
+        UPDATE each. The first duplicate application moves over when the
+        primary has none; duplicates are kept as 'merged' tombstones
+        pointing at the primary.
+        """
+        duplicate_ids = sorted(set(duplicate_ids or []) - {primary_id})
+        if not duplicate_ids:
+            raise ValueError("duplicate_ids is required")
+        
+        leads = Lead.query.filter(
+            Lead.id.in_([primary_id] + duplicate_ids)
+        ).order_by(Lead.id).with_for_update(of=Lead).all()
+        by_id = {lead.id: lead for lead in leads}
+        
+        primary = by_id.get(primary_id)
+        if not primary:
+            raise ValueError("Lead not found")
+        if primary.status == 'merged':
+            raise ValueError("Primary lead has already been merged")
+        duplicates = [by_id[lead_id] for lead_id in duplicate_ids if lead_id in by_id]
+        if len(duplicates) != len(duplicate_ids) or any(d.status == 'merged' for d in duplicates):
+            raise ValueError("Duplicate leads not found or already merged")
+        
+        tasks_moved = db.session.execute(
+            Task.__table__.update()
+            .where(Task.__table__.c.lead_id.in_(duplicate_ids))
+            .values(lead_id=primary_id)
+        ).rowcount
+        activities_moved = db.session.execute(
+            Activity.__table__.update()
+            .where(Activity.__table__.c.lead_id.in_(duplicate_ids))
+            .values(lead_id=primary_id)
+        ).rowcount
+        # Stage history moves too, so cohort and time-in-stage reports keep counting it
+        db.session.execute(
+            StageTransition.__table__.update()
+            .where(StageTransition.__table__.c.lead_id.in_(duplicate_ids))
+            .values(lead_id=primary_id)
+        )
+        
+        # A lead holds at most one application
+        application_moved = None
+        if not db.session.query(Application.id).filter(Application.lead_id == primary_id).first():
+            application = db.session.query(Application.id).filter(
+                Application.lead_id.in_(duplicate_ids)
+            ).order_by(Application.created_at).first()
+            if application:
+                db.session.execute(
+                    Application.__table__.update()
+                    .where(Application.__table__.c.id == application.id)
+                    .values(lead_id=primary_id)
+                )
+                application_moved = application.id
+        
+        # Status and counters change through the ORM so the KPI listener sees them
+        now = datetime.utcnow()
+        for duplicate in duplicates:
+            primary.re_inquiry_count = (primary.re_inquiry_count or 0) + (duplicate.re_inquiry_count or 0) + 1
+            if not primary.phone and duplicate.phone:
+                primary.phone = duplicate.phone
+            duplicate.status = 'merged'
+            duplicate.merged_into_id = primary_id
+            duplicate.updated_at = now
+        primary.updated_at = now
+        
+        # Pairs among merged leads are resolved
+        db.session.query(LeadDuplicate).filter(
+            LeadDuplicate.status == 'pending',
+            or_(
+                LeadDuplicate.lead_id.in_(duplicate_ids),
+                LeadDuplicate.duplicate_id.in_(duplicate_ids)
+            )
+        ).update({
+            'status': 'merged',
+            'resolved_by': user_id,
+            'resolved_at': now
+        }, synchronize_session=False)
+        
+        Activity.log_many([{
+            'lead_id': primary_id,
+            'type': 'system',
+            'description': f"Merged {len(duplicates)} duplicate lead(s): {', '.join(map(str, duplicate_ids))}",
+            'user_id': user_id,
+            'metadata': {'merged_lead_ids': duplicate_ids}
+        }])
+        db.session.commit()
+        
+        return {
+            'lead_id': primary_id,
+            'merged_ids': duplicate_ids,
+            'tasks_moved': tasks_moved,
+            'activities_moved': activities_moved,
+            'application_moved': application_moved
+        }
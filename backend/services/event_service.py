@@ -0,0 +1,316 @@
+"""Change event service."""
+import hashlib
+import json
+import queue
+import secrets
+import select
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import event, inspect, text, delete
+from models import Lead, Task, Activity, Application, EventTicket
+from extensions import db
+
+
+class EventBroker:
+    """In-process pub/sub fanning committed change events out to stream subscribers."""
+    
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+    
+    def subscribe(self, maxsize: int, limit: int = None) -> queue.Queue:
+        """Add a subscriber, or return None when `limit` subscribers are open."""
+        subscription = queue.Queue(maxsize=maxsize)
+        with self._lock:
+            if limit is not None and len(self._subscribers) >= limit:
+                return None
+            self._subscribers.add(subscription)
+        return subscription
+    
+    def unsubscribe(self, subscription: queue.Queue) -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+    
+    def backlog(self) -> tuple:
+        """Get (subscriber count, event batches waiting to be streamed)."""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        return len(subscribers), sum(subscription.qsize() for subscription in subscribers)
+    
+    def publish(self, events: list) -> None:
+        """Deliver a batch of events to every subscriber without blocking.
+        
+        A subscriber that has fallen too far behind is reset to a single
+        'resync' event telling the client to refetch.
+        """
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.put_nowait(events)
+            except queue.Full:
+                while True:
+                    try:
+                        subscription.get_nowait()
+                    except queue.Empty:
+                        break
+                subscription.put_nowait([{'entity': 'resync', 'action': 'resync'}])
+
+
+class EventService:
+    """Service publishing lead, task, activity and application change events."""
+    
+    broker = EventBroker()
+    
+    ENTITY_MODELS = {
+        'lead': Lead,
+        'task': Task,
+        'activity': Activity,
+        'application': Application
+    }
+    
+    # Postgres NOTIFY channel used by the 'postgres' backend
+    CHANNEL = 'crm_events'
+    # NOTIFY payloads must stay under 8000 bytes
+    MAX_NOTIFY_EVENTS = 50
+    
+    # Roles that receive every event; other roles only see their own leads and tasks
+    UNSCOPED_ROLES = ['Admin', 'Team Lead', 'Digital Manager']
+    
+    PENDING_KEY = 'pending_events'
+    OUTGOING_KEY = 'outgoing_events'
+    
+    _listener = None
+    _listener_lock = threading.Lock()
+    
+    @staticmethod
+    def register_listeners() -> None:
+        """Collect change events on flush and publish them once the transaction commits."""
+        if event.contains(db.session, 'after_commit', EventService._after_commit):
+            return
+        event.listen(db.session, 'after_flush', EventService._after_flush)
+        event.listen(db.session, 'before_commit', EventService._before_commit)
+        event.listen(db.session, 'after_commit', EventService._after_commit)
+        event.listen(db.session, 'after_rollback', EventService._after_rollback)
+    
+    @staticmethod
+    def _entity_for(obj) -> str:
+        for entity, model in EventService.ENTITY_MODELS.items():
+            if isinstance(obj, model):
+                return entity
+        return None
+    
+    @staticmethod
+    def _owners(obj) -> list:
+        """Get current and previous assignees of a lead or task."""
+        if not hasattr(obj, 'assigned_to'):
+            return []
+        history = inspect(obj).attrs.assigned_to.history
+        owners = {obj.assigned_to, *history.deleted}
+        return sorted(owner for owner in owners if owner is not None)
+    
+    @staticmethod
+    def queue_events(entity: str, action: str, rows: list, session=None) -> None:
+        """Queue events for rows changed by set-based statements.
+        
+        Each row is a dict with 'id' and optionally 'lead_id' and 'owners';
+        missing owners are resolved from the lead before publishing.
+        """
+        session = session or db.session
+        session.info.setdefault(EventService.PENDING_KEY, []).extend(
+            {
+                'entity': entity,
+                'action': action,
+                'id': row['id'],
+                'lead_id': row.get('lead_id', row['id'] if entity == 'lead' else None),
+                'owners': row.get('owners')
+            }
+            for row in rows
+        )
+    
+    @staticmethod
+    def _after_flush(session, flush_context) -> None:
+        """Record created, updated and deleted rows."""
+        events = []
+        for action, objs in (('created', session.new), ('updated', session.dirty), ('deleted', session.deleted)):
+            for obj in objs:
+                entity = EventService._entity_for(obj)
+                if not entity:
+                    continue
+                if action == 'updated' and not session.is_modified(obj, include_collections=False):
+                    continue
+                events.append({
+                    'entity': entity,
+                    'action': action,
+                    'id': obj.id,
+                    'lead_id': obj.id if entity == 'lead' else obj.lead_id,
+                    'owners': EventService._owners(obj) if entity in ('lead', 'task') else None
+                })
+        if events:
+            session.info.setdefault(EventService.PENDING_KEY, []).extend(events)
+    
+    @staticmethod
+    def _before_commit(session) -> None:
+        """Resolve event owners and hand the batch to the configured backend."""
+        session.flush()
+        events = session.info.pop(EventService.PENDING_KEY, None)
+        if not events:
+            return
+        
+        # Activities, applications and bulk rows inherit the owner of their lead
+        unresolved = {e['lead_id'] for e in events if e['owners'] is None and e['lead_id']}
+        if unresolved:
+            lead_owners = dict(session.execute(
+                text("SELECT id, assigned_to FROM leads WHERE id = ANY(:ids)"),
+                {'ids': list(unresolved)}
+            ).all())
+            for e in events:
+                if e['owners'] is None:
+                    owner = lead_owners.get(e['lead_id'])
+                    e['owners'] = [owner] if owner is not None else []
+        
+        if current_app.config['EVENTS_BACKEND'] == 'postgres':
+            # NOTIFY is transactional: delivered to listeners only if this commit succeeds
+            for start in range(0, len(events), EventService.MAX_NOTIFY_EVENTS):
+                session.execute(
+                    text("SELECT pg_notify(:channel, :payload)"),
+                    {
+                        'channel': EventService.CHANNEL,
+                        'payload': json.dumps(events[start:start + EventService.MAX_NOTIFY_EVENTS])
+                    }
+                )
+        else:
+            session.info.setdefault(EventService.OUTGOING_KEY, []).extend(events)
+    
+    @staticmethod
+    def _after_commit(session) -> None:
+        events = session.info.pop(EventService.OUTGOING_KEY, None)
+        if events:
+            EventService.broker.publish(events)
+    
+    @staticmethod
+    def _after_rollback(session) -> None:
+        session.info.pop(EventService.PENDING_KEY, None)
+        session.info.pop(EventService.OUTGOING_KEY, None)
+    
+    @staticmethod
+    def issue_ticket(user_id: int, role: str = None, token_expires_at: datetime = None) -> str:
+        """Issue a single-use stream ticket valid for EVENT_TICKET_TTL seconds.
+        
+        Tickets live in the database so any worker can redeem them.
+        """
+        now = datetime.utcnow()
+        ticket = secrets.token_urlsafe(32)
+        db.session.execute(delete(EventTicket).where(EventTicket.expires_at <= now))
+        db.session.add(EventTicket(
+            ticket_hash=hashlib.sha256(ticket.encode('utf-8')).hexdigest(),
+            user_id=user_id,
+            role=role,
+            token_expires_at=token_expires_at,
+            created_at=now,
+            expires_at=now + timedelta(seconds=current_app.config['EVENT_TICKET_TTL'])
+        ))
+        db.session.commit()
+        return ticket
+    
+    @staticmethod
+    def redeem_ticket(ticket: str):
+        """Consume a ticket; returns its (user_id, role, token_expires_at), or None if invalid or used."""
+        row = db.session.execute(
+            delete(EventTicket).where(
+                EventTicket.ticket_hash == hashlib.sha256(ticket.encode('utf-8')).hexdigest(),
+                EventTicket.expires_at > datetime.utcnow()
+            ).returning(EventTicket.user_id, EventTicket.role, EventTicket.token_expires_at)
+        ).first()
+        db.session.commit()
+        return row
+    
+    @staticmethod
+    def subscribe() -> queue.Queue:
+        """Open a subscription, starting the Postgres listener on first use.
+        
+        Returns None when this process already serves
+        EVENT_STREAM_MAX_PER_WORKER streams.
+        """
+        if current_app.config['EVENTS_BACKEND'] == 'postgres':
+            EventService._ensure_listener(current_app._get_current_object())
+        return EventService.broker.subscribe(
+            current_app.config['EVENT_STREAM_QUEUE_SIZE'],
+            EventService.max_streams(current_app.config)
+        )
+    
+    # Open streams per process under gevent, where a stream holds a greenlet rather than a thread
+    GEVENT_MAX_STREAMS = 200
+    
+    @staticmethod
+    def max_streams(config) -> int:
+        """Get how many streams one process may hold open.
+        
+        On thread workers every stream occupies a request thread until its
+        token expires, so two threads are always kept for other requests
+        (health checks included); a sync worker serves no streams at all.
+        """
+        if config['EVENT_STREAM_MAX_PER_WORKER']:
+            return config['EVENT_STREAM_MAX_PER_WORKER']
+        worker_class = config['GUNICORN_WORKER_CLASS']
+        if worker_class == 'gevent':
+            return EventService.GEVENT_MAX_STREAMS
+        threads = config['WEB_THREADS'] if worker_class == 'gthread' else 1
+        return max(0, threads - 2)
+    
+    @staticmethod
+    def unsubscribe(subscription: queue.Queue) -> None:
+        EventService.broker.unsubscribe(subscription)
+    
+    @staticmethod
+    def _ensure_listener(app) -> None:
+        if EventService._listener and EventService._listener.is_alive():
+            return
+        with EventService._listener_lock:
+            if EventService._listener and EventService._listener.is_alive():
+                return
+            EventService._listener = threading.Thread(
+                target=EventService._listen,
+                args=[app],
+                name='event-listener',
+                daemon=True
+            )
+            EventService._listener.start()
+    
+    @staticmethod
+    def _listen(app) -> None:
+        """LISTEN on the events channel and republish notifications in this process."""
+        with app.app_context():
+            connection = db.engine.raw_connection()
+            # Keep this long-lived connection out of the request pool
+            connection.detach()
+        raw = connection.dbapi_connection
+        raw.autocommit = True
+        raw.cursor().execute(f"LISTEN {EventService.CHANNEL}")
+        
+        try:
+            while True:
+                if select.select([raw], [], [], 60) == ([], [], []):
+                    continue
+                raw.poll()
+                while raw.notifies:
+                    notification = raw.notifies.pop(0)
+                    try:
+                        EventService.broker.publish(json.loads(notification.payload))
+                    except ValueError:
+                        print(f"Discarding malformed event notification: {notification.payload[:100]}")
+        except Exception as e:
+            print(f"Event listener stopped: {str(e)}")
+        finally:
+            connection.close()
+    
+    @staticmethod
+    def visible_events(events: list, user_id: int, role: str) -> list:
+        """Filter a batch to the events a user may see."""
+        if role in EventService.UNSCOPED_ROLES:
+            return events
+        return [
+            e for e in events
+            if e['entity'] == 'resync' or user_id in (e.get('owners') or [])
+        ]
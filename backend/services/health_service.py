@@ -0,0 +1,180 @@
+"""Health diagnostics service."""
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import text
+from models import LeadDuplicate, KpiCounter
+from extensions import db, scheduler
+from database import apply_statement_timeout, pool_metrics, replica_guard
+from services.automation_service import AutomationService
+from services.event_service import EventService
+
+
+class HealthService:
+    """Service reporting database, pool, scheduler and automation health.
+    
+    Diagnostics are computed by at most one thread per process every
+    HEALTH_DIAGNOSTICS_TTL seconds, with each query capped at
+    HEALTH_QUERY_TIMEOUT milliseconds, so probes cannot become load.
+    """
+    
+    _lock = threading.Lock()
+    _cached = None
+    _cached_at = 0.0
+    
+    @staticmethod
+    def get_diagnostics() -> dict:
+        """Get cached diagnostics, refreshing them when stale."""
+        ttl = current_app.config['HEALTH_DIAGNOSTICS_TTL']
+        if HealthService._cached and time.monotonic() - HealthService._cached_at < ttl:
+            return {**HealthService._cached, 'cached': True}
+        
+        # Another thread is refreshing; serve the previous result meanwhile
+        if not HealthService._lock.acquire(blocking=False):
+            if HealthService._cached:
+                return {**HealthService._cached, 'cached': True}
+            HealthService._lock.acquire()
+        try:
+            if not HealthService._cached or time.monotonic() - HealthService._cached_at >= ttl:
+                HealthService._cached = HealthService._collect()
+                HealthService._cached_at = time.monotonic()
+            return {**HealthService._cached, 'cached': False}
+        finally:
+            HealthService._lock.release()
+    
+    @staticmethod
+    def _collect() -> dict:
+        config = current_app.config
+        diagnostics = {
+            'checked_at': datetime.utcnow().isoformat(),
+            'pid': os.getpid(),
+            'database': HealthService._check_database(),
+            'pool': HealthService._check_pool()
+        }
+        if 'replica' in config['SQLALCHEMY_BINDS']:
+            status = replica_guard.status(db.engines['replica'], config['REPLICA_STATUS_TTL'])
+            diagnostics['replica'] = {
+                'reachable': status is not None,
+                'lag_seconds': round(status[1], 1) if status else None
+            }
+        
+        database_up = diagnostics['database']['ok']
+        diagnostics['scheduler'] = HealthService._check_scheduler(database_up)
+        diagnostics['automation'] = HealthService._check_automation(database_up)
+        diagnostics['aggregates'] = HealthService._check_aggregates(database_up)
+        diagnostics['status'] = HealthService._overall_status(diagnostics)
+        return diagnostics
+    
+    @staticmethod
+    def _query(sql: str, params: dict = None):
+        """Run one bounded diagnostic query in its own short transaction."""
+        try:
+            apply_statement_timeout(db.session.connection(), current_app.config['HEALTH_QUERY_TIMEOUT'])
+            return db.session.execute(text(sql), params or {}).scalar()
+        finally:
+            db.session.rollback()
+    
+    @staticmethod
+    def _check_database() -> dict:
+        started = time.perf_counter()
+        try:
+            HealthService._query("SELECT 1")
+        except Exception as e:
+            return {'ok': False, 'error': type(e).__name__}
+        return {'ok': True, 'latency_ms': round((time.perf_counter() - started) * 1000, 2)}
+    
+    @staticmethod
+    def _check_pool() -> dict:
+        pool = pool_metrics.snapshot()
+        capacity = pool['pool_size'] + current_app.config['SQLALCHEMY_ENGINE_OPTIONS'].get('max_overflow', 0)
+        pool['capacity'] = capacity
+        pool['utilization'] = round(pool['checked_out'] / capacity, 2) if capacity else None
+        return pool
+    
+    @staticmethod
+    def _check_scheduler(database_up: bool) -> dict:
+        """Report whether some process runs the jobs, and job lag if it is this one."""
+        result = {
+            'mode': current_app.config['SCHEDULER_MODE'],
+            'running_here': scheduler.running,
+            'jobs': AutomationService.get_job_status()
+        }
+        if result['mode'] == 'leader' and database_up:
+            try:
+                result['leader_elected'] = bool(HealthService._query(
+                    "SELECT EXISTS (SELECT 1 FROM pg_locks WHERE locktype = 'advisory' "
+                    "AND classid = 0 AND objid = :lock_id AND granted)",
+                    {'lock_id': AutomationService.SCHEDULER_LOCK_ID}
+                ))
+            except Exception as e:
+                result['leader_elected'] = None
+                result['error'] = type(e).__name__
+        lags = [job['lag_seconds'] for job in result['jobs'] if job['lag_seconds'] is not None]
+        result['max_lag_seconds'] = max(lags) if lags else None
+        return result
+    
+    @staticmethod
+    def _check_automation(database_up: bool) -> dict:
+        """Report queued automation work."""
+        subscribers, backlog = EventService.broker.backlog()
+        result = {'event_subscribers': subscribers, 'event_backlog': backlog}
+        if not database_up:
+            return result
+        
+        # Work waiting for the next hourly inactivity sweep
+        threshold = datetime.utcnow() - timedelta(hours=current_app.config['LEAD_INACTIVITY_THRESHOLD'])
+        queries = {
+            'inactive_leads_without_follow_up': (
+                "SELECT count(*) FROM leads l WHERE l.status = 'active' AND l.last_activity_at < :threshold "
+                "AND NOT EXISTS (SELECT 1 FROM tasks t WHERE t.lead_id = l.id "
+                "AND t.task_type = 'follow_up' AND t.status = 'pending')",
+                {'threshold': threshold}
+            ),
+            'pending_duplicate_reviews': (
+                f"SELECT count(*) FROM {LeadDuplicate.__tablename__} WHERE status = 'pending'",
+                None
+            )
+        }
+        for name, (sql, params) in queries.items():
+            try:
+                result[name] = HealthService._query(sql, params)
+            except Exception as e:
+                result[name] = None
+                result[f'{name}_error'] = type(e).__name__
+        return result
+    
+    @staticmethod
+    def _check_aggregates(database_up: bool) -> dict:
+        """Report how stale the KPI counters are."""
+        if not database_up:
+            return {}
+        try:
+            last_modified = HealthService._query(f"SELECT max(updated_at) FROM {KpiCounter.__tablename__}")
+        except Exception as e:
+            return {'error': type(e).__name__}
+        return {
+            'kpi_counters_updated_at': last_modified.isoformat() if last_modified else None,
+            'kpi_counters_age_seconds': round((datetime.utcnow() - last_modified).total_seconds()) if last_modified else None
+        }
+    
+    @staticmethod
+    def _overall_status(diagnostics: dict) -> str:
+        """'failing' when this worker cannot serve requests, 'degraded' when background work is behind."""
+        if not diagnostics['database']['ok']:
+            return 'failing'
+        pool = diagnostics['pool']
+        if pool['capacity'] and pool['checked_out'] >= pool['capacity']:
+            return 'failing'
+        
+        scheduler_info = diagnostics['scheduler']
+        max_lag = scheduler_info['max_lag_seconds']
+        if max_lag is not None and max_lag > current_app.config['SCHEDULER_MAX_LAG']:
+            return 'degraded'
+        if scheduler_info.get('leader_elected') is False:
+            return 'degraded'
+        replica = diagnostics.get('replica')
+        if replica and (not replica['reachable'] or replica['lag_seconds'] > current_app.config['REPLICA_MAX_LAG']):
+            return 'degraded'
+        return 'ok'
@@ -0,0 +1,207 @@
+"""KPI counter service."""
+from collections import Counter
+from sqlalchemy import event, func, inspect
+from sqlalchemy.dialects.postgresql import insert
+from models import Lead, Application, Task, KpiCounter
+from extensions import db
+
+
+class KpiService:
+    """Service maintaining incremental KPI counters on the write path."""
+    
+    ENTITY_MODELS = {
+        'lead': Lead,
+        'application': Application,
+        'task': Task
+    }
+    
+    @staticmethod
+    def register_listeners() -> None:
+        """Hook counter maintenance into every session flush."""
+        if event.contains(db.session, 'after_flush', KpiService._after_flush):
+            return
+        
+        # Make attribute history always carry the previous value, even when
+        # the attribute was expired by an earlier commit, so decrements are exact.
+        for entity, model in KpiService.ENTITY_MODELS.items():
+            for attr in KpiCounter.dimension_attrs(entity):
+                event.listen(getattr(model, attr), 'set', KpiService._noop_set, active_history=True)
+        
+        event.listen(db.session, 'after_flush', KpiService._after_flush)
+    
+    @staticmethod
+    def _noop_set(target, value, oldvalue, initiator):
+        return value
+    
+    @staticmethod
+    def _entity_for(obj) -> str:
+        """Get the counter entity name for a tracked instance."""
+        for entity, model in KpiService.ENTITY_MODELS.items():
+            if isinstance(obj, model):
+                return entity
+        return None
+    
+    @staticmethod
+    def _keys(entity: str, values: dict) -> list:
+        """Build the (entity, dimension, key) triples for a row snapshot."""
+        keys = [(entity, 'total', KpiCounter.TOTAL_KEY)]
+        if values.get('created_at'):
+            keys.append((entity, 'day', KpiCounter.format_key(values['created_at'])))
+        for dimension, attr in KpiCounter.DIMENSIONS[entity].items():
+            if isinstance(attr, tuple):
+                key = KpiCounter.composite_key(*[values.get(name) for name in attr])
+            else:
+                key = KpiCounter.format_key(values.get(attr))
+            keys.append((entity, dimension, key))
+        return keys
+    
+    @staticmethod
+    def _old_values(obj, entity: str) -> dict:
+        """Get the pre-flush values of a persistent instance."""
+        state = inspect(obj)
+        values = {}
+        for attr in ['created_at'] + KpiCounter.dimension_attrs(entity):
+            history = state.attrs[attr].history
+            if history.deleted:
+                values[attr] = history.deleted[0]
+            elif history.unchanged:
+                values[attr] = history.unchanged[0]
+            else:
+                values[attr] = None
+        return values
+    
+    @staticmethod
+    def _new_values(obj, entity: str) -> dict:
+        """Get the current values of an instance."""
+        return {
+            attr: getattr(obj, attr)
+            for attr in ['created_at'] + KpiCounter.dimension_attrs(entity)
+        }
+    
+    @staticmethod
+    def _after_flush(session, flush_context) -> None:
+        """Translate flushed inserts, updates and deletes into counter deltas."""
+        deltas = Counter()
+        
+        for obj in session.new:
+            entity = KpiService._entity_for(obj)
+            if entity:
+                deltas.update(KpiService._keys(entity, KpiService._new_values(obj, entity)))
+        
+        for obj in session.deleted:
+            entity = KpiService._entity_for(obj)
+            if entity:
+                deltas.subtract(KpiService._keys(entity, KpiService._old_values(obj, entity)))
+        
+        for obj in session.dirty:
+            entity = KpiService._entity_for(obj)
+            if not entity or not session.is_modified(obj, include_collections=False):
+                continue
+            deltas.subtract(KpiService._keys(entity, KpiService._old_values(obj, entity)))
+            deltas.update(KpiService._keys(entity, KpiService._new_values(obj, entity)))
+        
+        KpiService.apply_deltas(deltas, session)
+    
+    @staticmethod
+    def record_changes(entity: str, changes: list) -> None:
+        """Apply counter deltas for rows changed by set-based statements.
+        
+        Bulk UPDATEs bypass the flush listener, so callers pass
+        (old_values, new_values) attribute dicts for each changed row.
+        Both dicts must carry the same attributes.
+        """
+        deltas = Counter()
+        for old_values, new_values in changes:
+            deltas.subtract(KpiService._keys(entity, old_values))
+            deltas.update(KpiService._keys(entity, new_values))
+        KpiService.apply_deltas(deltas)
+    
+    @staticmethod
+    def record_inserts(entity: str, rows: list) -> None:
+        """Apply counter increments for rows added by bulk INSERTs."""
+        deltas = Counter()
+        for values in rows:
+            deltas.update(KpiService._keys(entity, values))
+        KpiService.apply_deltas(deltas)
+    
+    @staticmethod
+    def apply_deltas(deltas: dict, session=None) -> None:
+        """Apply counter deltas in the current transaction.
+        
+        Each delta is an atomic upsert, so concurrent writers never lose increments.
+        """
+        session = session or db.session
+        rows = [
+            {'entity': entity, 'dimension': dimension, 'key': key, 'value': delta}
+            for (entity, dimension, key), delta in deltas.items()
+            if delta
+        ]
+        if not rows:
+            return
+        
+        stmt = insert(KpiCounter.__table__).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            constraint='uq_kpi_counters_entity_dimension_key',
+            set_={
+                'value': KpiCounter.__table__.c.value + stmt.excluded.value,
+                'updated_at': func.timezone('UTC', func.now())
+            }
+        )
+        session.execute(stmt)
+    
+    @staticmethod
+    def _actual_counts(entity: str) -> dict:
+        """Recount every dimension of an entity with grouped queries."""
+        model = KpiService.ENTITY_MODELS[entity]
+        counts = {(entity, 'total', KpiCounter.TOTAL_KEY): model.query.count()}
+        
+        day = func.date(model.created_at)
+        for row in db.session.query(day, func.count(model.id)).group_by(day).all():
+            counts[(entity, 'day', KpiCounter.format_key(row[0]))] = row[1]
+        
+        for dimension, attr in KpiCounter.DIMENSIONS[entity].items():
+            columns = [getattr(model, name) for name in (attr if isinstance(attr, tuple) else (attr,))]
+            for row in db.session.query(*columns, func.count(model.id)).group_by(*columns).all():
+                counts[(entity, dimension, KpiCounter.composite_key(*row[:-1]))] = row[-1]
+        
+        return counts
+    
+    @staticmethod
+    def reconcile() -> int:
+        """Recompute all counters from source tables and repair drift.
+        
+        Returns the number of counters that were corrected.
+        """
+        repaired = 0
+        
+        for entity in KpiService.ENTITY_MODELS:
+            # Lock first so writers in flight finish before the recount reads
+            stored = {
+                (c.entity, c.dimension, c.key): c
+                for c in KpiCounter.query.filter_by(entity=entity).with_for_update().all()
+            }
+            actual = KpiService._actual_counts(entity)
+            
+            for key, value in actual.items():
+                counter = stored.pop(key, None)
+                if counter is None:
+                    entity_name, dimension, counter_key = key
+                    db.session.add(KpiCounter(
+                        entity=entity_name,
+                        dimension=dimension,
+                        key=counter_key,
+                        value=value
+                    ))
+                    repaired += 1
+                elif counter.value != value:
+                    counter.value = value
+                    repaired += 1
+            
+            # Counters whose dimension value no longer exists in the table
+            for counter in stored.values():
+                if counter.value != 0:
+                    counter.value = 0
+                    repaired += 1
+        
+        db.session.commit()
+        return repaired
@@ -1,42 +1,29 @@
 """Lead service."""
-from datetime import datetime
-from sqlalchemy import or_, and_, desc
-from models import Lead, Application, Activity, Task, Stage, Source
+import re
+from datetime import datetime, timedelta
+from sqlalchemy import or_, and_, desc, func, literal_column, update
+from sqlalchemy.dialects.postgresql import insert
+from models import Lead, Application, Activity, Task, Stage, Source, KpiCounter, StageTransition
 from extensions import db
+from services.count_service import CountService
+from services.duplicate_service import DuplicateService
+from services.event_service import EventService
 
 
 class LeadService:
     """Service for lead operations."""
     
+    FILTER_KEYS = ['search', 'stage_id', 'source_id', 'assigned_to', 'status']
+    
     @staticmethod
-    def get_leads(filters: dict = None, page: int = 1, per_page: int = 20) -> dict:
+    def get_leads(filters: dict = None, page: int = 1, per_page: int = 20, exact_count: bool = False) -> dict:
         """Get leads with pagination and filters."""
         filters = filters or {}
-        query = Lead.query
-        
-        # Apply filters
-        if filters.get('search'):
-            search = f"%{filters['search']}%"
-            query = query.filter(
-                or_(
-                    Lead.first_name.ilike(search),
-                    Lead.last_name.ilike(search),
-                    Lead.email.ilike(search),
-                    Lead.phone.ilike(search)
-                )
-            )
-        
-        if filters.get('stage_id'):
-            query = query.filter_by(stage_id=filters['stage_id'])
-        
-        if filters.get('source_id'):
-            query = query.filter_by(source_id=filters['source_id'])
+        query = LeadService._apply_filters(Lead.query, filters)
         
-        if filters.get('assigned_to'):
-            query = query.filter_by(assigned_to=filters['assigned_to'])
-        
-        if filters.get('status'):
-            query = query.filter_by(status=filters['status'])
+        # Merged duplicates are only listed when asked for
+        if filters.get('status') != 'merged':
+            query = query.filter(Lead.status != 'merged')
         
         # Role-based filtering
         if filters.get('user_role') == 'Executive':
@@ -55,20 +42,45 @@ class LeadService:
                 )
             )
         
-        # Order by created_at desc
-        query = query.order_by(desc(Lead.created_at))
+        # Order by score (highest priority first) or created_at desc
+        if filters.get('sort') == 'score':
+            query = query.order_by(desc(Lead.score), desc(Lead.id))
+        else:
+            query = query.order_by(desc(Lead.created_at))
         
         # Pagination
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+        result = CountService.paginate(query, page, per_page, exact_count)
+        result['items'] = [lead.to_dict(mask_sensitive=filters.get('mask_sensitive', False))
+                           for lead in result['items']]
+        return result
+    
+    @staticmethod
+    def _apply_filters(query, filters: dict):
+        """Apply lead list filters to a query."""
+        if filters.get('search'):
+            search = f"%{filters['search']}%"
+            query = query.filter(
+                or_(
+                    Lead.first_name.ilike(search),
+                    Lead.last_name.ilike(search),
+                    Lead.email.ilike(search),
+                    Lead.phone.ilike(search)
+                )
+            )
         
-        return {
-            'items': [lead.to_dict(mask_sensitive=filters.get('mask_sensitive', False)) 
-                      for lead in pagination.items],
-            'total': pagination.total,
-            'pages': pagination.pages,
-            'current_page': page,
-            'per_page': per_page
-        }
+        if filters.get('stage_id'):
+            query = query.filter(Lead.stage_id == filters['stage_id'])
+        
+        if filters.get('source_id'):
+            query = query.filter(Lead.source_id == filters['source_id'])
+        
+        if filters.get('assigned_to'):
+            query = query.filter(Lead.assigned_to == filters['assigned_to'])
+        
+        if filters.get('status'):
+            query = query.filter(Lead.status == filters['status'])
+        
+        return query
     
     @staticmethod
     def get_lead(lead_id: int, mask_sensitive: bool = False) -> Lead:
@@ -78,60 +90,237 @@ class LeadService:
             raise ValueError("Lead not found")
         return lead
     
+    @staticmethod
+    def upsert_statement(rows: list):
+        """Build an INSERT ... ON CONFLICT on the email key that turns known leads into re-inquiries.
+        
+        Returns id, email_key, re_inquiry_count and whether each row was newly inserted.
+        """
+        table = Lead.__table__
+        stmt = insert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.email_key],
+            set_={
+                're_inquiry_count': func.coalesce(table.c.re_inquiry_count, 0) + 1,
+                'first_name': stmt.excluded.first_name,
+                'last_name': stmt.excluded.last_name,
+                'phone': func.coalesce(stmt.excluded.phone, table.c.phone),
+                'phone_key': func.coalesce(stmt.excluded.phone_key, table.c.phone_key),
+                'name_key': stmt.excluded.name_key,
+                'updated_at': stmt.excluded.updated_at
+            }
+        )
+        return stmt.returning(
+            table.c.id,
+            table.c.email_key,
+            table.c.re_inquiry_count,
+            literal_column('(xmax = 0)').label('inserted')
+        )
+    
+    @staticmethod
+    def surviving_ids(lead_ids: list) -> dict:
+        """Map lead IDs to the lead that survives them: itself, or the lead it was merged into.
+        
+        Follows chains of merges, one query per level.
+        """
+        merged_into = {}
+        checked = set()
+        pending = set(lead_ids)
+        while pending:
+            checked |= pending
+            found = dict(
+                db.session.query(Lead.id, Lead.merged_into_id).filter(
+                    Lead.id.in_(pending),
+                    Lead.merged_into_id.isnot(None)
+                ).all()
+            )
+            merged_into.update(found)
+            pending = set(found.values()) - checked
+        
+        resolved = {}
+        for lead_id in lead_ids:
+            survivor, hops = lead_id, 0
+            while survivor in merged_into and hops < len(merged_into):
+                survivor, hops = merged_into[survivor], hops + 1
+            resolved[lead_id] = survivor
+        return resolved
+    
     @staticmethod
     def create_lead(data: dict, user_id: int = None) -> Lead:
-        """Create a new lead."""
-        # Check for existing lead with same email
-        existing = Lead.get_by_email(data['email'])
-        if existing:
-            # Increment re-inquiry count
-            existing.increment_reinquiry()
-            # Update existing lead
-            existing.first_name = data.get('first_name', existing.first_name)
-            existing.last_name = data.get('last_name', existing.last_name)
-            existing.phone = data.get('phone', existing.phone)
-            existing.source_id = data.get('source_id', existing.source_id)
-            existing.updated_at = datetime.utcnow()
+        """Create a new lead, or record a re-inquiry on the lead with the same email.
+        
+        Dedupe is a single atomic upsert on the normalized email key, so
+        concurrent submissions of one address cannot create two leads.
+        """
+        from services.kpi_service import KpiService
+        
+        # Get default stage (Inquiry)
+        default_stage = Stage.query.filter_by(name='Inquiry', type='lead').first()
+        
+        now = datetime.utcnow()
+        row = {
+            'first_name': data['first_name'],
+            'last_name': data['last_name'],
+            'email': data['email'],
+            'phone': data.get('phone'),
+            'source_id': data.get('source_id'),
+            'stage_id': data.get('stage_id', default_stage.id if default_stage else None),
+            'assigned_to': data.get('assigned_to'),
+            'status': 'active',
+            're_inquiry_count': 0,
+            'last_activity_at': now,
+            'created_at': now,
+            'updated_at': now,
+            **Lead.dedupe_keys(data['first_name'], data['last_name'], data['email'], data.get('phone'))
+        }
+        result = db.session.execute(LeadService.upsert_statement([row])).one()
+        
+        if result.inserted:
+            KpiService.record_inserts('lead', [row])
+            EventService.queue_events('lead', 'created', [
+                {'id': result.id, 'owners': [row['assigned_to']] if row['assigned_to'] else []}
+            ])
             db.session.commit()
+            lead = Lead.query.populate_existing().get(result.id)
+            
+            DuplicateService.detect_for_leads([lead.id])
             
             # Log activity
             Activity.log(
-                lead_id=existing.id,
-                activity_type='system',
-                description=f"Re-inquiry received (count: {existing.re_inquiry_count})",
+                lead_id=lead.id,
+                activity_type='lead_created',
+                description=f"New lead created: {lead.get_full_name()}",
                 user_id=user_id
             )
-            
-            return existing
-        
-        # Get default stage (Inquiry)
-        default_stage = Stage.query.filter_by(name='Inquiry', type='lead').first()
-        
-        lead = Lead(
-            first_name=data['first_name'],
-            last_name=data['last_name'],
-            email=data['email'],
-            phone=data.get('phone'),
-            source_id=data.get('source_id'),
-            stage_id=data.get('stage_id', default_stage.id if default_stage else None),
-            assigned_to=data.get('assigned_to'),
-            status='active',
-            re_inquiry_count=0
-        )
-        
-        db.session.add(lead)
+            return lead
+        
+        # Re-inquiry: the source moves through the ORM so its counters follow
+        lead = Lead.query.populate_existing().get(result.id)
+        survivor_id = LeadService.surviving_ids([lead.id])[lead.id]
+        if survivor_id != lead.id:
+            # The address belongs to a merged duplicate; credit the surviving lead
+            lead = Lead.query.get(survivor_id)
+            lead.re_inquiry_count = (lead.re_inquiry_count or 0) + 1
+            lead.updated_at = now
+        if data.get('source_id') is not None:
+            lead.source_id = data['source_id']
         db.session.commit()
         
         # Log activity
         Activity.log(
             lead_id=lead.id,
-            activity_type='lead_created',
-            description=f"New lead created: {lead.get_full_name()}",
+            activity_type='system',
+            description=f"Re-inquiry received (count: {lead.re_inquiry_count})",
             user_id=user_id
         )
         
         return lead
     
+    @staticmethod
+    def backfill_dedupe_keys() -> dict:
+        """Populate email and duplicate-blocking keys on leads that predate them.
+        
+        The oldest lead of each normalized address gets the email key; later
+        duplicates are left without one and reported for merging.
+        """
+        claimed = set(
+            key for (key,) in db.session.query(Lead.email_key).filter(Lead.email_key.isnot(None))
+        )
+        pending = db.session.query(
+            Lead.id, Lead.first_name, Lead.last_name, Lead.email, Lead.phone, Lead.email_key
+        ).filter(
+            or_(Lead.email_key.is_(None), Lead.email_local_key.is_(None))
+        ).order_by(Lead.created_at, Lead.id).all()
+        
+        updates = []
+        duplicates = []
+        for row in pending:
+            keys = Lead.dedupe_keys(row.first_name, row.last_name, row.email, row.phone)
+            if row.email_key:
+                keys['email_key'] = row.email_key
+            elif keys['email_key'] in claimed:
+                duplicates.append(row.id)
+                keys['email_key'] = None
+            else:
+                claimed.add(keys['email_key'])
+            updates.append({'id': row.id, **keys})
+        
+        if updates:
+            db.session.execute(update(Lead), updates)
+        db.session.commit()
+        
+        return {'updated': len(updates), 'duplicates': duplicates}
+    
+    # Description written by change_stage / update_lead before metadata carried stage IDs
+    STAGE_CHANGE_PATTERN = re.compile(r"Stage changed from '(.*)' to '(.*)'")
+    
+    @staticmethod
+    def backfill_stage_transitions(batch_size: int = 5000) -> int:
+        """Create stage transitions from historical stage_change activities.
+        
+        Activities are read in ID order, batch_size at a time, and each batch
+        is committed on its own. Only activities older than the first live
+        transition are used, and rows are keyed by activity so the backfill
+        can be re-run or resumed.
+        """
+        cutoff = db.session.query(func.min(StageTransition.changed_at)).filter(
+            StageTransition.activity_id.is_(None)
+        ).scalar()
+        
+        # Older activities only name the stages; lead stages win over application stages
+        stages = Stage.query.order_by(Stage.type.desc(), Stage.order).all()
+        known = {stage.id for stage in stages}
+        stage_ids = {}
+        for stage in stages:
+            stage_ids.setdefault(stage.name, stage.id)
+        
+        created = 0
+        last_id = 0
+        while True:
+            query = db.session.query(
+                Activity.id, Activity.lead_id, Activity.user_id, Activity.description,
+                Activity.metadata_json, Activity.created_at
+            ).filter(Activity.type == 'stage_change', Activity.id > last_id)
+            if cutoff:
+                query = query.filter(Activity.created_at < cutoff)
+            rows = query.order_by(Activity.id).limit(batch_size).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            
+            values = []
+            for row in rows:
+                metadata = row.metadata_json or {}
+                from_stage_id = metadata.get('old_stage_id')
+                to_stage_id = metadata.get('new_stage_id')
+                if to_stage_id is None:
+                    match = LeadService.STAGE_CHANGE_PATTERN.match(row.description or '')
+                    if match:
+                        from_stage_id = stage_ids.get(match.group(1))
+                        to_stage_id = stage_ids.get(match.group(2))
+                # Stages deleted since are dropped rather than violating the foreign keys
+                if from_stage_id not in known:
+                    from_stage_id = None
+                if to_stage_id not in known or to_stage_id == from_stage_id:
+                    continue
+                values.append({
+                    'lead_id': row.lead_id,
+                    'from_stage_id': from_stage_id,
+                    'to_stage_id': to_stage_id,
+                    'changed_by': row.user_id,
+                    'activity_id': row.id,
+                    'changed_at': row.created_at
+                })
+            
+            if values:
+                created += db.session.execute(
+                    insert(StageTransition).values(values)
+                    .on_conflict_do_nothing(index_elements=['activity_id'])
+                ).rowcount
+            db.session.commit()
+        
+        return created
+    
     @staticmethod
     def update_lead(lead_id: int, data: dict, user_id: int = None) -> Lead:
         """Update lead."""
@@ -150,8 +339,9 @@ class LeadService:
             lead.phone = data['phone']
         if 'source_id' in data:
             lead.source_id = data['source_id']
-        if 'stage_id' in data:
+        if 'stage_id' in data and data['stage_id'] != old_stage_id:
             lead.stage_id = data['stage_id']
+            StageTransition.record(lead.id, old_stage_id, data['stage_id'], user_id)
         if 'assigned_to' in data:
             lead.assigned_to = data['assigned_to']
         if 'status' in data:
@@ -204,7 +394,9 @@ class LeadService:
             raise ValueError("Stage not found")
         
         old_stage_id = lead.stage_id
-        lead.stage_id = stage_id
+        if stage_id != old_stage_id:
+            lead.stage_id = stage_id
+            StageTransition.record(lead.id, old_stage_id, stage_id, user_id)
         lead.updated_at = datetime.utcnow()
         db.session.commit()
         
@@ -259,13 +451,17 @@ class LeadService:
     @staticmethod
     def get_kpis() -> dict:
         """Get lead KPIs."""
-        total_leads = Lead.query.count()
-        active_leads = Lead.query.filter_by(status='active').count()
-        converted_leads = Lead.query.filter_by(status='converted').count()
-        new_this_month = Lead.query.filter(
-            db.extract('month', Lead.created_at) == datetime.utcnow().month,
-            db.extract('year', Lead.created_at) == datetime.utcnow().year
-        ).count()
+        by_status = KpiCounter.get_dimension('lead', 'status')
+        total_leads = KpiCounter.get_value('lead')
+        active_leads = by_status.get('active', 0)
+        converted_leads = by_status.get('converted', 0)
+        
+        # Sum the day buckets of the current month
+        month_start = datetime.utcnow().date().replace(day=1)
+        next_month = (month_start + timedelta(days=32)).replace(day=1)
+        new_this_month = KpiCounter.get_range_sum(
+            'lead', 'day', month_start.isoformat(), next_month.isoformat()
+        )
         
         return {
             'total_leads': total_leads,
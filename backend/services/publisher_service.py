@@ -0,0 +1,293 @@
+"""Publisher service."""
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import event, inspect, func, case
+from models import Publisher, Lead, Stage, Source, Activity
+from extensions import db
+
+
+class PublisherService:
+    """Service for publisher authentication and lead ingestion."""
+    
+    # api_key -> (expires_at, publisher snapshot or None)
+    _key_cache = {}
+    _key_cache_lock = threading.Lock()
+    KEY_CACHE_MAX_ENTRIES = 10000
+    
+    # Publisher attributes held in a cached snapshot or deciding whether a key resolves
+    CACHED_ATTRS = ['api_key', 'is_active', 'name', 'priority', 'lead_limit']
+    INVALIDATE_KEY = 'publisher_keys_to_invalidate'
+    
+    # Optional and required string fields of a submitted lead, checked against their column length
+    TEXT_FIELDS = ['first_name', 'last_name', 'email', 'phone']
+    
+    @staticmethod
+    def register_listeners() -> None:
+        """Drop cached API keys of publishers changed or deleted by a committed transaction.
+        
+        Only this process's cache is cleared; other workers pick up the
+        change within PUBLISHER_KEY_CACHE_TTL.
+        """
+        if event.contains(db.session, 'after_commit', PublisherService._after_commit):
+            return
+        event.listen(db.session, 'after_flush', PublisherService._after_flush)
+        event.listen(db.session, 'after_commit', PublisherService._after_commit)
+        event.listen(db.session, 'after_rollback', PublisherService._after_rollback)
+    
+    @staticmethod
+    def _after_flush(session, flush_context) -> None:
+        """Collect the old and new API keys of changed publishers."""
+        keys = set()
+        for obj in session.dirty | session.deleted:
+            if not isinstance(obj, Publisher):
+                continue
+            state = inspect(obj)
+            if obj in session.deleted or any(
+                state.attrs[attr].history.has_changes() for attr in PublisherService.CACHED_ATTRS
+            ):
+                history = state.attrs.api_key.history
+                keys.update(key for key in (*history.deleted, *history.unchanged, *history.added) if key)
+        if keys:
+            session.info.setdefault(PublisherService.INVALIDATE_KEY, set()).update(keys)
+    
+    @staticmethod
+    def _after_commit(session) -> None:
+        for api_key in session.info.pop(PublisherService.INVALIDATE_KEY, ()):
+            PublisherService.invalidate_api_key(api_key)
+    
+    @staticmethod
+    def _after_rollback(session) -> None:
+        session.info.pop(PublisherService.INVALIDATE_KEY, None)
+    
+    @staticmethod
+    def get_publisher_for_key(api_key: str) -> dict:
+        """Resolve an API key to a publisher snapshot, cached per process.
+        
+        Unknown keys are cached too so invalid traffic does not reach the database.
+        """
+        now = time.monotonic()
+        with PublisherService._key_cache_lock:
+            entry = PublisherService._key_cache.get(api_key)
+        if entry and entry[0] > now:
+            return entry[1]
+        
+        publisher = Publisher.get_by_api_key(api_key)
+        snapshot = {
+            'id': publisher.id,
+            'name': publisher.name,
+            'priority': publisher.priority,
+            'lead_limit': publisher.lead_limit
+        } if publisher else None
+        
+        ttl = current_app.config['PUBLISHER_KEY_CACHE_TTL']
+        with PublisherService._key_cache_lock:
+            if len(PublisherService._key_cache) >= PublisherService.KEY_CACHE_MAX_ENTRIES:
+                PublisherService._key_cache.clear()
+            PublisherService._key_cache[api_key] = (now + ttl, snapshot)
+        return snapshot
+    
+    @staticmethod
+    def invalidate_api_key(api_key: str = None) -> None:
+        """Drop one cached API key, or the whole cache."""
+        with PublisherService._key_cache_lock:
+            if api_key is None:
+                PublisherService._key_cache.clear()
+            else:
+                PublisherService._key_cache.pop(api_key, None)
+    
+    @staticmethod
+    def _validate(items: list) -> tuple:
+        """Split submitted leads into valid rows (first per email key) and rejections."""
+        valid = {}
+        rejected = []
+        duplicates_in_batch = []
+        
+        # Submitted source IDs are checked with one query per batch
+        source_ids = {
+            item['source_id'] for item in items
+            if isinstance(item, dict) and isinstance(item.get('source_id'), int) and not isinstance(item['source_id'], bool)
+        }
+        known_sources = {
+            source_id for (source_id,) in db.session.query(Source.id).filter(Source.id.in_(source_ids))
+        } if source_ids else set()
+        
+        def error(item) -> str:
+            if not isinstance(item, dict):
+                return 'Lead must be an object'
+            missing = [f for f in ('first_name', 'last_name', 'email') if not item.get(f)]
+            if missing:
+                return f"{', '.join(missing)} is required"
+            text_fields = [f for f in PublisherService.TEXT_FIELDS if item.get(f) is not None]
+            not_strings = [f for f in text_fields if not isinstance(item[f], str)]
+            if not_strings:
+                return f"{', '.join(not_strings)} must be a string"
+            too_long = [
+                f for f in text_fields
+                if len(item[f]) > Lead.__table__.c[f].type.length
+            ]
+            if too_long:
+                return '; '.join(
+                    f"{f} must be at most {Lead.__table__.c[f].type.length} characters" for f in too_long
+                )
+            source_id = item.get('source_id')
+            if source_id is not None and (isinstance(source_id, bool) or source_id not in known_sources):
+                return 'source_id does not match a source'
+            return None
+        
+        for index, item in enumerate(items):
+            message = error(item)
+            if message:
+                rejected.append({'index': index, 'error': message})
+                continue
+            
+            email_key = Lead.email_key_for(str(item['email']))
+            if email_key in valid:
+                duplicates_in_batch.append(index)
+                continue
+            valid[email_key] = (index, item)
+        
+        return valid, rejected, duplicates_in_batch
+    
+    @staticmethod
+    def _credit_reinquiries(counts: Counter) -> None:
+        """Add re-inquiries to leads with one UPDATE; `counts` maps lead ID to re-inquiries."""
+        if not counts:
+            return
+        table = Lead.__table__
+        db.session.execute(
+            table.update()
+            .where(table.c.id.in_(list(counts)))
+            .values(re_inquiry_count=func.coalesce(table.c.re_inquiry_count, 0) + case(dict(counts), value=table.c.id),
+                    updated_at=datetime.utcnow())
+        )
+    
+    @staticmethod
+    def _log_reinquiries(publisher: dict, lead_ids: list) -> None:
+        """Record one re-inquiry activity per submission and an update event per lead."""
+        from services.event_service import EventService
+        
+        Activity.log_many([
+            {
+                'lead_id': lead_id,
+                'type': 'system',
+                'description': f"Re-inquiry received from publisher {publisher['name']}",
+                'metadata': {'publisher_id': publisher['id']}
+            }
+            for lead_id in lead_ids
+        ])
+        EventService.queue_events('lead', 'updated', [{'id': lead_id} for lead_id in sorted(set(lead_ids))])
+    
+    @staticmethod
+    def ingest_leads(publisher: dict, items: list) -> dict:
+        """Ingest a batch of publisher leads.
+        
+        New leads are inserted with one multi-row upsert on the normalized
+        email key, known emails are recorded as re-inquiries with one UPDATE,
+        and only new leads consume quota. Everything commits in a single
+        transaction.
+        """
+        from services.kpi_service import KpiService
+        from services.automation_service import AutomationService
+        from services.quota_service import QuotaService
+        from services.lead_service import LeadService
+        from services.duplicate_service import DuplicateService
+        from services.event_service import EventService
+        
+        max_batch = current_app.config['PUBLISHER_MAX_BATCH']
+        if len(items) > max_batch:
+            raise ValueError(f"Batches are limited to {max_batch} leads")
+        
+        valid, rejected, duplicates_in_batch = PublisherService._validate(items)
+        
+        # Known emails become re-inquiries on the existing lead, or on the lead it was merged into
+        existing = dict(
+            db.session.query(Lead.email_key, Lead.id).filter(Lead.email_key.in_(list(valid))).all()
+        ) if valid else {}
+        survivors = LeadService.surviving_ids(list(existing.values()))
+        reinquiries = [
+            {'index': valid[email_key][0], 'lead_id': survivors[lead_id]}
+            for email_key, lead_id in existing.items()
+        ]
+        if reinquiries:
+            PublisherService._credit_reinquiries(Counter(r['lead_id'] for r in reinquiries))
+            PublisherService._log_reinquiries(publisher, [r['lead_id'] for r in reinquiries])
+        
+        new_leads = [(index, email_key, item) for email_key, (index, item) in valid.items() if email_key not in existing]
+        granted = QuotaService.consume_monthly(publisher['id'], len(new_leads))
+        accepted, over_quota = new_leads[:granted], new_leads[granted:]
+        
+        lead_ids = []
+        raced = []
+        if accepted:
+            now = datetime.utcnow()
+            default_stage = Stage.query.filter_by(name='Inquiry', type='lead').first()
+            default_source = Source.query.filter_by(category='Publisher', is_active=True).first()
+            
+            rows = [
+                {
+                    'first_name': item['first_name'],
+                    'last_name': item['last_name'],
+                    'email': str(item['email']).strip(),
+                    'phone': item.get('phone'),
+                    'source_id': item.get('source_id') or (default_source.id if default_source else None),
+                    'stage_id': default_stage.id if default_stage else None,
+                    'assigned_to': None,
+                    'publisher_id': publisher['id'],
+                    'status': 'active',
+                    're_inquiry_count': 0,
+                    'last_activity_at': now,
+                    'created_at': now,
+                    'updated_at': now,
+                    **Lead.dedupe_keys(item['first_name'], item['last_name'], str(item['email']), item.get('phone'))
+                }
+                for _, _, item in accepted
+            ]
+            # A concurrent submission may have created the same email since
+            # the lookup above; the upsert turns those rows into re-inquiries.
+            results = {r.email_key: r for r in db.session.execute(LeadService.upsert_statement(rows))}
+            raced = [results[row['email_key']].id for row in rows if not results[row['email_key']].inserted]
+            rows = [row for row in rows if results[row['email_key']].inserted]
+            lead_ids = [results[row['email_key']].id for row in rows]
+            if raced:
+                # Re-inquiries do not consume quota
+                QuotaService.refund_monthly(publisher['id'], len(raced))
+                # The upsert counted the re-inquiry on the row it hit; credit survivors of merged ones too
+                survivors = LeadService.surviving_ids(raced)
+                PublisherService._credit_reinquiries(Counter(
+                    survivor for lead_id, survivor in survivors.items() if survivor != lead_id
+                ))
+                raced = [survivors[lead_id] for lead_id in raced]
+                PublisherService._log_reinquiries(publisher, raced)
+            
+            KpiService.record_inserts('lead', rows)
+            EventService.queue_events('lead', 'created', [{'id': lead_id, 'owners': []} for lead_id in lead_ids])
+            Activity.log_many([
+                {
+                    'lead_id': lead_id,
+                    'type': 'lead_created',
+                    'description': f"New lead created: {row['first_name']} {row['last_name']}".strip(),
+                    'metadata': {'publisher_id': publisher['id']}
+                }
+                for lead_id, row in zip(lead_ids, rows)
+            ])
+        
+        db.session.commit()
+        
+        if lead_ids:
+            DuplicateService.detect_for_leads(lead_ids)
+            AutomationService.trigger_workflow_batch(
+                'lead_created',
+                [{'lead_id': lead_id, 'user_id': None} for lead_id in lead_ids]
+            )
+        
+        return {
+            'accepted': len(lead_ids),
+            'lead_ids': lead_ids,
+            're_inquiries': len(reinquiries) + len(raced),
+            'duplicates_in_batch': duplicates_in_batch,
+            'over_quota': [index for index, _, _ in over_quota],
+            'rejected': rejected
+        }
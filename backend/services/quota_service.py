@@ -0,0 +1,195 @@
+"""Publisher quota and rate-limit service."""
+import math
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import func, text
+from models import Publisher
+from extensions import db
+
+
+class QuotaExceededError(Exception):
+    """Raised when a publisher request is over a rate limit, quota or load budget."""
+    
+    def __init__(self, message: str, retry_after: int = None, status_code: int = 429):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.status_code = status_code
+
+
+class InMemoryRateLimitStore:
+    """Process-local sliding window counters.
+    
+    Stand-in for a shared store: limits apply per worker process.
+    """
+    
+    def __init__(self):
+        self._windows = {}
+        self._lock = threading.Lock()
+    
+    def hit(self, key: str, limit: int, window: int, cost: int = 1) -> tuple:
+        """Record a hit; return (allowed, retry_after_seconds)."""
+        now = time.time()
+        current = int(now // window)
+        elapsed = (now % window) / window
+        
+        with self._lock:
+            counts = self._windows.setdefault(key, {})
+            for stale in [w for w in counts if w < current - 1]:
+                del counts[stale]
+            
+            weighted = counts.get(current - 1, 0) * (1 - elapsed) + counts.get(current, 0)
+            if weighted + cost > limit:
+                return False, math.ceil(window * (1 - elapsed))
+            
+            counts[current] = counts.get(current, 0) + cost
+            return True, 0
+
+
+class RedisRateLimitStore:
+    """Sliding window counters shared by every worker through Redis."""
+    
+    def __init__(self, url: str):
+        import redis
+        self._client = redis.Redis.from_url(url)
+    
+    def hit(self, key: str, limit: int, window: int, cost: int = 1) -> tuple:
+        """Record a hit; return (allowed, retry_after_seconds)."""
+        now = time.time()
+        current = int(now // window)
+        elapsed = (now % window) / window
+        current_key = f'ratelimit:{key}:{current}'
+        previous_key = f'ratelimit:{key}:{current - 1}'
+        
+        # Increment first so concurrent callers can never both squeeze in
+        pipe = self._client.pipeline()
+        pipe.incrby(current_key, cost)
+        pipe.expire(current_key, window * 2)
+        pipe.get(previous_key)
+        count, _, previous = pipe.execute()
+        
+        weighted = int(previous or 0) * (1 - elapsed) + count
+        if weighted > limit:
+            self._client.decrby(current_key, cost)
+            return False, math.ceil(window * (1 - elapsed))
+        return True, 0
+
+
+class QuotaService:
+    """Service enforcing publisher rate limits, monthly quotas and load admission."""
+    
+    _store = None
+    _store_lock = threading.Lock()
+    
+    _in_flight = 0
+    _in_flight_lock = threading.Lock()
+    
+    # Fraction of ingestion capacity in use before low-priority publishers are shed
+    SHED_START = 0.5
+    
+    @staticmethod
+    def get_store():
+        """Get the rate-limit store, shared through Redis when configured."""
+        if QuotaService._store is None:
+            with QuotaService._store_lock:
+                if QuotaService._store is None:
+                    url = current_app.config.get('RATE_LIMIT_STORAGE_URL')
+                    QuotaService._store = RedisRateLimitStore(url) if url else InMemoryRateLimitStore()
+        return QuotaService._store
+    
+    @staticmethod
+    def check_rate(publisher: dict) -> None:
+        """Apply the per-publisher sliding window request limit."""
+        limit = current_app.config['PUBLISHER_RATE_LIMIT']
+        window = current_app.config['PUBLISHER_RATE_WINDOW']
+        
+        allowed, retry_after = QuotaService.get_store().hit(f"publisher:{publisher['id']}", limit, window)
+        if not allowed:
+            raise QuotaExceededError(
+                f"Rate limit of {limit} requests per {window}s exceeded",
+                retry_after=retry_after
+            )
+    
+    @staticmethod
+    def min_priority(utilization: float) -> int:
+        """Get the lowest publisher priority admitted at a capacity utilization."""
+        if utilization < QuotaService.SHED_START:
+            return 1
+        shed = (utilization - QuotaService.SHED_START) / (1 - QuotaService.SHED_START)
+        return min(10, 1 + math.ceil(shed * 9))
+    
+    @staticmethod
+    @contextmanager
+    def admit(publisher: dict):
+        """Admit an ingestion request, shedding low-priority publishers under load."""
+        capacity = current_app.config['PUBLISHER_MAX_CONCURRENT_INGESTS']
+        priority = publisher.get('priority') or 1
+        
+        with QuotaService._in_flight_lock:
+            utilization = QuotaService._in_flight / capacity
+            if QuotaService._in_flight >= capacity or priority < QuotaService.min_priority(utilization):
+                raise QuotaExceededError("Server busy, retry later", retry_after=1, status_code=503)
+            QuotaService._in_flight += 1
+        
+        try:
+            yield
+        finally:
+            with QuotaService._in_flight_lock:
+                QuotaService._in_flight -= 1
+    
+    @staticmethod
+    def consume_monthly(publisher_id: int, requested: int) -> int:
+        """Atomically take up to `requested` tokens from the monthly quota bucket.
+        
+        The bucket is refilled for elapsed time and debited in one
+        UPDATE ... RETURNING. Returns the number of leads granted; runs in
+        the caller's transaction, so a rollback returns the tokens.
+        """
+        if requested <= 0:
+            return 0
+        
+        granted = db.session.execute(text("""
+            UPDATE publishers AS p
+            SET quota_tokens = b.tokens - b.granted,
+                quota_refilled_at = CAST(:now AS timestamp),
+                leads_submitted = COALESCE(p.leads_submitted, 0) + b.granted
+            FROM (
+                SELECT id, tokens, GREATEST(0, LEAST(:requested, FLOOR(tokens)))::int AS granted
+                FROM (
+                    SELECT id,
+                           LEAST(COALESCE(lead_limit, 0), COALESCE(quota_tokens, lead_limit, 0)
+                               + COALESCE(lead_limit, 0) * EXTRACT(EPOCH FROM (CAST(:now AS timestamp)
+                                   - COALESCE(quota_refilled_at, CAST(:now AS timestamp)))) / :period) AS tokens
+                    FROM publishers
+                    WHERE id = :publisher_id AND is_active
+                    FOR UPDATE
+                ) AS refilled
+            ) AS b
+            WHERE p.id = b.id
+            RETURNING b.granted
+        """), {
+            'now': datetime.utcnow(),
+            'requested': requested,
+            'period': Publisher.QUOTA_PERIOD_DAYS * 86400,
+            'publisher_id': publisher_id
+        }).scalar()
+        return granted or 0
+    
+    @staticmethod
+    def refund_monthly(publisher_id: int, count: int) -> None:
+        """Return tokens taken by `consume_monthly` for leads that were not created.
+        
+        Runs in the caller's transaction, after the consuming UPDATE.
+        """
+        if count <= 0:
+            return
+        db.session.execute(
+            db.update(Publisher)
+            .where(Publisher.id == publisher_id)
+            .values(
+                quota_tokens=func.least(func.coalesce(Publisher.lead_limit, 0), Publisher.quota_tokens + count),
+                leads_submitted=func.greatest(0, Publisher.leads_submitted - count)
+            )
+        )
@@ -0,0 +1,268 @@
+"""Background report job service."""
+import hashlib
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app
+from werkzeug.datastructures import MultiDict
+from sqlalchemy import func, or_, and_
+from sqlalchemy.dialects.postgresql import insert
+from models import ReportJob
+from extensions import db
+from database import RoutingSession, replica_guard
+from services.report_range import ReportRange
+from services.report_service import ReportService
+
+
+class ReportJobService:
+    """Service running heavy reports in the background and storing their results.
+    
+    Jobs run on a per-process pool of REPORT_JOB_WORKERS threads, under
+    a REPORT_JOB_TIMEOUT statement limit instead of the request one.
+    Identical specs (report plus resolved range) share one queued or
+    running job. Results are kept for REPORT_JOB_RESULT_TTL seconds.
+    
+    While a job runs, a heartbeat updates its heartbeat_at and progress
+    every REPORT_JOB_HEARTBEAT seconds. Progress during the report query
+    is the share of the time limit used so far, so it only reaches 90
+    when the job is about to time out.
+    """
+    
+    # Progress once claimed, and the ceiling while the report query runs
+    PROGRESS_CLAIMED = 10
+    PROGRESS_RUNNING_MAX = 90
+    
+    # Report name -> ReportService method, response key, range defaults and allowed roles
+    REPORTS = {
+        'conversion': {'method': 'get_conversion_funnel', 'key': 'funnel'},
+        'source-performance': {'method': 'get_source_performance', 'key': 'performance', 'default_days': 30},
+        'lead-trends': {'method': 'get_lead_trends', 'key': 'trends', 'default_days': 30},
+        'user-performance': {'method': 'get_user_performance', 'key': 'performance', 'default_days': 30,
+                             'roles': ['Admin', 'Team Lead', 'Digital Manager']},
+        'stage-distribution': {'method': 'get_stage_distribution', 'key': 'distribution'},
+        'application-status': {'method': 'get_application_status_breakdown', 'key': None},
+        'cohort-funnel': {'method': 'get_cohort_funnel', 'key': 'cohorts', 'default_days': 180,
+                          'default_bucket': 'month'},
+        'time-in-stage': {'method': 'get_time_in_stage', 'key': 'stages', 'default_days': 180}
+    }
+    
+    _executor = None
+    _executor_lock = threading.Lock()
+    
+    @staticmethod
+    def _get_executor(app) -> ThreadPoolExecutor:
+        with ReportJobService._executor_lock:
+            if ReportJobService._executor is None:
+                ReportJobService._executor = ThreadPoolExecutor(
+                    max_workers=app.config['REPORT_JOB_WORKERS'],
+                    thread_name_prefix='report-job'
+                )
+            return ReportJobService._executor
+    
+    @staticmethod
+    def can_run(report: str, role: str) -> bool:
+        """Check whether a role may run (and read jobs of) a report."""
+        roles = ReportJobService.REPORTS[report].get('roles')
+        return roles is None or role in roles
+    
+    @staticmethod
+    def submit(report: str, args: dict, user_id: int = None) -> tuple:
+        """Queue a report job, or join the identical one already in flight.
+        
+        `args` holds the report's range parameters (from, to, days, tz,
+        bucket). Returns (job, created).
+        """
+        definition = ReportJobService.REPORTS.get(report)
+        if not definition:
+            raise ValueError(f"Unknown report '{report}'")
+        
+        # Resolve relative ranges now, so the spec (and its hash) is absolute
+        period = ReportRange.from_args(
+            MultiDict(args), definition.get('default_days'), definition.get('default_bucket', 'day')
+        )
+        params = period.to_dict()
+        spec_hash = hashlib.sha256(
+            json.dumps({'report': report, 'params': params}, sort_keys=True).encode('utf-8')
+        ).hexdigest()
+        
+        job_id = db.session.execute(
+            insert(ReportJob).values(
+                id=str(uuid.uuid4()),
+                report=report,
+                params=params,
+                spec_hash=spec_hash,
+                status='queued',
+                progress=0,
+                requested_by=user_id,
+                created_at=datetime.utcnow()
+            ).on_conflict_do_nothing(
+                index_elements=['spec_hash'],
+                index_where=ReportJob.status.in_(ReportJob.ACTIVE_STATUSES)
+            ).returning(ReportJob.id)
+        ).scalar()
+        db.session.commit()
+        
+        if job_id is None:
+            job = ReportJob.query.filter(
+                ReportJob.spec_hash == spec_hash,
+                ReportJob.status.in_(ReportJob.ACTIVE_STATUSES)
+            ).first()
+            if job:
+                return job, False
+            # The in-flight job finished in between; queue a new one
+            return ReportJobService.submit(report, args, user_id)
+        
+        app = current_app._get_current_object()
+        ReportJobService._get_executor(app).submit(ReportJobService._run, app, job_id)
+        return ReportJob.query.get(job_id), True
+    
+    @staticmethod
+    def _finish(job_id: str, **values) -> bool:
+        """Record a running job's outcome; returns False if it is no longer running.
+        
+        A job failed by `clean_up` in the meantime keeps that outcome.
+        """
+        finished = db.session.query(ReportJob).filter(
+            ReportJob.id == job_id,
+            ReportJob.status == 'running'
+        ).update(values, synchronize_session=False)
+        db.session.commit()
+        return bool(finished)
+    
+    @staticmethod
+    def _heartbeat(app, job_id: str, started: float, stop: threading.Event) -> None:
+        """Update a running job's heartbeat and progress until `stop` is set.
+        
+        Runs on its own thread and connection, since the job's session is
+        busy with the report query (possibly on the replica).
+        """
+        config = app.config
+        span = ReportJobService.PROGRESS_RUNNING_MAX - ReportJobService.PROGRESS_CLAIMED
+        with app.app_context():
+            while not stop.wait(config['REPORT_JOB_HEARTBEAT']):
+                elapsed = time.monotonic() - started
+                progress = ReportJobService.PROGRESS_CLAIMED + int(span * min(1.0, elapsed / config['REPORT_JOB_TIMEOUT']))
+                try:
+                    with db.engine.begin() as connection:
+                        connection.execute(
+                            ReportJob.__table__.update()
+                            .where(ReportJob.__table__.c.id == job_id, ReportJob.__table__.c.status == 'running')
+                            .values(heartbeat_at=datetime.utcnow(), progress=progress)
+                        )
+                except Exception as e:
+                    print(f"Report job {job_id} heartbeat failed: {str(e)}")
+    
+    @staticmethod
+    def _run(app, job_id: str) -> None:
+        """Claim and run a queued job on a pool thread."""
+        with app.app_context():
+            stop = threading.Event()
+            heartbeat = None
+            try:
+                now = datetime.utcnow()
+                claimed = db.session.query(ReportJob).filter(
+                    ReportJob.id == job_id,
+                    ReportJob.status == 'queued'
+                ).update({
+                    'status': 'running',
+                    'progress': ReportJobService.PROGRESS_CLAIMED,
+                    'started_at': now,
+                    'heartbeat_at': now
+                }, synchronize_session=False)
+                db.session.commit()
+                if not claimed:
+                    return
+                
+                heartbeat = threading.Thread(
+                    target=ReportJobService._heartbeat,
+                    args=[app, job_id, time.monotonic(), stop],
+                    name=f'report-job-heartbeat-{job_id[:8]}',
+                    daemon=True
+                )
+                heartbeat.start()
+                
+                job = ReportJob.query.get(job_id)
+                definition = ReportJobService.REPORTS[job.report]
+                period = ReportRange.from_dict(job.params)
+                
+                # Transactions begun from here on use the job limit (see database._after_begin)
+                db.session().info['statement_timeout'] = app.config['REPORT_JOB_TIMEOUT'] * 1000
+                if 'replica' in app.config['SQLALCHEMY_BINDS'] and replica_guard.ready(db.engines['replica']):
+                    db.session().info[RoutingSession.REPLICA_KEY] = True
+                
+                data = getattr(ReportService, definition['method'])(period)
+                result = {definition['key']: data} if definition['key'] else data
+                result['range'] = job.params
+                db.session.rollback()
+                
+                stop.set()
+                heartbeat.join()
+                now = datetime.utcnow()
+                ReportJobService._finish(
+                    job_id,
+                    status='completed',
+                    progress=100,
+                    result=result,
+                    heartbeat_at=now,
+                    finished_at=now,
+                    expires_at=now + timedelta(seconds=app.config['REPORT_JOB_RESULT_TTL'])
+                )
+            except Exception as e:
+                db.session.rollback()
+                print(f"Report job {job_id} failed: {str(e)}")
+                stop.set()
+                if heartbeat:
+                    heartbeat.join()
+                now = datetime.utcnow()
+                ReportJobService._finish(
+                    job_id,
+                    status='failed',
+                    error=str(e),
+                    finished_at=now,
+                    expires_at=now + timedelta(seconds=app.config['REPORT_JOB_RESULT_TTL'])
+                )
+            finally:
+                stop.set()
+                db.session.remove()
+    
+    @staticmethod
+    def get_job(job_id: str) -> ReportJob:
+        """Get a job unless it does not exist or its result has expired."""
+        job = ReportJob.query.get(job_id)
+        if not job or (job.expires_at and job.expires_at <= datetime.utcnow()):
+            return None
+        return job
+    
+    @staticmethod
+    def clean_up() -> dict:
+        """Delete expired jobs and fail jobs whose worker went away.
+        
+        A running job whose heartbeat has been silent for six intervals
+        lost its process, e.g. to a restart. A queued job cannot wait
+        longer than REPORT_JOB_TIMEOUT (plus a grace period) for a worker.
+        """
+        now = datetime.utcnow()
+        config = current_app.config
+        silent_before = now - timedelta(seconds=config['REPORT_JOB_HEARTBEAT'] * 6)
+        queued_before = now - timedelta(seconds=config['REPORT_JOB_TIMEOUT'] + 300)
+        
+        failed = db.session.query(ReportJob).filter(
+            or_(
+                and_(ReportJob.status == 'running',
+                     func.coalesce(ReportJob.heartbeat_at, ReportJob.started_at) < silent_before),
+                and_(ReportJob.status == 'queued', ReportJob.created_at < queued_before)
+            )
+        ).update({
+            'status': 'failed',
+            'error': 'The worker running this job stopped before it finished',
+            'finished_at': now,
+            'expires_at': now + timedelta(seconds=config['REPORT_JOB_RESULT_TTL'])
+        }, synchronize_session=False)
+        deleted = db.session.query(ReportJob).filter(
+            ReportJob.expires_at <= now
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        return {'failed': failed, 'deleted': deleted}
@@ -0,0 +1,137 @@
+"""Reporting time range."""
+from datetime import date, datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from flask import current_app
+from sqlalchemy import and_, func, true
+
+
+class ReportRange:
+    """Half-open [start, end) reporting window in a named timezone.
+    
+    Timestamps are stored as naive UTC, so predicates compare the raw
+    column against UTC bounds and stay index range scans. Bucketing
+    converts to local time inside Postgres before truncating, so days,
+    weeks and months follow the campus calendar, DST included.
+    An unbounded range (no start and end) matches every row.
+    """
+    
+    BUCKETS = ['day', 'week', 'month']
+    
+    def __init__(self, start: datetime = None, end: datetime = None, tz: str = 'UTC', bucket: str = 'day'):
+        self.zone = self._zone(tz)
+        if bucket not in self.BUCKETS:
+            raise ValueError(f"bucket must be one of: {', '.join(self.BUCKETS)}")
+        if start and end and start >= end:
+            raise ValueError("'from' must be before 'to'")
+        
+        self.tz = tz
+        self.bucket = bucket
+        self.start = start
+        self.end = end
+    
+    @staticmethod
+    def _zone(tz: str):
+        try:
+            return ZoneInfo(tz)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise ValueError(f"Unknown timezone '{tz}'")
+    
+    @classmethod
+    def _local_midnight(cls, day: date, zone) -> datetime:
+        return datetime.combine(day, time.min, tzinfo=zone)
+    
+    @classmethod
+    def _parse(cls, value: str, zone, inclusive_date: bool = False) -> datetime:
+        """Parse an ISO date or datetime; naive values are local to `zone`.
+        
+        A bare date as the end of a range includes that whole day.
+        """
+        try:
+            if len(value) == 10:
+                day = date.fromisoformat(value)
+                return cls._local_midnight(day + timedelta(days=1) if inclusive_date else day, zone)
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            raise ValueError(f"Invalid date '{value}'; use YYYY-MM-DD or an ISO 8601 datetime")
+        return parsed.replace(tzinfo=zone) if parsed.tzinfo is None else parsed.astimezone(zone)
+    
+    @classmethod
+    def from_args(cls, args, default_days: int = None, default_bucket: str = 'day') -> 'ReportRange':
+        """Build a range from request arguments.
+        
+        Accepts from/to (ISO dates or datetimes), tz (IANA name, default
+        REPORT_TIMEZONE) and bucket. Without from, the range covers the
+        last `days` local calendar days including today (default_days);
+        with neither, it is unbounded.
+        """
+        tz = args.get('tz') or current_app.config['REPORT_TIMEZONE']
+        zone = cls._zone(tz)
+        bucket = args.get('bucket') or default_bucket
+        
+        end = cls._parse(args['to'], zone, inclusive_date=True) if args.get('to') else None
+        if args.get('from'):
+            start = cls._parse(args['from'], zone)
+        else:
+            days = args.get('days', default_days, type=int)
+            if days is None:
+                return cls(None, end, tz, bucket)
+            if days < 1:
+                raise ValueError("days must be at least 1")
+            if end is None:
+                end = cls._local_midnight(datetime.now(zone).date() + timedelta(days=1), zone)
+            start = cls._local_midnight((end - timedelta(microseconds=1)).date() - timedelta(days=days - 1), zone)
+        
+        return cls(start, end, tz, bucket)
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> 'ReportRange':
+        """Rebuild a range from to_dict() output."""
+        zone = cls._zone(data['tz'])
+        start = datetime.fromisoformat(data['from']).astimezone(zone) if data.get('from') else None
+        end = datetime.fromisoformat(data['to']).astimezone(zone) if data.get('to') else None
+        return cls(start, end, data['tz'], data['bucket'])
+    
+    @classmethod
+    def today(cls, tz: str) -> 'ReportRange':
+        """Get the local calendar day in progress."""
+        zone = cls._zone(tz)
+        start = cls._local_midnight(datetime.now(zone).date(), zone)
+        return cls(start, cls._local_midnight(start.date() + timedelta(days=1), zone), tz)
+    
+    @staticmethod
+    def _utc(value: datetime) -> datetime:
+        return value.astimezone(timezone.utc).replace(tzinfo=None) if value else None
+    
+    @property
+    def start_utc(self) -> datetime:
+        return self._utc(self.start)
+    
+    @property
+    def end_utc(self) -> datetime:
+        return self._utc(self.end)
+    
+    @property
+    def bounded(self) -> bool:
+        return self.start is not None or self.end is not None
+    
+    def contains(self, column):
+        """Get a sargable predicate for a naive UTC timestamp column."""
+        conditions = []
+        if self.start:
+            conditions.append(column >= self.start_utc)
+        if self.end:
+            conditions.append(column < self.end_utc)
+        return and_(*conditions) if conditions else true()
+    
+    def bucket_of(self, column):
+        """Get the local start of the bucket holding a naive UTC timestamp column."""
+        return func.date_trunc(self.bucket, func.timezone(self.tz, func.timezone('UTC', column)))
+    
+    def to_dict(self) -> dict:
+        """Convert range to dictionary."""
+        return {
+            'from': self.start.isoformat() if self.start else None,
+            'to': self.end.isoformat() if self.end else None,
+            'tz': self.tz,
+            'bucket': self.bucket
+        }
@@ -1,31 +1,36 @@
 """Report service."""
-from datetime import datetime, timedelta
-from sqlalchemy import func, extract, desc
-from models import Lead, Application, Task, Activity, Source, Stage, User
+from datetime import datetime
+from sqlalchemy import func, extract, desc, select, union_all, literal, and_
+from models import Lead, Application, Task, Activity, Source, Stage, User, KpiCounter, StageTransition
 from extensions import db
+from services.report_range import ReportRange
+from services.task_analytics_service import TaskAnalyticsService
 
 
 class ReportService:
     """Service for generating reports and analytics."""
     
     @staticmethod
-    def get_dashboard_stats() -> dict:
-        """Get dashboard statistics."""
+    def get_dashboard_stats(tz: str = 'UTC') -> dict:
+        """Get dashboard statistics; 'today' is the calendar day in `tz`."""
         # Lead stats
-        total_leads = Lead.query.count()
-        active_leads = Lead.query.filter_by(status='active').count()
-        new_leads_today = Lead.query.filter(
-            func.date(Lead.created_at) == func.date(func.now())
-        ).count()
+        total_leads = KpiCounter.get_value('lead')
+        active_leads = KpiCounter.get_value('lead', 'status', 'active')
+        if tz == 'UTC':
+            new_leads_today = KpiCounter.get_value('lead', 'day', datetime.utcnow())
+        else:
+            # Day counters are keyed by UTC date; other calendars count a created_at range
+            new_leads_today = Lead.query.filter(ReportRange.today(tz).contains(Lead.created_at)).count()
         
         # Application stats
-        total_applications = Application.query.count()
-        pending_applications = Application.query.filter_by(overall_status='in_progress').count()
-        completed_applications = Application.query.filter_by(overall_status='completed').count()
+        application_status = KpiCounter.get_dimension('application', 'status')
+        total_applications = KpiCounter.get_value('application')
+        pending_applications = application_status.get('in_progress', 0)
+        completed_applications = application_status.get('completed', 0)
         
         # Task stats
-        pending_tasks = Task.query.filter_by(status='pending').count()
-        overdue_tasks = len(Task.get_overdue_tasks())
+        pending_tasks = KpiCounter.get_value('task', 'status', 'pending')
+        overdue_tasks = TaskAnalyticsService.get_overdue_count()
         
         # Conversion rate
         conversion_rate = (completed_applications / total_leads * 100) if total_leads > 0 else 0
@@ -49,17 +54,14 @@ class ReportService:
         }
     
     @staticmethod
-    def get_conversion_funnel() -> list:
-        """Get conversion funnel data."""
+    def get_conversion_funnel(period: ReportRange) -> list:
+        """Get conversion funnel data for leads created in `period`."""
         stages = Stage.query.filter_by(type='lead', is_active=True).order_by(Stage.order).all()
-        funnel = []
+        counts = dict(db.session.query(Lead.stage_id, func.count(Lead.id)).filter(
+            period.contains(Lead.created_at)
+        ).group_by(Lead.stage_id).all())
         
-        for stage in stages:
-            count = Lead.query.filter_by(stage_id=stage.id).count()
-            funnel.append({
-                'stage': stage.name,
-                'count': count
-            })
+        funnel = [{'stage': stage.name, 'count': counts.get(stage.id, 0)} for stage in stages]
         
         # Add application stages
         app_stages = [
@@ -69,10 +71,16 @@ class ReportService:
             {'name': 'Enrolled', 'field': 'enrollment_status', 'value': 'confirmed'}
         ]
         
-        for stage in app_stages:
-            count = Application.query.filter(
-                getattr(Application, stage['field']) == stage['value']
-            ).count()
+        query = db.session.query(*[
+            func.count(Application.id).filter(getattr(Application, stage['field']) == stage['value'])
+            for stage in app_stages
+        ])
+        if period.bounded:
+            query = query.join(Lead, Lead.id == Application.lead_id).filter(period.contains(Lead.created_at))
+        else:
+            query = query.select_from(Application)
+        
+        for stage, count in zip(app_stages, query.one()):
             funnel.append({
                 'stage': stage['name'],
                 'count': count
@@ -81,32 +89,163 @@ class ReportService:
         return funnel
     
     @staticmethod
-    def get_source_performance(days: int = 30) -> list:
-        """Get lead source performance."""
-        since = datetime.utcnow() - timedelta(days=days)
+    def _stage_intervals(period: ReportRange):
+        """Build a subquery of the stage intervals of leads created in `period`.
         
-        sources = Source.query.filter_by(is_active=True).all()
-        performance = []
+        Each row is a stay of one lead in one stage: the lead's first stage
+        from its creation, then one per transition. LEAD() over the lead's
+        entries gives the exit time, which is NULL for the current stage.
+        """
+        cohort_filter = and_(period.contains(Lead.created_at), Lead.status != 'merged')
         
-        for source in sources:
-            # Total leads from this source
-            total_leads = Lead.query.filter(
-                Lead.source_id == source.id,
-                Lead.created_at >= since
-            ).count()
-            
-            # Converted leads
-            converted = Lead.query.filter(
-                Lead.source_id == source.id,
-                Lead.status == 'converted',
-                Lead.created_at >= since
-            ).count()
-            
-            # Applications
-            applications = db.session.query(Application).join(Lead).filter(
-                Lead.source_id == source.id,
-                Application.created_at >= since
-            ).count()
+        # The first transition's origin is the stage the lead was created in
+        first_stage = select(StageTransition.from_stage_id).where(
+            StageTransition.lead_id == Lead.id
+        ).order_by(StageTransition.changed_at, StageTransition.id).limit(1).correlate(Lead).scalar_subquery()
+        
+        initial = select(
+            Lead.id.label('lead_id'),
+            Lead.created_at.label('created_at'),
+            func.coalesce(first_stage, Lead.stage_id).label('stage_id'),
+            Lead.created_at.label('entered_at'),
+            literal(0).label('seq')
+        ).where(cohort_filter)
+        moves = select(
+            StageTransition.lead_id,
+            Lead.created_at,
+            StageTransition.to_stage_id,
+            StageTransition.changed_at,
+            StageTransition.id
+        ).join(Lead, Lead.id == StageTransition.lead_id).where(cohort_filter)
+        entries = union_all(initial, moves).subquery('stage_entries')
+        
+        return select(
+            entries.c.lead_id,
+            entries.c.created_at,
+            entries.c.stage_id,
+            entries.c.entered_at,
+            func.lead(entries.c.entered_at).over(
+                partition_by=entries.c.lead_id,
+                order_by=(entries.c.entered_at, entries.c.seq)
+            ).label('exited_at')
+        ).where(entries.c.stage_id.isnot(None)).subquery('stage_intervals')
+    
+    @staticmethod
+    def get_cohort_funnel(period: ReportRange) -> list:
+        """Get the lead stage funnel per cohort (period bucket) of lead creation.
+        
+        A lead counts towards every stage up to the furthest one it has
+        reached, so leads that moved on or dropped back still count.
+        """
+        intervals = ReportService._stage_intervals(period)
+        
+        reach = select(
+            intervals.c.lead_id,
+            period.bucket_of(intervals.c.created_at).label('cohort'),
+            func.max(Stage.order).label('max_order')
+        ).select_from(intervals).outerjoin(
+            Stage, and_(Stage.id == intervals.c.stage_id, Stage.type == 'lead')
+        ).group_by(intervals.c.lead_id, intervals.c.created_at).subquery('lead_reach')
+        
+        sizes = dict(db.session.query(reach.c.cohort, func.count()).group_by(reach.c.cohort).all())
+        
+        reached = select(
+            reach.c.cohort,
+            Stage.id.label('stage_id'),
+            Stage.name.label('stage_name'),
+            Stage.order.label('stage_order'),
+            func.count().label('reached')
+        ).select_from(reach).join(
+            Stage, and_(Stage.type == 'lead', Stage.is_active.is_(True), Stage.order <= reach.c.max_order)
+        ).group_by(reach.c.cohort, Stage.id, Stage.name, Stage.order).subquery('stage_reach')
+        
+        previous = func.lag(reached.c.reached).over(
+            partition_by=reached.c.cohort, order_by=(reached.c.stage_order, reached.c.stage_id)
+        )
+        rows = db.session.query(reached, previous.label('previous')).order_by(
+            reached.c.cohort, reached.c.stage_order, reached.c.stage_id
+        ).all()
+        
+        cohorts = {
+            cohort: {'cohort': cohort.strftime('%Y-%m' if period.bucket == 'month' else '%Y-%m-%d'), 'leads': size, 'stages': []}
+            for cohort, size in sorted(sizes.items())
+        }
+        for row in rows:
+            size = sizes[row.cohort]
+            cohorts[row.cohort]['stages'].append({
+                'stage_id': row.stage_id,
+                'stage_name': row.stage_name,
+                'reached': row.reached,
+                'conversion_rate': round(row.reached / size * 100, 2) if size else 0,
+                'step_conversion_rate': round(row.reached / row.previous * 100, 2) if row.previous else 100.0
+            })
+        
+        return list(cohorts.values())
+    
+    @staticmethod
+    def get_time_in_stage(period: ReportRange) -> list:
+        """Get how long leads created in `period` spend in each stage."""
+        intervals = ReportService._stage_intervals(period)
+        
+        hours = extract('epoch', intervals.c.exited_at - intervals.c.entered_at) / 3600
+        open_hours = extract('epoch', literal(datetime.utcnow()) - intervals.c.entered_at) / 3600
+        
+        rows = db.session.query(
+            Stage.id,
+            Stage.name,
+            Stage.type,
+            func.count().label('entered'),
+            func.count(intervals.c.exited_at).label('exited'),
+            func.avg(hours).label('avg_hours'),
+            func.percentile_cont(0.5).within_group(hours).label('median_hours'),
+            func.percentile_cont(0.9).within_group(hours).label('p90_hours'),
+            func.avg(open_hours).filter(intervals.c.exited_at.is_(None)).label('avg_open_hours')
+        ).join(Stage, Stage.id == intervals.c.stage_id).group_by(
+            Stage.id, Stage.name, Stage.type, Stage.order
+        ).order_by(Stage.type.desc(), Stage.order).all()
+        
+        def rounded(value):
+            return round(float(value), 2) if value is not None else None
+        
+        return [
+            {
+                'stage_id': row.id,
+                'stage_name': row.name,
+                'stage_type': row.type,
+                'entered': row.entered,
+                'exited': row.exited,
+                'in_stage': row.entered - row.exited,
+                'avg_hours': rounded(row.avg_hours),
+                'median_hours': rounded(row.median_hours),
+                'p90_hours': rounded(row.p90_hours),
+                'avg_open_hours': rounded(row.avg_open_hours)
+            }
+            for row in rows
+        ]
+    
+    @staticmethod
+    def get_source_performance(period: ReportRange) -> list:
+        """Get lead source performance for leads and applications created in `period`."""
+        leads = {
+            row.source_id: row
+            for row in db.session.query(
+                Lead.source_id,
+                func.count(Lead.id).label('total'),
+                func.count(Lead.id).filter(Lead.status == 'converted').label('converted')
+            ).filter(period.contains(Lead.created_at)).group_by(Lead.source_id)
+        }
+        applications = dict(
+            db.session.query(Lead.source_id, func.count(Application.id))
+            .join(Lead, Lead.id == Application.lead_id)
+            .filter(period.contains(Application.created_at))
+            .group_by(Lead.source_id).all()
+        )
+        
+        performance = []
+        for source in Source.query.filter_by(is_active=True).all():
+            row = leads.get(source.id)
+            total_leads = row.total if row else 0
+            converted = row.converted if row else 0
             
             performance.append({
                 'source_id': source.id,
@@ -114,63 +253,58 @@ class ReportService:
                 'category': source.category,
                 'total_leads': total_leads,
                 'converted': converted,
-                'applications': applications,
+                'applications': applications.get(source.id, 0),
                 'conversion_rate': round((converted / total_leads * 100), 2) if total_leads > 0 else 0
             })
         
         return sorted(performance, key=lambda x: x['total_leads'], reverse=True)
     
     @staticmethod
-    def get_lead_trends(days: int = 30) -> list:
-        """Get daily lead creation trends."""
-        since = datetime.utcnow() - timedelta(days=days)
+    def get_lead_trends(period: ReportRange) -> list:
+        """Get lead creation counts per period bucket (local day, week or month)."""
+        bucket = period.bucket_of(Lead.created_at)
         
         results = db.session.query(
-            func.date(Lead.created_at).label('date'),
+            bucket.label('date'),
             func.count(Lead.id).label('count')
         ).filter(
-            Lead.created_at >= since
-        ).group_by(
-            func.date(Lead.created_at)
-        ).order_by(
-            func.date(Lead.created_at)
-        ).all()
+            period.contains(Lead.created_at)
+        ).group_by(bucket).order_by(bucket).all()
         
         return [
-            {'date': str(r.date), 'count': r.count}
+            {'date': r.date.date().isoformat(), 'count': r.count}
             for r in results
         ]
     
     @staticmethod
-    def get_user_performance(days: int = 30) -> list:
-        """Get user performance metrics."""
-        since = datetime.utcnow() - timedelta(days=days)
+    def get_user_performance(period: ReportRange) -> list:
+        """Get user performance metrics; tasks and activities are counted within `period`."""
+        leads = {
+            row.assigned_to: row
+            for row in db.session.query(
+                Lead.assigned_to,
+                func.count(Lead.id).label('assigned'),
+                func.count(Lead.id).filter(Lead.status == 'converted').label('converted')
+            ).filter(Lead.assigned_to.isnot(None)).group_by(Lead.assigned_to)
+        }
+        tasks_completed = dict(
+            db.session.query(Task.assigned_to, func.count(Task.id)).filter(
+                Task.status == 'completed',
+                period.contains(Task.completed_at)
+            ).group_by(Task.assigned_to).all()
+        )
+        activities = dict(
+            db.session.query(Activity.user_id, func.count(Activity.id)).filter(
+                Activity.user_id.isnot(None),
+                period.contains(Activity.created_at)
+            ).group_by(Activity.user_id).all()
+        )
         
-        users = User.query.filter_by(is_active=True).all()
         performance = []
-        
-        for user in users:
-            # Leads assigned
-            leads_assigned = Lead.query.filter_by(assigned_to=user.id).count()
-            
-            # Leads converted
-            leads_converted = Lead.query.filter(
-                Lead.assigned_to == user.id,
-                Lead.status == 'converted'
-            ).count()
-            
-            # Tasks completed
-            tasks_completed = Task.query.filter(
-                Task.assigned_to == user.id,
-                Task.status == 'completed',
-                Task.completed_at >= since
-            ).count()
-            
-            # Activities logged
-            activities = Activity.query.filter(
-                Activity.user_id == user.id,
-                Activity.created_at >= since
-            ).count()
+        for user in User.query.filter_by(is_active=True).all():
+            row = leads.get(user.id)
+            leads_assigned = row.assigned if row else 0
+            leads_converted = row.converted if row else 0
             
             performance.append({
                 'user_id': user.id,
@@ -179,49 +313,52 @@ class ReportService:
                 'leads_assigned': leads_assigned,
                 'leads_converted': leads_converted,
                 'conversion_rate': round((leads_converted / leads_assigned * 100), 2) if leads_assigned > 0 else 0,
-                'tasks_completed': tasks_completed,
-                'activities': activities
+                'tasks_completed': tasks_completed.get(user.id, 0),
+                'activities': activities.get(user.id, 0)
             })
         
         return sorted(performance, key=lambda x: x['leads_converted'], reverse=True)
     
     @staticmethod
-    def get_stage_distribution() -> list:
-        """Get leads distribution by stage."""
+    def get_stage_distribution(period: ReportRange) -> list:
+        """Get distribution by stage of leads created in `period`."""
         stages = Stage.query.filter_by(type='lead', is_active=True).order_by(Stage.order).all()
+        counts = dict(db.session.query(Lead.stage_id, func.count(Lead.id)).filter(
+            period.contains(Lead.created_at)
+        ).group_by(Lead.stage_id).all())
         
         return [
             {
                 'stage_id': stage.id,
                 'stage_name': stage.name,
-                'count': Lead.query.filter_by(stage_id=stage.id).count()
+                'count': counts.get(stage.id, 0)
             }
             for stage in stages
         ]
     
     @staticmethod
-    def get_application_status_breakdown() -> dict:
-        """Get application status breakdown."""
-        return {
-            'document_status': {
-                'pending': Application.query.filter_by(document_status='pending').count(),
-                'verified': Application.query.filter_by(document_status='verified').count(),
-                'rejected': Application.query.filter_by(document_status='rejected').count()
-            },
-            'fee_status': {
-                'pending': Application.query.filter_by(fee_status='pending').count(),
-                'paid': Application.query.filter_by(fee_status='paid').count(),
-                'waived': Application.query.filter_by(fee_status='waived').count()
-            },
-            'admission_status': {
-                'pending': Application.query.filter_by(admission_status='pending').count(),
-                'approved': Application.query.filter_by(admission_status='approved').count(),
-                'rejected': Application.query.filter_by(admission_status='rejected').count()
-            }
+    def get_application_status_breakdown(period: ReportRange) -> dict:
+        """Get status breakdown of applications created in `period`."""
+        statuses = {
+            'document_status': ['pending', 'verified', 'rejected'],
+            'fee_status': ['pending', 'paid', 'waived'],
+            'admission_status': ['pending', 'approved', 'rejected']
         }
+        
+        breakdown = {}
+        for field, values in statuses.items():
+            column = getattr(Application, field)
+            counts = dict(db.session.query(column, func.count(Application.id)).filter(
+                period.contains(Application.created_at)
+            ).group_by(column).all())
+            breakdown[field] = {value: counts.get(value, 0) for value in values}
+        return breakdown
     
     @staticmethod
-    def get_recent_activities(limit: int = 50) -> list:
-        """Get recent activities."""
-        activities = Activity.query.order_by(desc(Activity.created_at)).limit(limit).all()
+    def get_recent_activities(limit: int = 50, period: ReportRange = None) -> list:
+        """Get recent activities, optionally only those in `period`."""
+        query = Activity.query
+        if period is not None:
+            query = query.filter(period.contains(Activity.created_at))
+        activities = query.order_by(desc(Activity.created_at)).limit(limit).all()
         return [activity.to_dict() for activity in activities]
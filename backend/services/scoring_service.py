@@ -0,0 +1,216 @@
+"""Lead scoring service."""
+from datetime import datetime
+from sqlalchemy import event, func, select, inspect, bindparam
+from models import Lead, Activity, Source, Stage
+from extensions import db
+
+
+class ScoringService:
+    """Service computing lead priority scores in vectorized batches."""
+    
+    # Points by source category
+    SOURCE_POINTS = {
+        'Referral': 20,
+        'Event': 15,
+        'Organic': 12,
+        'Direct': 10,
+        'Email': 8,
+        'Paid': 8,
+        'Social Media': 6,
+        'Publisher': 5
+    }
+    DEFAULT_SOURCE_POINTS = 5
+    
+    # Points per lead stage order (Inquiry = 1 ... Enrollment = 5)
+    STAGE_POINTS = 6
+    
+    # Points per re-inquiry, capped
+    REINQUIRY_POINTS = 4
+    REINQUIRY_CAP = 5
+    
+    # Recency points decay exponentially with hours since the last activity
+    RECENCY_POINTS = 20
+    RECENCY_HALF_LIFE_HOURS = 72
+    
+    # Points per activity type, applied to log(1 + count) so volume saturates
+    ACTIVITY_POINTS = {
+        'call': 3,
+        'email': 1,
+        'sms': 1,
+        'whatsapp': 1.5,
+        'meeting': 6,
+        'follow_up': 2,
+        'document_uploaded': 5,
+        'application_created': 8,
+        'fee_paid': 10
+    }
+    
+    # Score multiplier by lead status
+    STATUS_FACTORS = {
+        'active': 1.0,
+        'converted': 1.0,
+        'dormant': 0.5,
+        'lost': 0.0,
+        'merged': 0.0
+    }
+    
+    # Lead attributes whose change warrants a rescore
+    SCORED_ATTRS = ['source_id', 'stage_id', 'status', 're_inquiry_count']
+    
+    @staticmethod
+    def register_listeners() -> None:
+        """Rescore leads touched by a transaction just before it commits."""
+        if event.contains(db.session, 'before_commit', ScoringService._before_commit):
+            return
+        event.listen(db.session, 'after_flush', ScoringService._after_flush)
+        event.listen(db.session, 'before_commit', ScoringService._before_commit)
+    
+    @staticmethod
+    def _after_flush(session, flush_context) -> None:
+        """Collect leads with new activities or changed scoring attributes."""
+        lead_ids = set()
+        for obj in session.new:
+            if isinstance(obj, Activity):
+                lead_ids.add(obj.lead_id)
+            elif isinstance(obj, Lead):
+                lead_ids.add(obj.id)
+        
+        for obj in session.dirty:
+            if isinstance(obj, Lead):
+                state = inspect(obj)
+                if any(state.attrs[attr].history.has_changes() for attr in ScoringService.SCORED_ATTRS):
+                    lead_ids.add(obj.id)
+        
+        if lead_ids:
+            session.info.setdefault(Lead.RESCORE_KEY, set()).update(lead_ids)
+    
+    @staticmethod
+    def _before_commit(session) -> None:
+        """Score the queued leads inside the committing transaction."""
+        session.flush()
+        lead_ids = session.info.pop(Lead.RESCORE_KEY, None)
+        if lead_ids:
+            ScoringService.score_leads(sorted(lead_ids), session=session)
+    
+    @staticmethod
+    def _score_update():
+        """Build the executemany UPDATE writing scores.
+        
+        A score is derived data, so updated_at is set to itself: otherwise
+        its onupdate default would mark every rescored lead as modified.
+        """
+        table = Lead.__table__
+        return table.update().where(
+            table.c.id == bindparam('lead_id')
+        ).values(
+            score=bindparam('new_score'),
+            scored_at=bindparam('new_scored_at'),
+            updated_at=table.c.updated_at
+        )
+    
+    @staticmethod
+    def _features(lead_ids: list, session) -> list:
+        """Pull every scoring input for a batch of leads in one query."""
+        activity_types = list(ScoringService.ACTIVITY_POINTS)
+        activity_counts = select(
+            Activity.lead_id,
+            *[func.count().filter(Activity.type == t).label(t) for t in activity_types]
+        ).where(
+            Activity.lead_id.in_(lead_ids)
+        ).group_by(Activity.lead_id).subquery()
+        
+        return session.execute(
+            select(
+                Lead.id,
+                Lead.status,
+                Lead.re_inquiry_count,
+                Lead.last_activity_at,
+                Source.category,
+                Stage.order,
+                *[func.coalesce(activity_counts.c[t], 0) for t in activity_types]
+            )
+            .outerjoin(Source, Lead.source_id == Source.id)
+            .outerjoin(Stage, Lead.stage_id == Stage.id)
+            .outerjoin(activity_counts, activity_counts.c.lead_id == Lead.id)
+            .where(Lead.id.in_(lead_ids))
+        ).all()
+    
+    @staticmethod
+    def compute_scores(rows: list, now: datetime = None):
+        """Score feature rows (as returned by `_features`) in one vectorized pass.
+        
+        Returns a numpy array of scores. numpy is imported on first use to
+        keep it out of application startup.
+        """
+        import numpy as np
+        
+        now = now or datetime.utcnow()
+        if not rows:
+            return np.zeros(0)
+        
+        columns = list(zip(*rows))
+        _, status, reinquiries, last_activity, category, stage_order = columns[:6]
+        counts = np.array(columns[6:], dtype=float).T
+        
+        source = np.array([
+            ScoringService.SOURCE_POINTS.get(c, ScoringService.DEFAULT_SOURCE_POINTS) for c in category
+        ], dtype=float)
+        stage = np.array([o or 0 for o in stage_order], dtype=float) * ScoringService.STAGE_POINTS
+        reinquiry = np.minimum(
+            np.array([r or 0 for r in reinquiries], dtype=float),
+            ScoringService.REINQUIRY_CAP
+        ) * ScoringService.REINQUIRY_POINTS
+        
+        last = np.array(last_activity, dtype='datetime64[s]')
+        hours = (np.datetime64(now, 's') - last) / np.timedelta64(1, 'h')
+        recency = ScoringService.RECENCY_POINTS * np.nan_to_num(
+            np.exp2(-np.maximum(hours, 0) / ScoringService.RECENCY_HALF_LIFE_HOURS)
+        )
+        
+        weights = np.array(list(ScoringService.ACTIVITY_POINTS.values()), dtype=float)
+        engagement = np.log1p(counts) @ weights
+        
+        factor = np.array([ScoringService.STATUS_FACTORS.get(s, 1.0) for s in status])
+        scores = (source + stage + reinquiry + recency + engagement) * factor
+        return np.round(np.clip(scores, 0, 100), 2)
+    
+    @staticmethod
+    def score_leads(lead_ids: list = None, batch_size: int = 5000, session=None) -> int:
+        """Recompute and store scores for the given leads, or all leads.
+        
+        Works through id-ordered batches; each batch is one feature query
+        and one executemany UPDATE. Runs in the caller's transaction when a
+        session is passed, otherwise commits per batch.
+        """
+        owns_transaction = session is None
+        session = session or db.session
+        now = datetime.utcnow()
+        scored = 0
+        last_id = 0
+        
+        while True:
+            if lead_ids is not None:
+                batch = lead_ids[scored:scored + batch_size]
+            else:
+                batch = [lead_id for (lead_id,) in session.execute(
+                    select(Lead.id).where(Lead.id > last_id).order_by(Lead.id).limit(batch_size)
+                )]
+            if not batch:
+                break
+            
+            rows = ScoringService._features(batch, session)
+            scores = ScoringService.compute_scores(rows, now)
+            if rows:
+                session.execute(ScoringService._score_update(), [
+                    {'lead_id': row[0], 'new_score': float(score), 'new_scored_at': now}
+                    for row, score in zip(rows, scores)
+                ])
+            if owns_transaction:
+                # Commit without re-entering the rescore hook for these leads
+                session.info.pop(Lead.RESCORE_KEY, None)
+                session.commit()
+            
+            scored += len(batch)
+            last_id = batch[-1]
+        
+        return scored
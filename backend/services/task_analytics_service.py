@@ -0,0 +1,122 @@
+"""Task analytics service."""
+from datetime import datetime, timedelta
+from sqlalchemy import func, case
+from models import Task
+from extensions import db
+
+
+class TaskAnalyticsService:
+    """Service for SQL-side task backlog aggregates.
+    
+    Every aggregate is computed by the database; no task rows are loaded
+    into the ORM, so memory stays flat however large the backlog grows.
+    """
+    
+    # Overdue age buckets: (label, upper bound in hours past due)
+    AGE_BUCKETS = [
+        ('0-24h', 24),
+        ('1-3d', 72),
+        ('3-7d', 168),
+        ('7d+', None)
+    ]
+    
+    # Hours an open task may exist, by priority, before breaching its SLA
+    SLA_HOURS = {
+        'urgent': 4,
+        'high': 24,
+        'medium': 72,
+        'low': 168
+    }
+    
+    @staticmethod
+    def _age_bucket(now: datetime):
+        """Build a CASE expression labelling each open task's overdue bucket."""
+        whens = [(Task.due_date.is_(None), 'no_due_date'), (Task.due_date >= now, 'not_due')]
+        for label, hours in TaskAnalyticsService.AGE_BUCKETS:
+            if hours is not None:
+                whens.append((Task.due_date >= now - timedelta(hours=hours), label))
+        return case(*whens, else_=TaskAnalyticsService.AGE_BUCKETS[-1][0])
+    
+    @staticmethod
+    def _sla_breached(now: datetime):
+        """Build a CASE expression flagging open tasks past their priority SLA."""
+        default_hours = TaskAnalyticsService.SLA_HOURS['medium']
+        whens = [
+            (Task.priority == priority, Task.created_at < now - timedelta(hours=hours))
+            for priority, hours in TaskAnalyticsService.SLA_HOURS.items()
+        ]
+        breached = case(*whens, else_=Task.created_at < now - timedelta(hours=default_hours))
+        return case((breached, 1), else_=0)
+    
+    @staticmethod
+    def get_overdue_count(user_id: int = None) -> int:
+        """Get count of overdue tasks."""
+        query = db.session.query(func.count(Task.id)).filter(*Task.overdue_criteria())
+        if user_id:
+            query = query.filter(Task.assigned_to == user_id)
+        return query.scalar() or 0
+    
+    @staticmethod
+    def get_backlog_aggregates(user_id: int = None) -> list:
+        """Get open task counts grouped by assignee, priority and age bucket.
+        
+        Runs as a single grouped query over open tasks.
+        """
+        now = datetime.utcnow()
+        bucket = TaskAnalyticsService._age_bucket(now).label('bucket')
+        
+        query = db.session.query(
+            Task.assigned_to,
+            Task.priority,
+            bucket,
+            func.count(Task.id).label('count'),
+            func.sum(TaskAnalyticsService._sla_breached(now)).label('sla_breached')
+        ).filter(
+            Task.status.in_(Task.OPEN_STATUSES)
+        )
+        
+        if user_id:
+            query = query.filter(Task.assigned_to == user_id)
+        
+        results = query.group_by(Task.assigned_to, Task.priority, bucket).all()
+        
+        return [
+            {
+                'assigned_to': r.assigned_to,
+                'priority': r.priority,
+                'bucket': r.bucket,
+                'count': r.count,
+                'sla_breached': int(r.sla_breached or 0)
+            }
+            for r in results
+        ]
+    
+    @staticmethod
+    def get_backlog_summary(user_id: int = None) -> dict:
+        """Get open task, overdue, aging and SLA totals rolled up per dimension."""
+        overdue_buckets = {label for label, _ in TaskAnalyticsService.AGE_BUCKETS}
+        summary = {
+            'open': 0,
+            'overdue': 0,
+            'sla_breached': 0,
+            'by_bucket': {label: 0 for label, _ in TaskAnalyticsService.AGE_BUCKETS},
+            'by_priority': {},
+            'by_assignee': {}
+        }
+        
+        for row in TaskAnalyticsService.get_backlog_aggregates(user_id):
+            is_overdue = row['bucket'] in overdue_buckets
+            summary['open'] += row['count']
+            summary['sla_breached'] += row['sla_breached']
+            if is_overdue:
+                summary['overdue'] += row['count']
+                summary['by_bucket'][row['bucket']] += row['count']
+            
+            for dimension, key in (('by_priority', row['priority']), ('by_assignee', row['assigned_to'])):
+                totals = summary[dimension].setdefault(str(key), {'open': 0, 'overdue': 0, 'sla_breached': 0})
+                totals['open'] += row['count']
+                totals['sla_breached'] += row['sla_breached']
+                if is_overdue:
+                    totals['overdue'] += row['count']
+        
+        return summary
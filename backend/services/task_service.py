@@ -1,54 +1,53 @@
 """Task service."""
 from datetime import datetime, timedelta
-from sqlalchemy import desc
 from models import Task, Lead, Activity
 from extensions import db
+from services.count_service import CountService
+from services.event_service import EventService
 
 
 class TaskService:
     """Service for task operations."""
     
+    BULK_OPERATIONS = ['assign', 'reschedule', 'complete']
+    FILTER_KEYS = ['status', 'assigned_to', 'lead_id', 'priority', 'task_type', 'overdue_only']
+    
     @staticmethod
-    def get_tasks(filters: dict = None, page: int = 1, per_page: int = 20) -> dict:
+    def get_tasks(filters: dict = None, page: int = 1, per_page: int = 20, exact_count: bool = False) -> dict:
         """Get tasks with pagination and filters."""
         filters = filters or {}
-        query = Task.query
+        query = TaskService._apply_filters(Task.query, filters)
+        
+        # Order by due_date asc, priority rank desc
+        query = query.order_by(*Task.queue_order())
         
-        # Apply filters
+        # Pagination
+        result = CountService.paginate(query, page, per_page, exact_count)
+        result['items'] = [task.to_dict() for task in result['items']]
+        return result
+    
+    @staticmethod
+    def _apply_filters(query, filters: dict):
+        """Apply task list filters to a query."""
         if filters.get('status'):
-            query = query.filter_by(status=filters['status'])
+            query = query.filter(Task.status == filters['status'])
         
         if filters.get('assigned_to'):
-            query = query.filter_by(assigned_to=filters['assigned_to'])
+            query = query.filter(Task.assigned_to == filters['assigned_to'])
         
         if filters.get('lead_id'):
-            query = query.filter_by(lead_id=filters['lead_id'])
+            query = query.filter(Task.lead_id == filters['lead_id'])
         
         if filters.get('priority'):
-            query = query.filter_by(priority=filters['priority'])
+            query = query.filter(Task.priority == filters['priority'])
         
         if filters.get('task_type'):
-            query = query.filter_by(task_type=filters['task_type'])
+            query = query.filter(Task.task_type == filters['task_type'])
         
         if filters.get('overdue_only'):
-            query = query.filter(
-                Task.due_date < datetime.utcnow(),
-                Task.status.in_(['pending', 'in_progress'])
-            )
+            query = query.filter(*Task.overdue_criteria())
         
-        # Order by due_date asc, priority desc
-        query = query.order_by(Task.due_date.asc(), desc(Task.priority))
-        
-        # Pagination
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-        
-        return {
-            'items': [task.to_dict() for task in pagination.items],
-            'total': pagination.total,
-            'pages': pagination.pages,
-            'current_page': page,
-            'per_page': per_page
-        }
+        return query
     
     @staticmethod
     def get_task(task_id: int) -> Task:
@@ -135,6 +134,125 @@ class TaskService:
         
         return task
     
+    @staticmethod
+    def bulk_operation(operation: str, data: dict, task_ids: list = None,
+                       filters: dict = None, user_id: int = None) -> dict:
+        """Apply one operation to many tasks with set-based statements.
+        
+        Tasks are selected by ID list or by the task list filters. The
+        operation runs as a single UPDATE in one transaction; completion
+        activities are inserted in bulk and workflow events fire once per batch.
+        """
+        from flask import current_app
+        from services.kpi_service import KpiService
+        
+        if operation not in TaskService.BULK_OPERATIONS:
+            raise ValueError(f"Invalid operation. Must be one of: {', '.join(TaskService.BULK_OPERATIONS)}")
+        if not task_ids and not filters:
+            raise ValueError("task_ids or filters is required")
+        if task_ids and (
+            not isinstance(task_ids, list)
+            or not all(isinstance(task_id, int) and not isinstance(task_id, bool) for task_id in task_ids)
+        ):
+            raise ValueError("task_ids must be a list of integers")
+        if filters:
+            if not isinstance(filters, dict):
+                raise ValueError("filters must be an object")
+            unknown = [key for key in filters if key not in TaskService.FILTER_KEYS]
+            if unknown:
+                raise ValueError(f"Unknown filters: {', '.join(unknown)}")
+            # Filters with only empty values would select every task
+            if not any(filters.get(key) for key in TaskService.FILTER_KEYS):
+                raise ValueError(f"filters must set at least one of: {', '.join(TaskService.FILTER_KEYS)}")
+        
+        now = datetime.utcnow()
+        values = {'updated_at': now}
+        if operation == 'assign':
+            if 'assigned_to' not in data:
+                raise ValueError("assigned_to is required")
+            values['assigned_to'] = data['assigned_to']
+        elif operation == 'reschedule':
+            if not data.get('due_date'):
+                raise ValueError("due_date is required")
+            values['due_date'] = data['due_date']
+        elif operation == 'complete':
+            values.update(
+                status='completed',
+                completed_at=now,
+                completed_by=user_id,
+                completion_notes=data.get('notes')
+            )
+        
+        # Lock the target rows and capture the values the counters depend on
+        query = db.session.query(Task.id, Task.lead_id, Task.title, Task.status, Task.assigned_to)
+        if task_ids:
+            query = query.filter(Task.id.in_(task_ids))
+        if filters:
+            query = TaskService._apply_filters(query, filters)
+        if operation == 'complete':
+            query = query.filter(Task.status.in_(Task.OPEN_STATUSES))
+        
+        max_rows = current_app.config['MAX_BULK_TASKS']
+        rows = query.order_by(Task.id).limit(max_rows + 1).with_for_update().all()
+        if len(rows) > max_rows:
+            raise ValueError(f"Bulk operations are limited to {max_rows} tasks")
+        
+        affected_ids = [row.id for row in rows]
+        if affected_ids:
+            db.session.execute(
+                Task.__table__.update()
+                .where(Task.__table__.c.id.in_(affected_ids))
+                .values(**values)
+            )
+            KpiService.record_changes('task', [
+                (
+                    {'status': row.status, 'assigned_to': row.assigned_to},
+                    {
+                        'status': values.get('status', row.status),
+                        'assigned_to': values.get('assigned_to', row.assigned_to)
+                    }
+                )
+                for row in rows
+            ])
+            EventService.queue_events('task', 'updated', [
+                {
+                    'id': row.id,
+                    'lead_id': row.lead_id,
+                    'owners': sorted({row.assigned_to, values.get('assigned_to', row.assigned_to)} - {None})
+                }
+                for row in rows
+            ])
+            
+            if operation == 'complete':
+                Activity.log_many([
+                    {
+                        'lead_id': row.lead_id,
+                        'type': 'task_completed',
+                        'description': f"Task completed: {row.title}",
+                        'user_id': user_id,
+                        'metadata': {'task_id': row.id, 'notes': data.get('notes')}
+                    }
+                    for row in rows if row.lead_id
+                ])
+        
+        db.session.commit()
+        
+        if operation == 'complete' and rows:
+            from services.automation_service import AutomationService
+            AutomationService.on_tasks_completed(
+                [{'task_id': row.id, 'lead_id': row.lead_id} for row in rows],
+                user_id
+            )
+        
+        result = {
+            'operation': operation,
+            'affected': len(affected_ids),
+            'task_ids': affected_ids
+        }
+        if task_ids:
+            result['skipped_ids'] = sorted(set(task_ids) - set(affected_ids))
+        return result
+    
     @staticmethod
     def delete_task(task_id: int) -> None:
         """Delete task."""
@@ -182,13 +300,8 @@ class TaskService:
     @staticmethod
     def get_overdue_count(user_id: int = None) -> int:
         """Get count of overdue tasks."""
-        query = Task.query.filter(
-            Task.due_date < datetime.utcnow(),
-            Task.status.in_(['pending', 'in_progress'])
-        )
-        if user_id:
-            query = query.filter_by(assigned_to=user_id)
-        return query.count()
+        from services.task_analytics_service import TaskAnalyticsService
+        return TaskAnalyticsService.get_overdue_count(user_id)
     
     @staticmethod
     def create_application_checklist(application_id: int, lead_id: int) -> list:
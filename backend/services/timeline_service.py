@@ -0,0 +1,165 @@
+"""Lead timeline service."""
+import base64
+import heapq
+import json
+from datetime import datetime
+from itertools import islice
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import joinedload
+from models import Lead, Activity, Task, Application
+from extensions import db
+
+
+class TimelineService:
+    """Service merging a lead's activities, tasks and application milestones into one stream."""
+    
+    MAX_LIMIT = 200
+    
+    # Tie-break rank per event source; events sort by (timestamp, rank, id), newest first
+    SOURCES = ['activity', 'task_created', 'task_completed', 'application']
+    
+    # Activity types already represented by task and application events
+    SHADOWED_ACTIVITY_TYPES = ['task_created', 'task_completed', 'application_created']
+    
+    # Application milestones: (milestone, timestamp attribute, status attribute)
+    APPLICATION_MILESTONES = [
+        ('application_created', 'created_at', 'overall_status'),
+        ('documents', 'document_verified_at', 'document_status'),
+        ('fee', 'fee_paid_at', 'fee_status'),
+        ('admission', 'admission_decision_at', 'admission_status'),
+        ('enrollment', 'enrollment_date', 'enrollment_status')
+    ]
+    
+    @staticmethod
+    def encode_cursor(timestamp: datetime, rank: int, item_id: int) -> str:
+        """Encode a stream position as an opaque cursor."""
+        raw = json.dumps([timestamp.isoformat(), rank, item_id])
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+    
+    @staticmethod
+    def decode_cursor(cursor: str) -> tuple:
+        """Decode a cursor into (timestamp, rank, id)."""
+        try:
+            timestamp, rank, item_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+            return datetime.fromisoformat(timestamp), int(rank), int(item_id)
+        except (ValueError, TypeError):
+            raise ValueError("Invalid cursor")
+    
+    @staticmethod
+    def _before_cursor(timestamp_col, id_col, rank: int, cursor: tuple):
+        """Build the keyset condition for rows of one source strictly after a cursor."""
+        cursor_ts, cursor_rank, cursor_id = cursor
+        if rank < cursor_rank:
+            return timestamp_col <= cursor_ts
+        if rank > cursor_rank:
+            return timestamp_col < cursor_ts
+        return or_(
+            timestamp_col < cursor_ts,
+            and_(timestamp_col == cursor_ts, id_col < cursor_id)
+        )
+    
+    @staticmethod
+    def _activity_events(lead_id: int, cursor: tuple, limit: int):
+        """Stream a lead's activities newest first."""
+        rank = TimelineService.SOURCES.index('activity')
+        query = Activity.query.options(joinedload(Activity.user)).filter(
+            Activity.lead_id == lead_id,
+            Activity.type.notin_(TimelineService.SHADOWED_ACTIVITY_TYPES)
+        )
+        if cursor:
+            query = query.filter(TimelineService._before_cursor(Activity.created_at, Activity.id, rank, cursor))
+        
+        for activity in query.order_by(Activity.created_at.desc(), Activity.id.desc()).limit(limit):
+            yield (activity.created_at, rank, activity.id), activity.to_dict()
+    
+    @staticmethod
+    def _task_events(lead_id: int, cursor: tuple, limit: int, source: str):
+        """Stream a lead's task creations or completions newest first."""
+        rank = TimelineService.SOURCES.index(source)
+        timestamp_attr = 'created_at' if source == 'task_created' else 'completed_at'
+        timestamp_col = getattr(Task, timestamp_attr)
+        query = Task.query.filter(Task.lead_id == lead_id, timestamp_col.isnot(None))
+        if cursor:
+            query = query.filter(TimelineService._before_cursor(timestamp_col, Task.id, rank, cursor))
+        
+        for task in query.order_by(timestamp_col.desc(), Task.id.desc()).limit(limit):
+            yield (getattr(task, timestamp_attr), rank, task.id), {
+                'id': task.id,
+                'title': task.title,
+                'task_type': task.task_type,
+                'status': task.status,
+                'priority': task.priority,
+                'due_date': task.due_date.isoformat() if task.due_date else None,
+                'assigned_to': task.assigned_to,
+                'completed_by': task.completed_by,
+                'completion_notes': task.completion_notes,
+                'is_overdue': task.is_overdue()
+            }
+    
+    @staticmethod
+    def _application_events(lead_id: int, cursor: tuple):
+        """Get a lead's application milestones newest first.
+        
+        A lead has at most one application, so milestones are built in memory.
+        """
+        rank = TimelineService.SOURCES.index('application')
+        application = Application.query.filter_by(lead_id=lead_id).first()
+        if not application:
+            return []
+        
+        events = []
+        for ordinal, (milestone, timestamp_attr, status_attr) in enumerate(TimelineService.APPLICATION_MILESTONES):
+            timestamp = getattr(application, timestamp_attr)
+            if not timestamp:
+                continue
+            key = (timestamp, rank, ordinal)
+            if cursor and key >= cursor:
+                continue
+            events.append((key, {
+                'application_id': application.id,
+                'milestone': milestone,
+                'status': getattr(application, status_attr)
+            }))
+        return sorted(events, key=lambda event: event[0], reverse=True)
+    
+    @staticmethod
+    def get_timeline(lead_id: int, cursor: str = None, limit: int = 50) -> dict:
+        """Get one page of a lead's merged event stream, newest first.
+        
+        Each source is read with its own keyset query (at most `limit` + 1
+        rows) and the sorted streams are combined with a k-way heap merge.
+        """
+        if not db.session.query(Lead.id).filter(Lead.id == lead_id).first():
+            raise ValueError("Lead not found")
+        
+        limit = max(1, min(limit, TimelineService.MAX_LIMIT))
+        position = TimelineService.decode_cursor(cursor) if cursor else None
+        fetch = limit + 1
+        
+        streams = [
+            TimelineService._activity_events(lead_id, position, fetch),
+            TimelineService._task_events(lead_id, position, fetch, 'task_created'),
+            TimelineService._task_events(lead_id, position, fetch, 'task_completed'),
+            TimelineService._application_events(lead_id, position)
+        ]
+        merged = list(islice(
+            heapq.merge(*streams, key=lambda event: event[0], reverse=True),
+            fetch
+        ))
+        
+        page = merged[:limit]
+        items = [
+            {
+                'type': TimelineService.SOURCES[rank],
+                'timestamp': timestamp.isoformat(),
+                'data': data
+            }
+            for (timestamp, rank, _), data in page
+        ]
+        has_more = len(merged) > limit
+        
+        return {
+            'items': items,
+            'next_cursor': TimelineService.encode_cursor(*page[-1][0]) if has_more else None,
+            'has_more': has_more
+        }
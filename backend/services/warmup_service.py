@@ -0,0 +1,114 @@
+"""Worker warm-up service."""
+import os
+import threading
+import time
+from flask import current_app
+from sqlalchemy import text
+from sqlalchemy.orm import configure_mappers
+from models import Stage, Source, User, Workflow, KpiCounter
+from extensions import db
+
+
+class WarmupService:
+    """Service preparing a worker before it accepts traffic.
+    
+    Pays the first-request costs up front: mapper configuration, pool
+    connection handshakes, and compiling the reference-data, workflow and
+    list statements into SQLAlchemy's statement cache.
+    """
+    
+    _ready = False
+    _lock = threading.Lock()
+    _report = {}
+    
+    @staticmethod
+    def warm_up(app) -> bool:
+        """Run every warm-up step; returns whether the worker is ready."""
+        with WarmupService._lock:
+            if WarmupService._ready:
+                return True
+            
+            steps = [
+                ('mappers', configure_mappers),
+                ('connections', WarmupService._open_connections),
+                ('reference_data', WarmupService._load_reference_data),
+                ('workflows', WarmupService._load_workflows),
+                ('list_queries', WarmupService._run_list_queries),
+                ('scoring', WarmupService._load_scoring)
+            ]
+            report = {}
+            started = time.perf_counter()
+            with app.app_context():
+                try:
+                    for name, step in steps:
+                        step_started = time.perf_counter()
+                        step()
+                        report[name] = round((time.perf_counter() - step_started) * 1000, 1)
+                except Exception as e:
+                    print(f"Warm-up failed at {name}: {str(e)}")
+                    report['error'] = f"{name}: {str(e)}"
+                    WarmupService._report = report
+                    return False
+                finally:
+                    db.session.remove()
+            
+            report['total'] = round((time.perf_counter() - started) * 1000, 1)
+            WarmupService._report = report
+            WarmupService._ready = True
+            print(f"Worker {os.getpid()} warmed up in {report['total']}ms")
+            return True
+    
+    @staticmethod
+    def _open_connections() -> None:
+        """Open WARMUP_CONNECTIONS pool connections (and one replica connection)."""
+        engines = [db.engine] * min(current_app.config['WARMUP_CONNECTIONS'], db.engine.pool.size())
+        if 'replica' in db.engines:
+            engines.append(db.engines['replica'])
+        
+        connections = []
+        try:
+            for engine in engines:
+                connection = engine.connect()
+                connections.append(connection)
+                connection.execute(text("SELECT 1"))
+        finally:
+            for connection in connections:
+                connection.close()
+    
+    @staticmethod
+    def _load_reference_data() -> None:
+        Stage.get_lead_stages()
+        Stage.get_application_stages()
+        Source.get_active_sources()
+        for model in (Stage, Source, User, KpiCounter):
+            model.get_version()
+        
+        from services.auth_service import AuthService
+        AuthService.get_executives()
+    
+    @staticmethod
+    def _load_workflows() -> None:
+        for trigger in Workflow.TRIGGERS:
+            Workflow.get_active_for_trigger(trigger)
+    
+    @staticmethod
+    def _run_list_queries() -> None:
+        from services.lead_service import LeadService
+        from services.task_service import TaskService
+        LeadService.get_leads()
+        TaskService.get_tasks()
+    
+    @staticmethod
+    def _load_scoring() -> None:
+        # Imports numpy, which the scoring service defers
+        from services.scoring_service import ScoringService
+        ScoringService.compute_scores([])
+    
+    @staticmethod
+    def is_ready() -> bool:
+        return WarmupService._ready
+    
+    @staticmethod
+    def get_report() -> dict:
+        """Get per-step warm-up timings in milliseconds."""
+        return dict(WarmupService._report)